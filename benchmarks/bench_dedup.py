@@ -0,0 +1,72 @@
+# Benchmark: near-duplicate query filtering (sen_survey.dedup) from 10k to 1M queries,
+# with its recall checked against exact-Jaccard greedy dedup on a sample
+#
+#   python benchmarks/bench_dedup.py                        # N = 10k, 100k, 1M
+#   python benchmarks/bench_dedup.py --sizes 100000 --noise 0
+#
+# --noise appends random words to every query, so most texts are distinct and the index
+# grows with N instead of saturating at the simulated query space's ~1k distinct queries.
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sen_survey.dedup import QueryDeduplicator, shingles  # noqa: E402
+from sen_survey.multi_model import SENQuestionGenerator  # noqa: E402
+
+
+def queries(n, noise, seed):
+    """`n` synthesized queries, each with `noise` random words appended."""
+    generator = SENQuestionGenerator(seed=seed)
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    for query_data in generator.synthesize_queries(n, seed=seed).iter_records():
+        if noise:
+            query_data["teacher_query_text"] += " " + " ".join(rng.choices(vocabulary, k=noise))
+        yield query_data
+
+
+def exact_unique(sample, threshold):
+    kept = []
+    for query_data in sample:
+        current = shingles(query_data["teacher_query_text"])
+        if not any(len(current & other) / len(current | other) >= threshold for other in kept):
+            kept.append(current)
+    return len(kept)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--noise", type=int, nargs="+", default=[0, 4],
+                        help="random words appended per query (one run per value)")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--recall-sample", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for noise in args.noise:
+        sample = list(queries(args.recall_sample, noise, args.seed))
+        exact = exact_unique(sample, args.threshold)
+        lsh = sum(1 for _ in QueryDeduplicator(args.threshold).process(sample))
+        print(f"noise {noise}: {args.recall_sample} queries keep {exact} (exact Jaccard) vs "
+              f"{lsh} (LSH); {1 - (lsh - exact) / max(1, args.recall_sample - exact):.1%} "
+              f"of exact duplicates found")
+        for n in args.sizes:
+            deduplicator = QueryDeduplicator(args.threshold)
+            start = time.perf_counter()
+            kept = sum(1 for _ in deduplicator.process(queries(n, noise, args.seed)))
+            elapsed = time.perf_counter() - start
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"  N={n:>9,}  {elapsed:7.2f} s  {n / elapsed:9,.0f} queries/s  "
+                  f"kept {kept:>8,}  indexed {len(deduplicator.index):>8,}  "
+                  f"peak RSS {rss:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
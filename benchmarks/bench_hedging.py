@@ -0,0 +1,95 @@
+# Benchmark: per-call latency of model calls with injected latency spikes and an outage,
+# with and without hedged requests, deadlines and failover (sen_survey.hedging)
+#
+#   python benchmarks/bench_hedging.py                  # 300 queries x 4 models per mode
+#   python benchmarks/bench_hedging.py --spike-probability 0.1 --spike-latency 0.5
+#
+# Calls are made one after another through SENQuestionGenerator.get_responses_from_llm,
+# as the generator's loop does, so every spike stalls the run by its full length.
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sen_survey.instrumentation import LatencyHistogram  # noqa: E402
+from sen_survey.llm_backends import (BackendError, FaultInjectingBackend,  # noqa: E402
+                                     SimulatedBackend)
+from sen_survey.multi_model import SENQuestionGenerator  # noqa: E402
+
+MODELS = ["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"]
+
+
+def run(args, hedging, models=None):
+    """Per-call latency statistics of one mode (after the warm-up queries)."""
+    backend = FaultInjectingBackend(
+        SimulatedBackend(rng=random.Random(args.seed)), latency=args.latency,
+        jitter=args.jitter, spike_probability=args.spike_probability,
+        spike_latency=args.spike_latency, models=models, seed=args.seed)
+    generator = SENQuestionGenerator(seed=args.seed, backend=backend, hedging=hedging)
+    queries = [generator.create_random_query()["teacher_query_text"]
+               for _ in range(args.warmup + args.queries)]
+
+    histogram = LatencyHistogram()
+    errors = 0
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        for model_name in MODELS:
+            call_start = time.perf_counter()
+            try:
+                generator.get_responses_from_llm(query, model_name)
+            except BackendError:
+                errors += 1
+            if i >= args.warmup:
+                histogram.observe(time.perf_counter() - call_start)
+    stats = histogram.summary()
+    stats["wall"] = time.perf_counter() - start
+    stats["errors"] = errors
+    hedged = generator.hedged
+    stats["hedges"] = hedged.hedges if hedged else 0
+    stats["hedge_wins"] = hedged.hedge_wins if hedged else 0
+    stats["fallbacks"] = hedged.fallbacks_used if hedged else 0
+    stats["trips"] = hedged.breaker_trips if hedged else 0
+    generator.close()
+    return stats
+
+
+def report(name, stats):
+    print(f"{name:<28} p50 {stats['p50'] * 1000:7.1f} ms  p95 {stats['p95'] * 1000:7.1f} ms  "
+          f"p99 {stats['p99'] * 1000:7.1f} ms  max {stats['max'] * 1000:7.1f} ms  "
+          f"wall {stats['wall']:6.2f} s  errors {stats['errors']:4d}  "
+          f"hedges {stats['hedges']:4d} (won {stats['hedge_wins']:3d})  "
+          f"fallbacks {stats['fallbacks']:4d}  trips {stats['trips']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=300, help="measured queries per mode")
+    parser.add_argument("--warmup", type=int, default=25,
+                        help="queries before measuring (hedging needs p95 samples first)")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--jitter", type=float, default=0.003)
+    parser.add_argument("--spike-probability", type=float, default=0.03)
+    parser.add_argument("--spike-latency", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{args.queries} queries x {len(MODELS)} models; {args.latency * 1000:g} ms calls, "
+          f"{args.spike_probability:.0%} spiking to {args.spike_latency * 1000:g} ms")
+    print("\nLatency spikes")
+    report("no hedging", run(args, None))
+    report("hedged at p95", run(args, {"default_deadline": 2.0}))
+
+    # Mistral Large is down for the whole run
+    outage = {"Mistral Large": {"error_rate": 1.0}}
+    print("\nLatency spikes + Mistral Large outage")
+    report("no failover", run(args, None, outage))
+    report("hedged, fallback GPT-4o", run(
+        args, {"default_deadline": 2.0, "fallbacks": {"Mistral Large": "GPT-4o"}}, outage))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Benchmark: quality leaderboard over N synthetic scored responses (default 10M)
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sen_survey.leaderboard import quality_leaderboard  # noqa: E402
+
+
+def synthetic_scores(rows, seed=0):
+    """Long frame shaped like the generator's output, with categorical columns."""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    models = ["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"]
+    sen = ["ASD", "ADHD", "SEMH", "SLCN", "MLD", "SPLD", "PD", "VI", "HI"]
+    ages = ["Early Years (3-5)", "Key Stage 1 (5-7)", "Key Stage 2 (7-11)",
+            "Key Stage 3 (11-14)", "Key Stage 4 (14-16)"]
+    templates = [f"template {i}" for i in range(5)]
+    model_codes = rng.integers(0, len(models), rows, dtype=np.int8)
+    low = np.where(model_codes == 0, 0.7, 0.6)
+    return pd.DataFrame({
+        "model": pd.Categorical.from_codes(model_codes, models),
+        "sen_category": pd.Categorical.from_codes(
+            rng.integers(0, len(sen), rows, dtype=np.int8), sen),
+        "age_group": pd.Categorical.from_codes(
+            rng.integers(0, len(ages), rows, dtype=np.int8), ages),
+        "template": pd.Categorical.from_codes(
+            rng.integers(0, len(templates), rows, dtype=np.int8), templates),
+        "quality_score": low + rng.random(rows) * 0.25,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quality leaderboard benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--n-boot", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    frame = synthetic_scores(args.rows)
+    start = time.perf_counter()
+    table = quality_leaderboard(frame, n_boot=args.n_boot)
+    elapsed = time.perf_counter() - start
+    print(table.to_string(max_rows=12))
+    print(f"{args.rows:,} scored responses, {len(table)} groups: {elapsed:.2f}s "
+          f"({args.rows / elapsed:,.0f} rows/s)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    main()
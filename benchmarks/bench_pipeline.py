@@ -0,0 +1,563 @@
+# Benchmark suite: wall time and peak memory of every survey pipeline stage
+#
+#   python benchmarks/bench_pipeline.py run -o results.json            # N = 10, 1k, 100k; 1-8 models
+#   python benchmarks/bench_pipeline.py run --sizes 1000 --stages all  # also the extended stages
+#   python benchmarks/bench_pipeline.py run --stages export_to_csv export_to_parquet \
+#       export_to_arrow read_csv read_parquet read_arrow              # write/read time, file size
+#   python benchmarks/bench_pipeline.py compare base.json results.json # exit code 1 on regressions
+#   python benchmarks/bench_pipeline.py rss --sizes 1000 10000 100000  # peak RSS vs N, list vs stream
+#
+# The full default matrix is dominated by N=100k with 8 models; add --no-memory to skip the
+# (slower) tracemalloc pass. Results are saved after every measurement.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sen_survey.multi_model import SENQuestionGenerator  # noqa: E402
+
+MODEL_NAMES = ["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large",
+               "Claude 3.5 Sonnet", "Command R+", "Qwen 2", "DeepSeek V2"]
+CREATED_DATE = "2024-01-01T00:00:00"
+
+
+# --- Fixtures (built once per size and model count, outside the measurements) ---
+
+def _generator(ctx):
+    """A freshly seeded generator, so every repetition does identical work."""
+    return SENQuestionGenerator(seed=ctx["seed"])
+
+
+def _queries(ctx):
+    if "queries" not in ctx:
+        generator = SENQuestionGenerator(seed=ctx["seed"] + 1)
+        ctx["queries"] = [generator.create_random_query() for _ in range(ctx["n"])]
+    return ctx["queries"]
+
+
+def _questions(ctx):
+    if "questions" not in ctx:
+        generator = SENQuestionGenerator(seed=ctx["seed"] + 1)
+        ctx["questions"] = list(generator.iter_question_set(
+            ctx["n"], ctx["models"], created_date=CREATED_DATE))
+    return ctx["questions"]
+
+
+def _path(ctx, filename):
+    return os.path.join(ctx["directory"], filename)
+
+
+def _file_size(path):
+    """Report callable of a stage that writes `path`: its size on disk."""
+    return lambda: {"file_bytes": os.path.getsize(path)}
+
+
+def _exported(ctx, file_format):
+    """Path of the questions exported once in `file_format` ("csv", "parquet", "arrow")."""
+    key = f"exported_{file_format}"
+    if key not in ctx:
+        generator = _generator(ctx)
+        path = _path(ctx, f"read.{file_format}")
+        if file_format == "csv":
+            generator.export_to_csv(_questions(ctx), path)
+        else:
+            from sen_survey.columnar_export import export_long_table
+            export_long_table(_questions(ctx), path, file_format=file_format)
+        ctx[key] = path
+    return ctx[key]
+
+
+# --- Stages: each does its setup and returns (timed callable, items processed), plus
+# optionally a callable returning extra result fields (e.g. the file size) ---
+
+def bench_create_teacher_query(ctx):
+    generator = _generator(ctx)
+    rng = random.Random(ctx["seed"])
+    params = [(rng.choice(list(generator.sen_categories)), rng.choice(generator.age_groups),
+               rng.choice(generator.subjects)) for _ in range(ctx["n"])]
+
+    def run():
+        for sen_type, age_group, subject in params:
+            generator.create_teacher_query(sen_type, age_group, subject)
+    return run, ctx["n"]
+
+
+def bench_generate_question_set(ctx):
+    generator = _generator(ctx)
+    return lambda: generator.generate_question_set(ctx["n"], ctx["models"]), ctx["n"]
+
+
+def bench_get_responses_from_llm(ctx):
+    generator = _generator(ctx)
+    texts = [query["teacher_query_text"] for query in _queries(ctx)]
+
+    def run():
+        for text in texts:
+            for model in ctx["models"]:
+                generator.get_responses_from_llm(text, model)
+    return run, len(texts) * len(ctx["models"])
+
+
+def bench_format_for_microsoft_forms(ctx):
+    generator = _generator(ctx)
+    questions = _questions(ctx)
+    return lambda: generator.format_for_microsoft_forms(questions), ctx["n"]
+
+
+def bench_export_to_csv(ctx):
+    generator = _generator(ctx)
+    questions = _questions(ctx)
+    path = _path(ctx, "queries.csv")
+    return lambda: generator.export_to_csv(questions, path), ctx["n"], _file_size(path)
+
+
+def bench_create_forms_import_file(ctx):
+    generator = _generator(ctx)
+    forms_data = generator.format_for_microsoft_forms(_questions(ctx))
+    return (lambda: generator.create_forms_import_file(forms_data, _path(ctx, "forms.txt")),
+            ctx["n"])
+
+
+def bench_stream_to_files(ctx):
+    """End to end with flat memory: generate, then write CSV, Forms and JSONL per record."""
+    generator = _generator(ctx)
+
+    def run():
+        generator.stream_to_files(
+            generator.iter_question_set(ctx["n"], ctx["models"], created_date=CREATED_DATE),
+            csv_filename=_path(ctx, "stream.csv"), forms_filename=_path(ctx, "stream.txt"),
+            jsonl_filename=_path(ctx, "stream.jsonl"))
+    return run, ctx["n"]
+
+
+def bench_generate_compact(ctx):
+    generator = _generator(ctx)
+    return (lambda: generator.generate_question_set(ctx["n"], ctx["models"], compact=True),
+            ctx["n"])
+
+
+def bench_generate_instrumented(ctx):
+    """generate_question_set with instrumentation on; compare with the core stage."""
+    from sen_survey.instrumentation import Metrics
+    generator = SENQuestionGenerator(seed=ctx["seed"], metrics=Metrics())
+    return lambda: generator.generate_question_set(ctx["n"], ctx["models"]), ctx["n"]
+
+
+def bench_replay(ctx):
+    """generate_question_set answered from a cassette recorded in the setup."""
+    from sen_survey.cassette import Cassette
+    path = _path(ctx, "run.cassette")
+    if ctx.get("cassette") != path:
+        with Cassette(path, mode="record") as cassette:
+            SENQuestionGenerator(seed=ctx["seed"], cassette=cassette).generate_question_set(
+                ctx["n"], ctx["models"])
+        ctx["cassette"] = path
+    generator = SENQuestionGenerator(seed=ctx["seed"], cassette=Cassette(path, mode="replay"))
+    return lambda: generator.generate_question_set(ctx["n"], ctx["models"]), ctx["n"]
+
+
+def bench_generate_sharded(ctx):
+    """Worker processes are not traced: peak memory covers the parent only."""
+    generator = _generator(ctx)
+    return (lambda: list(generator.generate_question_set_sharded(
+        ctx["n"], ctx["models"], seed=ctx["seed"], workers=2, created_date=CREATED_DATE)),
+        ctx["n"])
+
+
+def bench_export_to_jsonl(ctx):
+    generator = _generator(ctx)
+    questions = _questions(ctx)
+    return lambda: generator.export_to_jsonl(questions, _path(ctx, "queries.jsonl")), ctx["n"]
+
+
+def bench_export_to_parquet(ctx):
+    generator = _generator(ctx)
+    questions = _questions(ctx)
+    path = _path(ctx, "responses.parquet")
+    return lambda: generator.export_to_parquet(questions, path), ctx["n"], _file_size(path)
+
+
+def bench_export_to_arrow(ctx):
+    from sen_survey.columnar_export import export_long_table
+    questions = _questions(ctx)
+    path = _path(ctx, "responses.arrow")
+    return (lambda: export_long_table(questions, path, file_format="arrow"), ctx["n"],
+            _file_size(path))
+
+
+def bench_read_csv(ctx):
+    """The wide CSV read back into pandas, as an analysis would."""
+    import pandas as pd
+    path = _exported(ctx, "csv")
+    return lambda: pd.read_csv(path), ctx["n"], _file_size(path)
+
+
+def bench_read_parquet(ctx):
+    from sen_survey.columnar_export import read_long_table
+    path = _exported(ctx, "parquet")
+    return lambda: read_long_table(path), ctx["n"], _file_size(path)
+
+
+def bench_read_arrow(ctx):
+    from sen_survey.columnar_export import read_long_table
+    path = _exported(ctx, "arrow")
+    return lambda: read_long_table(path), ctx["n"], _file_size(path)
+
+
+def bench_synthesize_queries(ctx):
+    generator = _generator(ctx)
+    return (lambda: list(generator.synthesize_queries(ctx["n"], seed=ctx["seed"]).iter_records()),
+            ctx["n"])
+
+
+def bench_query_ids(ctx):
+    from sen_survey.query_ids import QueryIdAllocator
+    allocator = QueryIdAllocator(worker_id=0)
+
+    def run():
+        for _ in range(ctx["n"]):
+            allocator.next_id()
+    return run, ctx["n"]
+
+
+def bench_dedup(ctx):
+    from sen_survey.dedup import QueryDeduplicator
+    queries = _queries(ctx)
+    deduplicator = QueryDeduplicator(threshold=0.8)
+    return lambda: sum(1 for _ in deduplicator.process(queries)), ctx["n"]
+
+
+def bench_diverse_options(ctx):
+    from sen_survey.option_selection import DiverseOptionSelector
+    generator = _generator(ctx)
+    questions = _questions(ctx)
+    return (lambda: generator.format_for_microsoft_forms(
+        questions, option_selector=DiverseOptionSelector(num_options=4)), ctx["n"])
+
+
+def bench_consensus(ctx):
+    from sen_survey.response_analysis import ResponseCorpus, analyze_consensus
+    corpus = ResponseCorpus.from_records(_questions(ctx))
+    return lambda: analyze_consensus(corpus), len(corpus)
+
+
+# name -> (setup, depends on the model count)
+CORE_STAGES = {
+    "create_teacher_query": (bench_create_teacher_query, False),
+    "generate_question_set": (bench_generate_question_set, True),
+    "get_responses_from_llm": (bench_get_responses_from_llm, True),
+    "format_for_microsoft_forms": (bench_format_for_microsoft_forms, True),
+    "export_to_csv": (bench_export_to_csv, True),
+    "create_forms_import_file": (bench_create_forms_import_file, True),
+}
+EXTENDED_STAGES = {
+    "stream_to_files": (bench_stream_to_files, True),
+    "generate_compact": (bench_generate_compact, True),
+    "generate_instrumented": (bench_generate_instrumented, True),
+    "generate_sharded": (bench_generate_sharded, True),
+    "replay": (bench_replay, True),
+    "export_to_jsonl": (bench_export_to_jsonl, True),
+    "export_to_parquet": (bench_export_to_parquet, True),
+    "export_to_arrow": (bench_export_to_arrow, True),
+    "read_csv": (bench_read_csv, True),
+    "read_parquet": (bench_read_parquet, True),
+    "read_arrow": (bench_read_arrow, True),
+    "synthesize_queries": (bench_synthesize_queries, False),
+    "query_ids": (bench_query_ids, False),
+    "dedup": (bench_dedup, False),
+    "diverse_options": (bench_diverse_options, True),
+    "consensus": (bench_consensus, True),
+}
+STAGES = {**CORE_STAGES, **EXTENDED_STAGES}
+
+
+# --- Running ---
+
+def measure(setup, ctx, repeat, memory):
+    """Median and best wall time over `repeat` runs, then peak traced memory of one more."""
+    timings = []
+    for _ in range(repeat):
+        run, items, *report = setup(ctx)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+        del run
+
+    result = {"items": items, "seconds": statistics.median(timings), "seconds_min": min(timings),
+              "repeat": repeat}
+    result["items_per_second"] = items / result["seconds"] if result["seconds"] else None
+    if report:
+        result.update(report[0]())
+    if memory:
+        run = setup(ctx)[0]
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(stages, sizes, model_counts, repeat=3, single_run_from=100_000, seed=0,
+              memory=True, log=print, save=None):
+    """
+    Runs every stage at every size (and model count); returns the results document.
+    `save(document)` is called after each measurement, so long runs keep partial results.
+    """
+    results = []
+    document = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "memory": memory,
+        },
+        "results": results,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            for index, count in enumerate(model_counts):
+                ctx = {"n": n, "models": MODEL_NAMES[:count], "seed": seed,
+                       "directory": directory}
+                for name in stages:
+                    setup, uses_models = STAGES[name]
+                    # Model-independent stages run once per size
+                    if not uses_models and index:
+                        continue
+                    entry = {"stage": name, "n": n, "models": count if uses_models else None}
+                    try:
+                        entry.update(measure(setup, ctx, repeat if n < single_run_from else 1,
+                                             memory))
+                    except ImportError as exc:
+                        entry["skipped"] = str(exc)
+                    results.append(entry)
+                    log(_format_entry(entry))
+                    if save is not None:
+                        save(document)
+                ctx.clear()
+    return document
+
+
+def _format_entry(entry):
+    label = f"{entry['stage']:<28} n={entry['n']:<7} models={entry['models'] or '-':<2}"
+    if "skipped" in entry:
+        return f"{label} skipped: {entry['skipped']}"
+    peak = f"  peak {entry['peak_bytes'] / 2**20:9.1f} MiB" if "peak_bytes" in entry else ""
+    size = f"  file {entry['file_bytes'] / 2**20:9.1f} MiB" if "file_bytes" in entry else ""
+    return (f"{label} {entry['seconds'] * 1000:11.2f} ms  "
+            f"{entry['seconds'] / entry['items'] * 1e6:9.2f} us/item{peak}{size}")
+
+
+# --- Peak RSS against N (one fresh process per measurement) ---
+
+# mode -> what the child process runs; "list" is the pipeline before streaming
+RSS_MODES = ("baseline", "list", "stream")
+
+
+def _rss_child(mode, n, models, directory, seed):
+    """Runs one pipeline in this process; returns (seconds, peak RSS bytes)."""
+    import resource
+    generator = SENQuestionGenerator(seed=seed)
+    models = MODEL_NAMES[:models]
+    paths = {name: os.path.join(directory, f"{mode}.{name}") for name in ("csv", "txt", "jsonl")}
+    start = time.perf_counter()
+    if mode == "list":
+        # Every stage materialises its full list before the next one starts
+        questions = generator.generate_question_set(n, models)
+        generator.export_to_csv(questions, paths["csv"])
+        generator.create_forms_import_file(
+            generator.format_for_microsoft_forms(questions), paths["txt"])
+        generator.export_to_jsonl(questions, paths["jsonl"])
+    elif mode == "stream":
+        generator.stream_to_files(
+            generator.iter_question_set(n, models), csv_filename=paths["csv"],
+            forms_filename=paths["txt"], jsonl_filename=paths["jsonl"])
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return seconds, peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_rss(sizes, models=4, modes=("list", "stream"), seed=0, log=print):
+    """
+    Peak RSS of each mode at each size, each in a new interpreter so earlier runs do not
+    raise the high-water mark. "baseline" (imports only) is measured once for reference.
+    Returns the results document.
+    """
+    try:
+        import resource  # noqa: F401
+    except ImportError as exc:
+        raise SystemExit(f"Peak RSS needs the resource module (Unix only): {exc}")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [("baseline", 0)] + [(mode, n) for n in sizes for mode in modes]
+        for mode, n in runs:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "rss-child", mode, str(n),
+                 str(models), directory, str(seed)],
+                check=True, capture_output=True, text=True).stdout
+            seconds, peak = json.loads(output.strip().splitlines()[-1])
+            entry = {"mode": mode, "n": n, "models": models, "seconds": seconds,
+                     "peak_rss_bytes": peak}
+            results.append(entry)
+            log(f"{mode:<9} n={n:<8} models={models}  {seconds:9.2f} s  "
+                f"peak RSS {peak / 2**20:8.1f} MiB")
+    return {"meta": {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     "commit": _git_commit(), "python": platform.python_version(),
+                     "platform": platform.platform(), "seed": seed},
+            "rss": results}
+
+
+# --- Comparing ---
+
+def _key(entry):
+    return entry["stage"], entry["n"], entry["models"]
+
+
+def compare_results(base, new, threshold=0.10, memory_threshold=0.10, min_seconds=0.002):
+    """
+    Pairs up the entries of two result documents. A stage regresses when its median time
+    grows by more than `threshold` (and by at least `min_seconds`, to ignore timer noise
+    on tiny inputs) or its peak memory by more than `memory_threshold`.
+    Returns a list of rows with the ratios and a "regressions" list per row.
+    """
+    base_entries = {_key(e): e for e in base["results"] if "skipped" not in e}
+    rows = []
+    for entry in new["results"]:
+        old = base_entries.get(_key(entry))
+        if old is None or "skipped" in entry:
+            continue
+        row = {"stage": entry["stage"], "n": entry["n"], "models": entry["models"],
+               "base_seconds": old["seconds"], "seconds": entry["seconds"],
+               "time_ratio": entry["seconds"] / old["seconds"] if old["seconds"] else None,
+               "regressions": []}
+        if row["time_ratio"] and row["time_ratio"] > 1 + threshold \
+                and entry["seconds"] - old["seconds"] >= min_seconds:
+            row["regressions"].append("time")
+        if "peak_bytes" in entry and "peak_bytes" in old:
+            row["memory_ratio"] = entry["peak_bytes"] / max(old["peak_bytes"], 1)
+            if row["memory_ratio"] > 1 + memory_threshold:
+                row["regressions"].append("memory")
+        rows.append(row)
+    return rows
+
+
+def _print_comparison(rows):
+    print(f"{'stage':<28} {'n':>7} {'models':>6} {'base ms':>11} {'new ms':>11} "
+          f"{'time':>7} {'memory':>7}")
+    for row in rows:
+        memory = f"{row['memory_ratio']:6.2f}x" if "memory_ratio" in row else "      -"
+        flag = f"  REGRESSION ({', '.join(row['regressions'])})" if row["regressions"] else ""
+        print(f"{row['stage']:<28} {row['n']:>7} {row['models'] or '-':>6} "
+              f"{row['base_seconds'] * 1000:11.2f} {row['seconds'] * 1000:11.2f} "
+              f"{row['time_ratio']:6.2f}x {memory}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Survey pipeline benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and store the results as JSON")
+    run.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100_000])
+    run.add_argument("--models", type=int, nargs="+", default=[1, 2, 4, 8],
+                     help=f"model counts (at most {len(MODEL_NAMES)})")
+    run.add_argument("--stages", nargs="+", default=list(CORE_STAGES),
+                     help="stage names, 'core' or 'all' "
+                          f"(extended: {', '.join(EXTENDED_STAGES)})")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--single-run-from", type=int, default=100_000,
+                     help="sizes from this one up are timed once")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    run.add_argument("-o", "--output", default="bench_pipeline.json")
+
+    compare = commands.add_parser("compare", help="flag regressions between two result files")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="allowed relative slowdown (default 10%%)")
+    compare.add_argument("--memory-threshold", type=float, default=0.10)
+    compare.add_argument("--min-seconds", type=float, default=0.002)
+
+    rss = commands.add_parser(
+        "rss", help="peak RSS against N of the list-building and the streaming pipeline")
+    rss.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    rss.add_argument("--models", type=int, default=4)
+    rss.add_argument("--modes", nargs="+", choices=RSS_MODES[1:], default=list(RSS_MODES[1:]))
+    rss.add_argument("--seed", type=int, default=0)
+    rss.add_argument("-o", "--output", default=None, help="also store the results as JSON")
+
+    child = commands.add_parser("rss-child", help="(internal) one measurement of rss")
+    for name, kind in (("mode", str), ("n", int), ("models", int), ("directory", str),
+                       ("seed", int)):
+        child.add_argument(name, type=kind)
+    args = parser.parse_args(argv)
+
+    if args.command == "rss-child":
+        print(json.dumps(_rss_child(args.mode, args.n, args.models, args.directory, args.seed)))
+        return 0
+    if args.command == "rss":
+        document = run_rss(args.sizes, args.models, args.modes, args.seed)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+        return 0
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        rows = compare_results(base, new, args.threshold, args.memory_threshold, args.min_seconds)
+        _print_comparison(rows)
+        regressions = sum(1 for row in rows if row["regressions"])
+        print(f"{regressions} regression(s) in {len(rows)} comparable benchmarks")
+        return 1 if regressions else 0
+
+    stages = []
+    for name in args.stages:
+        stages.extend({"core": CORE_STAGES, "all": STAGES}.get(name, [name]))
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    if max(args.models) > len(MODEL_NAMES):
+        parser.error(f"at most {len(MODEL_NAMES)} models")
+
+    def save(document):
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    run_suite(list(dict.fromkeys(stages)), args.sizes, args.models, args.repeat,
+              args.single_run_from, args.seed, not args.no_memory, save=save)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Benchmark: CLI and package start-up time (median of fresh interpreter runs)
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("numpy", "pandas", "pyarrow", "asyncio", "multiprocessing", "openpyxl")
+
+# Loaded heavy modules after running the given CLI arguments in-process
+_PROBE = """
+import sys
+from sen_survey.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+print("heavy:" + ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _run(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_command(args, cwd, repeat):
+    """Median wall time (s) of `python <args>` over `repeat` runs, after one warm-up."""
+    _run(args, cwd)
+    return statistics.median(_run(args, cwd) for _ in range(repeat))
+
+
+def heavy_imports(cli_args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES), *cli_args],
+        cwd=cwd, env=env, check=True, capture_output=True, text=True)
+    return result.stdout.rsplit("heavy:", 1)[-1].strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=25,
+                        help="size of the records file for the text-only export")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work:
+        cli = ["-m", "sen_survey"]
+        subprocess.run([sys.executable, *cli, "generate", "-n", str(args.queries), "--seed", "0",
+                        "--jsonl", "records.jsonl", "--csv", "", "--forms", ""],
+                       cwd=work, env=dict(os.environ, PYTHONPATH=ROOT), check=True,
+                       stderr=subprocess.DEVNULL)
+        export = ["export", "records.jsonl", "--csv", "out.csv", "--forms", "out.txt"]
+        cases = [
+            ("import sen_survey", ["-c", "import sen_survey"], None),
+            ("import sen_survey.multi_model", ["-c", "import sen_survey.multi_model"], None),
+            ("sen-survey --help", [*cli, "--help"], ["--help"]),
+            ("sen-survey generate --help", [*cli, "generate", "--help"], ["generate", "--help"]),
+            (f"sen-survey export ({args.queries} records, CSV + Forms)", [*cli, *export], export),
+        ]
+
+        # The interpreter's own start-up is outside our control; report overhead on top of it
+        baseline = time_command(["-c", "pass"], work, args.repeat)
+        print(f"{'python -c pass (baseline)':<45} {baseline * 1000:8.1f} ms")
+        for name, command, cli_args in cases:
+            elapsed = time_command(command, work, args.repeat)
+            heavy = heavy_imports(cli_args, work) if cli_args else ""
+            print(f"{name:<45} {elapsed * 1000:8.1f} ms  (+{(elapsed - baseline) * 1000:6.1f} ms)"
+                  f"  heavy imports: {heavy or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -87,17 +87,19 @@ class AdvancedSENSurveyManager:
             focused_ages = self.generator.age_groups
             
         scenarios = []
-        scenarios_per_combo = max(1, quantity // (len(focused_categories) * len(focused_ages)))
+        combos = [(sen_type, age_group) for age_group in focused_ages for sen_type in focused_categories]
+        # Spread the quantity over every combination instead of generating extra and truncating,
+        # which silently dropped the later SEN categories
+        scenarios_per_combo, leftover = divmod(quantity, len(combos))
         
-        for sen_type in focused_categories:
-            for age_group in focused_ages:
-                for _ in range(scenarios_per_combo):
-                    subject = random.choice(self.generator.subjects)
-                    scenario = self.generator.create_scenario(sen_type, age_group, subject)
-                    scenario['llm_responses'] = self.generator.generate_llm_responses(scenario['scenario_text'])
-                    scenarios.append(scenario)
+        for position, (sen_type, age_group) in enumerate(combos):
+            for _ in range(scenarios_per_combo + (1 if position < leftover else 0)):
+                subject = random.choice(self.generator.subjects)
+                scenario = self.generator.create_scenario(sen_type, age_group, subject)
+                scenario['llm_responses'] = self.generator.generate_llm_responses(scenario['scenario_text'])
+                scenarios.append(scenario)
         
-        return scenarios[:quantity]  # Trim to exact quantity requested
+        return scenarios
 
 # Create advanced manager
 advanced_manager = AdvancedSENSurveyManager(generator)
@@ -0,0 +1,35 @@
+"""
+SEN teacher survey generation, Microsoft Forms export and response analysis.
+
+Importing the package has no side effects and loads no submodules: the generators and
+helpers below are imported on first access, so `import sen_survey` and the CLI's --help
+stay fast. Command line: sen-survey --help (or python -m sen_survey --help).
+"""
+__version__ = "0.1.0"
+
+# Public name -> submodule defining it; resolved lazily by __getattr__
+_LAZY_EXPORTS = {
+    "SENQuestionGenerator": "multi_model",
+    "SingleModelGenerator": "single_model",
+    "QueryDeduplicator": "dedup",
+    "DiverseOptionSelector": "option_selection",
+    "ResponseCorpus": "response_analysis",
+    "analyze_consensus": "response_analysis",
+    "QuestionIndex": "response_ingestion",
+    "ingest_responses": "response_ingestion",
+    "build_preference_dataset": "preference_pairs",
+    "quality_leaderboard": "leaderboard",
+}
+
+__all__ = ["__version__", *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    module = import_module(f".{module_name}", __name__)
+    value = getattr(module, "SENQuestionGenerator" if name == "SingleModelGenerator" else name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,6 @@
+# python -m sen_survey ...
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,129 @@
+# Request batching: pack many teacher queries into one backend request
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+
+# asyncio is imported inside the async methods only: the synchronous run() path used by
+# generate_question_set should not pay its import time
+
+
+class RequestBatcher:
+    """
+    Collects (query_text, model_name, num_responses) requests into size/time-bounded batches,
+    dispatches each batch with one backend.generate_batch call and scatters the results back.
+
+    - run(requests) batches a known list synchronously (size-bounded).
+    - await submit(...) batches requests arriving over time (size- and time-bounded).
+      At most `max_concurrency` batches are in flight at once, and at most
+      `per_model_concurrency` for any one model (None = unbounded).
+    """
+
+    def __init__(self, backend, max_batch_size=16, max_wait=0.02,
+                 max_concurrency=None, per_model_concurrency=None):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.per_model_concurrency = per_model_concurrency
+        self.batches_sent = 0
+        self.requests_sent = 0
+
+        # (model_name, num_responses) -> list of (query_text, future) waiting to be sent
+        self._pending = defaultdict(list)
+        self._timers = {}
+        self._in_flight = set()
+        # Semaphores, created on first use inside the running event loop
+        self._global_limit = None
+        self._model_limits = {}
+
+    def _dispatch(self, prompts, model_name, num_responses):
+        results = self.backend.generate_batch(prompts, model_name, num_responses)
+        if len(results) != len(prompts):
+            raise ValueError(
+                f"Backend returned {len(results)} results for a batch of {len(prompts)} prompts")
+        self.batches_sent += 1
+        self.requests_sent += len(prompts)
+        return results
+
+    def run(self, requests):
+        """
+        Answer a list of (query_text, model_name, num_responses) tuples.
+        Returns the response lists in the same order as `requests`.
+        """
+        results = [None] * len(requests)
+
+        # 1. Group request positions by model and generation parameters
+        groups = defaultdict(list)
+        for position, (query_text, model_name, num_responses) in enumerate(requests):
+            groups[(model_name, num_responses)].append(position)
+
+        # 2. One backend call per chunk, scattered back by position
+        for (model_name, num_responses), positions in groups.items():
+            for start in range(0, len(positions), self.max_batch_size):
+                chunk = positions[start:start + self.max_batch_size]
+                prompts = [requests[p][0] for p in chunk]
+                for position, responses in zip(chunk, self._dispatch(prompts, model_name, num_responses)):
+                    results[position] = responses
+
+        return results
+
+    async def submit(self, query_text, model_name, num_responses=4):
+        """Queue one request; resolves once the batch it landed in has been answered."""
+        import asyncio
+
+        key = (model_name, num_responses)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key].append((query_text, future))
+
+        if len(self._pending[key]) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush, key)
+
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        if batch:
+            import asyncio
+            # Keep a reference so the send task is not garbage collected mid-flight
+            task = asyncio.ensure_future(self._send(key, batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, key, batch):
+        import asyncio
+
+        model_name, num_responses = key
+        prompts = [query_text for query_text, _ in batch]
+        try:
+            async with self._limits(model_name):
+                results = await asyncio.to_thread(
+                    self._dispatch, prompts, model_name, num_responses)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), responses in zip(batch, results):
+            if not future.done():
+                future.set_result(responses)
+
+    @asynccontextmanager
+    async def _limits(self, model_name):
+        """Hold this model's concurrency slot, then a global one, where they are bounded."""
+        import asyncio
+
+        if self._global_limit is None and self.max_concurrency is not None:
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        if model_name not in self._model_limits and self.per_model_concurrency is not None:
+            self._model_limits[model_name] = asyncio.Semaphore(self.per_model_concurrency)
+
+        async with AsyncExitStack() as stack:
+            for limit in (self._model_limits.get(model_name), self._global_limit):
+                if limit is not None:
+                    await stack.enter_async_context(limit)
+            yield
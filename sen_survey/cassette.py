@@ -0,0 +1,304 @@
+# Record/replay of model calls through a compact, indexed cassette file
+import hashlib
+import json
+import os
+import secrets
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+from .llm_backends import BackendError, LLMBackend
+
+CASSETTE_MAGIC = b"SENCASS1"
+# index offset, index length, magic
+_FOOTER = struct.Struct("<QQ8s")
+_KEY_SIZE = 16
+MODES = ("record", "replay", "passthrough")
+
+
+class CassetteMissError(BackendError, LookupError):
+    """
+    A strict replay met a request that is not on the cassette. A BackendError, so a
+    request that failed over while recording fails over the same way on replay.
+    """
+
+
+def request_key(model_name, prompt, num_responses):
+    """16-byte digest identifying one model request."""
+    return hashlib.blake2b(f"{model_name}\0{num_responses}\0{prompt}".encode("utf-8"),
+                           digest_size=_KEY_SIZE).digest()
+
+
+class Cassette:
+    """
+    Model requests and their responses in one file.
+
+    Layout: magic, then zlib-compressed blocks of distinct response payloads (identical
+    payloads are stored once), then a compressed index mapping each request key to the
+    payloads it received, in call order, and a fixed-size footer pointing at the index.
+
+    mode "record"       every request goes to the backend and is appended; close() writes
+                        the index and renames the file into place, so an interrupted
+                        recording never leaves a truncated cassette
+         "replay"       strict: requests are answered from the cassette only, an
+                        unrecorded one raises CassetteMissError
+         "passthrough"  recorded requests are replayed, the others go to the backend
+
+    A request made several times gets its recorded responses in the same order; once
+    they run out the last one is repeated. Decoded blocks are kept in an LRU of
+    `max_cached_blocks`, so replay runs at memory speed after the first touch. Repeated
+    strings (response types, templated contents) are shared between decoded payloads.
+
+    `run_id` and `created` are fixed when recording and read back on replay; the
+    generator derives query ids and created dates from them, so a replayed run writes
+    the same records as the recorded one.
+    """
+
+    def __init__(self, path, mode="replay", block_size=256 << 10, compresslevel=6,
+                 max_cached_blocks=256, max_shared_strings=100_000):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.max_cached_blocks = max_cached_blocks
+        self.max_shared_strings = max_shared_strings
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.backend_params = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Request key -> payload ids in call order
+        self._requests = {}
+        if mode == "record":
+            self.run_id = secrets.token_hex(4)
+            self.created = datetime.now().isoformat()
+            self._payload_ids = {}
+            self._block = []
+            self._block_bytes = 0
+            self._blocks = []
+            self._file = open(f"{path}.tmp", "wb")
+            self._file.write(CASSETTE_MAGIC)
+        else:
+            self._played = {}
+            self._decoded = OrderedDict()
+            self._strings = {}
+            self._file = open(path, "rb")
+            self._read_index()
+
+    # --- Reading ---
+
+    def _read_index(self):
+        self._file.seek(-_FOOTER.size, os.SEEK_END)
+        index_offset, index_length, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        self._file.seek(0)
+        if magic != CASSETTE_MAGIC or self._file.read(len(CASSETTE_MAGIC)) != CASSETTE_MAGIC:
+            raise ValueError(f"{self.path} is not a cassette file")
+
+        self._file.seek(index_offset)
+        index = zlib.decompress(self._file.read(index_length))
+        header_length = int.from_bytes(index[:4], "little")
+        header = json.loads(index[4:4 + header_length])
+        self.backend_params = header["backend"]
+        self.created = header["created"]
+        self.run_id = header.get("run_id") or header["created"]
+        self._blocks = header["blocks"]
+        # Payload id -> (block, position in block)
+        self._payload_slots = [(block, position)
+                               for block, (_, _, count) in enumerate(self._blocks)
+                               for position in range(count)]
+
+        position = 4 + header_length
+        num_keys = header["keys"]
+        keys = index[position:position + num_keys * _KEY_SIZE]
+        position += num_keys * _KEY_SIZE
+        counts = array("I")
+        counts.frombytes(index[position:position + num_keys * counts.itemsize])
+        position += num_keys * counts.itemsize
+        payloads = array("I")
+        payloads.frombytes(index[position:])
+
+        start = 0
+        for i, count in enumerate(counts):
+            self._requests[keys[i * _KEY_SIZE:(i + 1) * _KEY_SIZE]] = payloads[start:start + count]
+            start += count
+
+    def _payload(self, payload_id):
+        block, position = self._payload_slots[payload_id]
+        decoded = self._decoded.get(block)
+        if decoded is None:
+            offset, length, _ = self._blocks[block]
+            self._file.seek(offset)
+            decoded = json.loads(zlib.decompress(self._file.read(length)))
+            self._share_strings(decoded)
+            self._decoded[block] = decoded
+            if len(self._decoded) > self.max_cached_blocks:
+                self._decoded.popitem(last=False)
+        else:
+            self._decoded.move_to_end(block)
+        return decoded[position]
+
+    def _share_strings(self, payloads):
+        if len(self._strings) > self.max_shared_strings:
+            self._strings.clear()
+        strings = self._strings
+        for responses in payloads:
+            for response in responses:
+                for field, value in response.items():
+                    if type(value) is str:
+                        response[field] = strings.setdefault(value, value)
+
+    def lookup(self, key):
+        """The responses recorded for the next call of request `key`, or None."""
+        with self._lock:
+            payload_ids = self._requests.get(key)
+            if payload_ids is None:
+                self.misses += 1
+                return None
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+            self.hits += 1
+            payload = self._payload(payload_ids[min(played, len(payload_ids) - 1)])
+        # Fresh dicts, so callers may annotate the responses
+        return [dict(response) for response in payload]
+
+    # --- Recording ---
+
+    def record(self, key, responses, backend_params=None):
+        data = json.dumps(responses, ensure_ascii=False, separators=(",", ":"))
+        digest = hashlib.sha1(data.encode("utf-8")).digest()
+        with self._lock:
+            if self.backend_params is None:
+                self.backend_params = backend_params
+            payload_id = self._payload_ids.get(digest)
+            if payload_id is None:
+                payload_id = self._payload_ids[digest] = len(self._payload_ids)
+                self._block.append(data)
+                self._block_bytes += len(data)
+                if self._block_bytes >= self.block_size:
+                    self._flush_block()
+            self._requests.setdefault(key, array("I")).append(payload_id)
+            self.recorded += 1
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        compressed = zlib.compress(
+            ("[" + ",".join(self._block) + "]").encode("utf-8"), self.compresslevel)
+        self._blocks.append([self._file.tell(), len(compressed), len(self._block)])
+        self._file.write(compressed)
+        self._block = []
+        self._block_bytes = 0
+
+    def _write_index(self):
+        self._flush_block()
+        header = json.dumps({
+            "version": 1,
+            "created": self.created,
+            "run_id": self.run_id,
+            "backend": self.backend_params,
+            "requests": self.recorded,
+            "payloads": len(self._payload_ids),
+            "keys": len(self._requests),
+            "blocks": self._blocks,
+        }).encode("utf-8")
+        counts = array("I", (len(ids) for ids in self._requests.values()))
+        payloads = array("I")
+        for ids in self._requests.values():
+            payloads.extend(ids)
+        index = zlib.compress(
+            len(header).to_bytes(4, "little") + header + b"".join(self._requests)
+            + counts.tobytes() + payloads.tobytes(), self.compresslevel)
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(index_offset, len(index), CASSETTE_MAGIC))
+
+    def __len__(self):
+        """Number of distinct requests on the cassette."""
+        return len(self._requests)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self.mode == "record":
+            self._write_index()
+            self._file.close()
+            os.replace(f"{self.path}.tmp", self.path)
+        else:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CassetteBackend(LLMBackend):
+    """
+    Serves model calls from a Cassette, recording them in "record" mode. The generator
+    places it above the scheduler and instrumentation, so replays are neither throttled
+    nor timed, and below the response cache and hedging, so a fallback model's answer
+    is recorded under the fallback model. `backend` may be None for a strict replay.
+    """
+
+    def __init__(self, backend, cassette):
+        if backend is None and cassette.mode != "replay":
+            raise ValueError(f"a backend is required in {cassette.mode} mode")
+        self.backend = backend
+        self.cassette = cassette
+
+    def cache_params(self):
+        if self.backend is not None:
+            return self.backend.cache_params()
+        return self.cassette.backend_params or {"backend": "cassette"}
+
+    def _replay(self, query_text, model_name, num_responses):
+        """Recorded responses, None for a passthrough miss; raises for a strict miss."""
+        responses = self.cassette.lookup(request_key(model_name, query_text, num_responses))
+        if responses is None and self.cassette.mode == "replay":
+            raise CassetteMissError(f"No recording of {model_name} for: {query_text[:80]!r}")
+        return responses
+
+    def generate(self, query_text, model_name, num_responses=4):
+        if self.cassette.mode != "record":
+            responses = self._replay(query_text, model_name, num_responses)
+            if responses is not None:
+                return responses
+            return self.backend.generate(query_text, model_name, num_responses)
+
+        responses = self.backend.generate(query_text, model_name, num_responses)
+        self.cassette.record(request_key(model_name, query_text, num_responses), responses,
+                             self.backend.cache_params())
+        return responses
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        if self.cassette.mode != "record":
+            return LLMBackend.generate_batch(self, prompts, model_name, num_responses)
+        results = self.backend.generate_batch(prompts, model_name, num_responses)
+        params = self.backend.cache_params()
+        for prompt, responses in zip(prompts, results):
+            self.cassette.record(request_key(model_name, prompt, num_responses), responses,
+                                 params)
+        return results
+
+    async def agenerate(self, query_text, model_name, num_responses=4):
+        if self.cassette.mode == "record":
+            # Recorded through generate, in a worker thread
+            return await super().agenerate(query_text, model_name, num_responses)
+        responses = self._replay(query_text, model_name, num_responses)
+        if responses is not None:
+            return responses
+        return await self.backend.agenerate(query_text, model_name, num_responses)
+
+    def close(self):
+        self.cassette.close()
+        if self.backend is not None:
+            self.backend.close()
@@ -0,0 +1,120 @@
+# Durable, resumable checkpoints for long generation runs
+import json
+import os
+
+from .prompt_templates import intern_fields
+
+
+class RunCheckpoint:
+    """
+    Append-only JSONL log of the query records completed in one run.
+
+    The first line describes the run (id, number of queries, models); every following
+    line is {"index": i, "record": {...}} and is flushed (and fsync'ed) as soon as the
+    query finishes (a None record marks a query dropped by dedup). Rerunning with the
+    same run_id skips the indices already logged.
+    """
+
+    def __init__(self, run_id, directory="checkpoints", fsync=True):
+        self.run_id = run_id
+        self.directory = directory
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self.fsync = fsync
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _read_lines(self):
+        """
+        Yields (offset, parsed line, length) of the complete lines. A line counts only
+        once its newline is written; reading stops at the first torn or corrupt line.
+        """
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Partially written line (process died mid-write); it will be redone
+                    break
+                try:
+                    line = json.loads(raw)
+                except ValueError:
+                    break
+                yield offset, line, len(raw)
+                offset += len(raw)
+
+    def header(self):
+        if not self.exists():
+            return None
+        for _, line, _ in self._read_lines():
+            return line
+        return None
+
+    def open(self, num_queries, models, seed=None, num_responses=4):
+        """Start or resume the run; refuses to resume a run created with other settings."""
+        os.makedirs(self.directory, exist_ok=True)
+        header = self.header()
+        settings = {"run_id": self.run_id, "num_queries": num_queries, "models": list(models),
+                    "seed": seed, "num_responses": num_responses}
+        if header is not None and header != settings:
+            raise ValueError(
+                f"Checkpoint {self.path} was created with {header}, not {settings}")
+
+        self._truncate_torn_tail()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if header is None:
+            self._write_line(settings)
+        return self
+
+    def _truncate_torn_tail(self):
+        """Cut the log after its last complete line, so new lines are never lost behind it."""
+        if not self.exists():
+            return
+        end = 0
+        for offset, _, length in self._read_lines():
+            end = offset + length
+        if end != os.path.getsize(self.path):
+            with open(self.path, 'rb+') as f:
+                f.truncate(end)
+
+    def _write_line(self, payload):
+        self._file.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, index, record):
+        self._write_line({"index": index, "record": record})
+
+    def completed_indices(self):
+        if not self.exists():
+            return set()
+        return {line["index"] for _, line, _ in self._read_lines() if "index" in line}
+
+    def iter_records(self):
+        """Completed records in query order, read back one at a time."""
+        if not self.exists():
+            return
+        positions = {}
+        for offset, line, _ in self._read_lines():
+            if "index" in line:
+                positions.setdefault(line["index"], offset)
+
+        with open(self.path, 'rb') as f:
+            for index in sorted(positions):
+                f.seek(positions[index])
+                record = json.loads(f.readline())["record"]
+                if record is not None:
+                    # Parsed JSON holds a fresh copy of every repeated label; share them
+                    yield intern_fields(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
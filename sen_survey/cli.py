@@ -0,0 +1,258 @@
+# Command-line entry point: sen-survey {generate,export,analyze}
+# Only argparse is imported up front; every command imports what it needs when it runs,
+# so --help and text-only exports never load numpy, pandas or asyncio.
+import argparse
+import json
+import sys
+
+from . import __version__
+
+DEFAULT_MODELS = ["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"]
+
+# generate options the single-model generator has no equivalent for
+SINGLE_MODEL_UNSUPPORTED = ["seed", "dedup", "dedup_threshold", "run_id", "jsonl", "metrics",
+                            "trace", "record", "replay", "passthrough", "options_model",
+                            "diverse_options"]
+
+
+def _read_jsonl(filename):
+    """Query records from a JSONL file (generate --jsonl / export_to_jsonl)."""
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _option_selector(args):
+    if not args.diverse_options:
+        return None
+    from .option_selection import DiverseOptionSelector
+    return DiverseOptionSelector(num_options=4)
+
+
+def _write_json(payload, output):
+    text = json.dumps(payload, indent=2, ensure_ascii=False, default=float)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def cmd_generate(args):
+    if args.single_model:
+        from .single_model import SENQuestionGenerator
+        generator = SENQuestionGenerator(model_name=args.models[0])
+        queries = generator.generate_question_set(num_questions=args.num_queries)
+        if args.csv:
+            generator.export_to_csv(queries, args.csv)
+        if args.forms:
+            generator.create_forms_import_file(
+                generator.format_for_microsoft_forms(queries), args.forms)
+        return 0
+
+    from .cassette import Cassette, CassetteMissError
+    from .multi_model import SENQuestionGenerator
+    metrics = None
+    if args.metrics or args.trace:
+        from .instrumentation import Metrics
+        metrics = Metrics()
+    cassette = None
+    if args.record or args.replay:
+        cassette = Cassette(args.record, mode="record") if args.record else Cassette(
+            args.replay, mode="passthrough" if args.passthrough else "replay")
+    generator = SENQuestionGenerator(seed=args.seed, metrics=metrics, cassette=cassette)
+    try:
+        dedup = None
+        if args.dedup:
+            from .dedup import QueryDeduplicator
+            dedup = QueryDeduplicator(threshold=args.dedup_threshold, mode=args.dedup)
+        if args.run_id:
+            checkpoint = generator.run_with_checkpoint(
+                args.run_id, num_queries=args.num_queries, models=args.models, dedup=dedup)
+            questions = checkpoint.iter_records()
+        else:
+            questions = generator.iter_question_set(args.num_queries, args.models, dedup=dedup)
+
+        count = generator.stream_to_files(
+            questions, csv_filename=args.csv, forms_filename=args.forms,
+            jsonl_filename=args.jsonl, default_model_for_options=args.options_model,
+            option_selector=_option_selector(args))
+    except CassetteMissError as exc:
+        print(f"sen-survey: {exc}\n{args.replay} has no recording of this call; replay with "
+              f"the --seed, -n and --models it was recorded with, or add --passthrough",
+              file=sys.stderr)
+        return 1
+    finally:
+        # Also writes the cassette's index
+        generator.close()
+        # Written for failed runs too: that is when the numbers matter most
+        if args.metrics:
+            metrics.write_prometheus(args.metrics)
+        if args.trace:
+            metrics.write_trace(args.trace)
+    print(f"Generated {count} queries answered by {len(args.models)} models", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args):
+    from .multi_model import SENQuestionGenerator
+    generator = SENQuestionGenerator()
+    if args.parquet:
+        generator.export_to_parquet(_read_jsonl(args.input), args.parquet)
+    if args.csv or args.forms:
+        generator.stream_to_files(
+            _read_jsonl(args.input), csv_filename=args.csv, forms_filename=args.forms,
+            default_model_for_options=args.options_model,
+            option_selector=_option_selector(args))
+    return 0
+
+
+def cmd_leaderboard(args):
+    from .leaderboard import (add_template_column, quality_leaderboard, read_scores,
+                              scores_frame)
+    from .multi_model import SENQuestionGenerator
+
+    if args.input.endswith(".jsonl"):
+        frame = scores_frame(_read_jsonl(args.input))
+    else:
+        frame = read_scores(args.input)
+    dimensions = list(args.by)
+    if "template" in dimensions:
+        add_template_column(frame, SENQuestionGenerator().teacher_question_templates)
+    table = quality_leaderboard(frame, dimensions=dimensions, n_boot=args.n_boot,
+                                seed=args.seed)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+    return 0
+
+
+def cmd_consensus(args):
+    from .response_analysis import ResponseCorpus, analyze_consensus
+
+    if args.input.endswith(".jsonl"):
+        corpus = ResponseCorpus.from_records(_read_jsonl(args.input))
+    else:
+        corpus = ResponseCorpus.from_csv(args.input)
+    result = analyze_consensus(corpus, threshold=args.threshold, k=args.k)
+    _write_json({"responses": len(corpus),
+                 "corpus_clusters": int(len(set(result["corpus_cluster"].tolist()))),
+                 "models": result["models"]}, args.output)
+    return 0
+
+
+def cmd_win_rates(args):
+    from .multi_model import SENQuestionGenerator
+    from .response_ingestion import QuestionIndex, ingest_responses
+
+    generator = SENQuestionGenerator()
+    # Question numbers follow the record order, as in the Forms file built from them
+    index = QuestionIndex.from_forms(generator.iter_forms_data(
+        _read_jsonl(args.questions), args.options_model, _option_selector(args)))
+    tally = ingest_responses(args.responses, index, sheet=args.sheet)
+    _write_json(tally.summary(), args.output)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="sen-survey",
+        description="Generate SEN teacher survey questions, export them for Microsoft "
+                    "Forms and analyse the results.")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--options-model", default="GPT-4o",
+                         help="model whose responses become the Forms options")
+    options.add_argument("--diverse-options", action="store_true",
+                         help="pick the 4 most diverse responses across all models instead")
+
+    generate = commands.add_parser(
+        "generate", parents=[options], help="generate queries and model responses")
+    generate.add_argument("-n", "--num-queries", type=int, default=25)
+    generate.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--csv", default="sen_survey_teacher_queries_multi_model.csv",
+                          help="flattened CSV (pass '' to skip)")
+    generate.add_argument("--forms", default="microsoft_forms_teacher_queries_import.txt",
+                          help="Microsoft Forms import text (pass '' to skip)")
+    generate.add_argument("--jsonl", default=None, help="also write the full records")
+    generate.add_argument("--dedup", choices=["filter", "merge"], default=None,
+                          help="drop or merge near-duplicate queries")
+    generate.add_argument("--dedup-threshold", type=float, default=0.8)
+    generate.add_argument("--run-id", default=None,
+                          help="checkpoint every query and resume an interrupted run")
+    generate.add_argument("--metrics", default=None,
+                          help="write counters and latency quantiles (Prometheus text format)")
+    generate.add_argument("--trace", default=None,
+                          help="write a JSON trace of every stage and model call (Perfetto)")
+    cassette = generate.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE", default=None,
+                          help="record every model call of the run")
+    cassette.add_argument("--replay", metavar="CASSETTE", default=None,
+                          help="answer model calls from a recording (use the same --seed)")
+    generate.add_argument("--passthrough", action="store_true",
+                          help="with --replay, send unrecorded calls to the backend "
+                               "instead of failing")
+    generate.add_argument("--single-model", action="store_true",
+                          help="use the single-model generator (first of --models); only "
+                               "-n, --models, --csv and --forms apply")
+    generate.set_defaults(handler=cmd_generate)
+
+    export = commands.add_parser(
+        "export", parents=[options], help="re-export records from a JSONL file")
+    export.add_argument("input", help="records written by generate --jsonl")
+    export.add_argument("--csv", default=None)
+    export.add_argument("--forms", default=None)
+    export.add_argument("--parquet", default=None, help="long-format Parquet (needs pyarrow)")
+    export.set_defaults(handler=cmd_export)
+
+    analyze = commands.add_parser("analyze", help="analyse generated data or survey results")
+    analyses = analyze.add_subparsers(dest="analysis", metavar="ANALYSIS", required=True)
+
+    leaderboard = analyses.add_parser(
+        "leaderboard", help="quality-score statistics per model/category (needs pandas)")
+    leaderboard.add_argument("input", help="records .jsonl, wide .csv or long .parquet")
+    leaderboard.add_argument("--by", nargs="+",
+                             default=["model", "sen_category", "age_group", "template"])
+    leaderboard.add_argument("--n-boot", type=int, default=1000)
+    leaderboard.add_argument("--seed", type=int, default=0)
+    leaderboard.add_argument("-o", "--output", default=None, help="CSV file (default: print)")
+    leaderboard.set_defaults(handler=cmd_leaderboard)
+
+    consensus = analyses.add_parser(
+        "consensus", help="cross-model agreement and outlier rates per model")
+    consensus.add_argument("input", help="records .jsonl or the wide .csv")
+    consensus.add_argument("--threshold", type=float, default=0.8)
+    consensus.add_argument("-k", type=int, default=10)
+    consensus.add_argument("-o", "--output", default=None, help="JSON file (default: print)")
+    consensus.set_defaults(handler=cmd_consensus)
+
+    win_rates = analyses.add_parser(
+        "win-rates", parents=[options], help="teacher choices per model, option and type")
+    win_rates.add_argument("responses", nargs="+", help="Forms/Excel/CSV response exports")
+    win_rates.add_argument("--questions", required=True,
+                           help="records .jsonl the Forms file was generated from")
+    win_rates.add_argument("--sheet", default=None, help="worksheet of .xlsx exports")
+    win_rates.add_argument("-o", "--output", default=None, help="JSON file (default: print)")
+    win_rates.set_defaults(handler=cmd_win_rates)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "single_model", False):
+        defaults = vars(parser.parse_args(["generate"]))
+        unsupported = ["--" + name.replace("_", "-") for name in SINGLE_MODEL_UNSUPPORTED
+                       if getattr(args, name) != defaults[name]]
+        if unsupported:
+            parser.error(f"--single-model does not support {', '.join(unsupported)}")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# Long/tidy columnar export: one row per (query, model, response) in Parquet or Arrow IPC
+from .records import iter_model_responses
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError(
+            "Columnar export needs pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def long_schema():
+    """Fixed schema; the model list lives in the data, so it never changes the columns."""
+    pa = _require_pyarrow()
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("question_id", pa.string()),
+        ("sen_category", categorical),
+        ("age_group", categorical),
+        ("subject", categorical),
+        ("difficulty_level", categorical),
+        ("priority", categorical),
+        ("teacher_query", pa.string()),
+        ("created_date", pa.string()),
+        ("model", categorical),
+        ("response_rank", pa.int16()),
+        ("response_type", categorical),
+        ("content", pa.string()),
+        ("quality_score", pa.float64()),
+    ])
+
+
+def iter_long_rows(questions):
+    """Flattens nested question records into one dict per (query, model, response)."""
+    for question in questions:
+        for model_name, responses in iter_model_responses(question):
+            for rank, response in enumerate(responses, 1):
+                yield {
+                    "question_id": question['id'],
+                    "sen_category": question['sen_category'],
+                    "age_group": question['age_group'],
+                    "subject": question['subject'],
+                    "difficulty_level": question.get('difficulty_level'),
+                    "priority": question.get('priority'),
+                    "teacher_query": question['teacher_query_text'],
+                    "created_date": question.get('created_date'),
+                    "model": model_name,
+                    "response_rank": rank,
+                    "response_type": response['type'],
+                    "content": response['content'],
+                    "quality_score": response['quality_score'],
+                }
+
+
+def _iter_tables(questions, row_group_size):
+    """Buffers at most `row_group_size` long rows and emits them as Arrow tables."""
+    pa = _require_pyarrow()
+    schema = long_schema()
+    names = schema.names
+    columns = {name: [] for name in names}
+    buffered = 0
+
+    def to_table():
+        arrays = []
+        for field in schema:
+            values = columns[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    for row in iter_long_rows(questions):
+        for name in names:
+            columns[name].append(row[name])
+        buffered += 1
+        if buffered >= row_group_size:
+            yield to_table()
+            columns = {name: [] for name in names}
+            buffered = 0
+
+    if buffered:
+        yield to_table()
+
+
+def export_long_table(questions, filename="sen_survey_responses_long.parquet",
+                      file_format="parquet", row_group_size=65_536, compression="zstd"):
+    """
+    Writes the long-format table, one row group per `row_group_size` rows, so memory is
+    bounded by the row group rather than the survey size.
+    file_format: "parquet" or "arrow" (Arrow IPC stream; unlike the IPC file format it
+    lets each row group carry its own dictionaries).
+    Returns the number of rows written.
+    """
+    pa = _require_pyarrow()
+    schema = long_schema()
+    rows = 0
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(filename, schema, compression=compression) as writer:
+            for table in _iter_tables(questions, row_group_size):
+                writer.write_table(table, row_group_size=row_group_size)
+                rows += table.num_rows
+    elif file_format == "arrow":
+        import pyarrow.ipc as ipc
+        options = ipc.IpcWriteOptions(
+            compression=None if compression in (None, "snappy") else compression)
+        with pa.OSFile(filename, "wb") as sink, ipc.new_stream(sink, schema, options=options) as writer:
+            for table in _iter_tables(questions, row_group_size):
+                for batch in table.to_batches():
+                    writer.write_batch(batch)
+                rows += table.num_rows
+    else:
+        raise ValueError(
+            f"Unknown file_format {file_format!r}; use 'parquet' or 'arrow'")
+
+    return rows
+
+
+def read_long_table(filename, columns=None):
+    """Reads a long-format export back as a pandas DataFrame (categoricals preserved)."""
+    pa = _require_pyarrow()
+    if filename.endswith(".arrow") or filename.endswith(".arrows"):
+        with pa.OSFile(filename, "rb") as source:
+            table = pa.ipc.open_stream(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+    import pyarrow.parquet as pq
+    return pq.read_table(filename, columns=columns).to_pandas()
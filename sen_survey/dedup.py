@@ -0,0 +1,251 @@
+# Near-duplicate teacher query detection with MinHash + locality-sensitive hashing
+import functools
+import re
+import zlib
+from itertools import islice
+
+import numpy as np
+
+_SHIFT = np.uint64(32)
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text, size=3):
+    """Word n-grams of the lower-cased text (the whole text if it is shorter than `size`)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    Fixed family of `num_perm` multiply-shift hash functions over 32-bit shingle hashes:
+    h(x) = (a*x + b) mod 2^64 >> 32. Wrapping uint64 arithmetic replaces the modulo by a
+    prime, which is the expensive part of the textbook (a*x + b) mod p.
+    """
+
+    def __init__(self, num_perm=128, seed=1, shingle_size=3):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Odd multipliers keep every h a permutation of the high bits
+        self.a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+
+    def _permute(self, hashes):
+        """One row per hash function, one column per shingle, as uint32."""
+        return ((self.a[:, None] * hashes + self.b[:, None]) >> _SHIFT).astype(np.uint32)
+
+    def shingle_hashes(self, text):
+        """Sorted, distinct 32-bit hashes of the text's shingles (its set for exact Jaccard)."""
+        return np.unique(np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)),
+            dtype=np.uint32))
+
+    def signature(self, text, hashes=None):
+        if hashes is None:
+            hashes = self.shingle_hashes(text)
+        return self._permute(hashes.astype(np.uint64)).min(axis=1)
+
+    def signatures(self, texts, hashed=None):
+        """
+        Signatures of many texts in one vectorized pass; returns a (len(texts), num_perm)
+        array. `hashed` may give their shingle_hashes, when already computed.
+        """
+        if hashed is None:
+            hashed = [self.shingle_hashes(text) for text in texts]
+        lengths = np.array([len(h) for h in hashed])
+        flat = np.concatenate(hashed).astype(np.uint64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # Rows are contiguous per hash function, so the segmented min runs along memory
+        return np.minimum.reduceat(self._permute(flat), starts, axis=1).T
+
+
+def estimate_jaccard(signature_a, signature_b):
+    return float(np.mean(signature_a == signature_b))
+
+
+class MinHashLSHIndex:
+    """
+    Banded LSH over MinHash signatures: a text is a candidate duplicate of every indexed
+    text that agrees with it on all rows of at least one band. Lookups only touch those
+    buckets, so the cost does not grow with the number of indexed texts.
+
+    Candidates whose estimated similarity is within `estimate_margin` of the threshold
+    (default: three standard errors of the estimate, 0.106 at 0.8 with 128 functions)
+    are verified by exact Jaccard over their shingle hashes, so the signature's noise
+    neither drops nor admits pairs.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, seed=1, shingle_size=3,
+                 false_negative_weight=0.95, estimate_margin=None):
+        self.threshold = threshold
+        if estimate_margin is None:
+            estimate_margin = 3 * (threshold * (1 - threshold) / num_perm) ** 0.5
+        self.estimate_margin = estimate_margin
+        self.hasher = MinHasher(num_perm, seed, shingle_size)
+        self.bands, self.rows = self._optimal_bands(threshold, num_perm, false_negative_weight)
+        self.buckets = [{} for _ in range(self.bands)]
+        # Row i of _matrix is the signature of _keys[i]; grown by doubling
+        self._keys = []
+        self._matrix = np.empty((1024, num_perm), dtype=np.uint32)
+        # Shingle hashes of _keys[i] are _hashes[_offsets[i]:_offsets[i + 1]]
+        self._hashes = np.empty(1 << 15, dtype=np.uint32)
+        self._offsets = np.zeros(1025, dtype=np.int64)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _optimal_bands(threshold, num_perm, false_negative_weight=0.95):
+        """
+        (bands, rows), bands * rows <= num_perm, minimising the weighted false-negative
+        area above the threshold plus false-positive area below it under the S-curve
+        P(candidate | s) = 1 - (1 - s^rows)^bands. A false positive only costs one
+        verification while a false negative loses a duplicate, hence the 0.95 weight;
+        at 0.8 this picks 16 x 8 (midpoint 0.67; 95% of pairs at 0.8 and 99% at 0.84
+        become candidates).
+        """
+        similarity = np.linspace(0.0, 1.0, 2001)
+        below = similarity < threshold
+        best = None
+        for bands in range(1, num_perm + 1):
+            for rows in range(1, num_perm // bands + 1):
+                candidate = 1 - (1 - similarity ** rows) ** bands
+                false_positive = candidate[below].mean() * threshold
+                false_negative = (1 - candidate[~below]).mean() * (1 - threshold)
+                error = ((1 - false_negative_weight) * false_positive
+                         + false_negative_weight * false_negative)
+                if best is None or error < best[0]:
+                    best = (error, bands, rows)
+        return best[1], best[2]
+
+    def _band_keys(self, signature):
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def query(self, text, signature=None, hashes=None):
+        """Returns [(key, Jaccard similarity)] of indexed texts at or above the threshold."""
+        if hashes is None:
+            hashes = self.hasher.shingle_hashes(text)
+        if signature is None:
+            signature = self.hasher.signature(text, hashes)
+
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        if not candidates:
+            return []
+
+        # 1. Score every candidate in one comparison against the stacked signatures
+        rows = np.sort(np.fromiter(candidates, dtype=np.int64, count=len(candidates)))
+        estimates = (self._matrix[rows] == signature).mean(axis=1)
+        rows = rows[estimates >= self.threshold - self.estimate_margin]
+        if not len(rows):
+            return []
+
+        # 2. Verify the plausible ones exactly, in one pass over their shingle hashes
+        starts, lengths = self._offsets[rows], self._offsets[rows + 1] - self._offsets[rows]
+        segments = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) + np.repeat(starts - segments, lengths)
+        # shingle_hashes are sorted, so membership is one binary search per hash
+        gathered = self._hashes[positions]
+        found = hashes[np.minimum(np.searchsorted(hashes, gathered), len(hashes) - 1)] == gathered
+        common = np.add.reduceat(found, segments)
+        similarities = common / (lengths + len(hashes) - common)
+        keep = similarities >= self.threshold
+        order = np.argsort(-similarities[keep], kind="stable")
+        return [(self._keys[row], float(similarity))
+                for row, similarity in zip(rows[keep][order], similarities[keep][order])]
+
+    def insert(self, key, text, signature=None, hashes=None):
+        if hashes is None:
+            hashes = self.hasher.shingle_hashes(text)
+        if signature is None:
+            signature = self.hasher.signature(text, hashes)
+        row = len(self._keys)
+        if row == len(self._matrix):
+            self._matrix = np.concatenate(
+                [self._matrix, np.empty_like(self._matrix)])
+        self._matrix[row] = signature
+        if row + 1 == len(self._offsets):
+            self._offsets = np.concatenate([self._offsets, np.empty_like(self._offsets)])
+        start = self._offsets[row]
+        end = self._offsets[row + 1] = start + len(hashes)
+        while end > len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.empty_like(self._hashes)])
+        self._hashes[start:end] = hashes
+        self._keys.append(key)
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(band_key, []).append(row)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class QueryDeduplicator:
+    """
+    Dedup stage placed before the model calls.
+
+    mode="filter": near-duplicate queries are dropped.
+    mode="merge":  near-duplicates are kept but flagged with `duplicate_of` (the id of the
+                   first similar query) so they can reuse that query's responses.
+    """
+
+    def __init__(self, threshold=0.8, mode="filter", num_perm=128, seed=1):
+        if mode not in ("filter", "merge"):
+            raise ValueError(f"Unknown dedup mode {mode!r}; use 'filter' or 'merge'")
+        self.mode = mode
+        self.index = MinHashLSHIndex(threshold, num_perm, seed)
+        self.seen = 0
+        self.duplicates = 0
+        # Verbatim repeats are resolved here without hashing: text -> representative id
+        self._known = {}
+
+    def check(self, query_data, signature=None, hashes=None):
+        """Returns the id of an earlier near-duplicate, or None (and indexes the query)."""
+        self.seen += 1
+        text = query_data["teacher_query_text"]
+        if text in self._known:
+            self.duplicates += 1
+            return self._known[text]
+        if hashes is None:
+            hashes = self.index.hasher.shingle_hashes(text)
+        if signature is None:
+            signature = self.index.hasher.signature(text, hashes)
+        matches = self.index.query(text, signature, hashes)
+        if matches:
+            self.duplicates += 1
+            self._known[text] = matches[0][0]
+            return matches[0][0]
+        self.index.insert(query_data["id"], text, signature, hashes)
+        self._known[text] = query_data["id"]
+        return None
+
+    def process(self, queries, chunk_size=4096):
+        """
+        Yields the queries that should be sent to the models (see `mode`).
+        Signatures are computed a chunk at a time with one vectorized pass.
+        """
+        queries = iter(queries)
+        while True:
+            chunk = list(islice(queries, chunk_size))
+            if not chunk:
+                return
+            # Only distinct texts that are not already indexed verbatim need a signature
+            texts = [text for text in dict.fromkeys(
+                query_data["teacher_query_text"] for query_data in chunk)
+                if text not in self._known]
+            hashed = [self.index.hasher.shingle_hashes(text) for text in texts]
+            signatures = dict(zip(texts, self.index.hasher.signatures(texts, hashed))) if texts else {}
+            hashed = dict(zip(texts, hashed))
+            for query_data in chunk:
+                text = query_data["teacher_query_text"]
+                original = self.check(query_data, signatures.get(text), hashed.get(text))
+                if original is None:
+                    yield query_data
+                elif self.mode == "merge":
+                    yield {**query_data, "duplicate_of": original}
+
+    def stats(self):
+        return {"seen": self.seen, "duplicates": self.duplicates,
+                "unique": self.seen - self.duplicates, "indexed": len(self.index)}
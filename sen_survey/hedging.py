@@ -0,0 +1,306 @@
+# Tail-latency controls for model calls: hedged requests, per-model deadlines and
+# circuit breakers that fail over to a fallback model
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .instrumentation import LatencyHistogram
+from .llm_backends import BackendError, LLMBackend
+
+
+class DeadlineExceeded(BackendError):
+    """A model call, hedges included, did not finish within the model's deadline."""
+
+    def __init__(self, message):
+        super().__init__(message, status_code=504)
+
+
+class CircuitOpenError(BackendError):
+    """The model's circuit breaker is open and there is no fallback to answer instead."""
+
+    def __init__(self, message):
+        super().__init__(message, status_code=503)
+
+
+class CircuitBreaker:
+    """
+    closed     calls go through; `failure_threshold` consecutive failures open the breaker
+    open       calls are refused until `reset_timeout` seconds have passed
+    half_open  one trial call goes through: success closes the breaker, failure re-opens it
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial_running = False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = self.clock()
+
+
+class LatencyRecorder(LLMBackend):
+    """
+    Per-model latency of the successful calls that reach `backend`. HedgedBackend hedges
+    at these quantiles; the generator places the recorder below the response cache and
+    the cassette, so instant cache hits and replays do not drag the p95 down.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def quantile(self, model_name, q, min_samples=1):
+        """Observed q-quantile of `model_name` calls, None while below `min_samples`."""
+        with self._lock:
+            histogram = self.histograms.get(model_name)
+            if histogram is None or histogram.count < min_samples:
+                return None
+            return histogram.quantile(q)
+
+    def _observe(self, model_name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(model_name)
+            if histogram is None:
+                histogram = self.histograms[model_name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def generate(self, query_text, model_name, num_responses=4):
+        start = time.perf_counter()
+        responses = self.backend.generate(query_text, model_name, num_responses)
+        self._observe(model_name, time.perf_counter() - start)
+        return responses
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        # A batch's latency says little about a single call's; not recorded
+        return self.backend.generate_batch(prompts, model_name, num_responses)
+
+    def close(self):
+        self.backend.close()
+
+
+class HedgedBackend(LLMBackend):
+    """
+    Wraps a backend (outermost, so the response cache and the cassette only ever see
+    the model that really answered, and retries happen inside each attempt) with:
+
+    hedging    a call still running after the model's observed `hedge_quantile` latency
+               (p95, once `min_samples` calls have finished) gets a duplicate request;
+               the first answer wins. At most `max_hedges` duplicates per call.
+    deadlines  {"GPT-4o": 20.0}, or `default_deadline`, bounds a call including its
+               hedges; a late call raises DeadlineExceeded
+    failover   each model has a CircuitBreaker; when a call fails or the breaker is open,
+               fallbacks={"Llama 3": "GPT-4o"} answers from the fallback model instead and
+               every response carries "fallback_model". Without a fallback the error
+               (or CircuitOpenError) is raised.
+
+    A running thread cannot be cancelled, so attempts still running at the deadline are
+    abandoned; while `max_abandoned` of a model's attempts are still running, new calls
+    to it fail at once (and fail over) instead of filling the `max_workers` pool.
+
+    Latencies come from `latencies` (a LatencyRecorder somewhere below), or from one
+    wrapped directly around `backend` when not given. Batches are not hedged (a
+    duplicate would repeat the whole batch) but still go through the breaker and
+    fallback. Async calls run the hedged call in a worker thread.
+    """
+
+    def __init__(self, backend, hedge_quantile=0.95, min_samples=20, min_hedge_delay=0.0,
+                 max_hedges=1, deadlines=None, default_deadline=None, fallbacks=None,
+                 failure_threshold=5, reset_timeout=30.0, max_workers=32, max_abandoned=8,
+                 latencies=None, clock=time.monotonic):
+        if latencies is None:
+            backend = latencies = LatencyRecorder(backend)
+        self.backend = backend
+        self.latencies = latencies
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedges = max_hedges
+        self.deadlines = deadlines or {}
+        self.default_deadline = default_deadline
+        self.fallbacks = fallbacks or {}
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_abandoned = max_abandoned
+        self.clock = clock
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+        self.fallbacks_used = 0
+        # model_name -> CircuitBreaker / attempts still running after their deadline
+        self.breakers = {}
+        self.abandoned = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="hedge")
+
+    @property
+    def breaker_trips(self):
+        return sum(breaker.trips for breaker in list(self.breakers.values()))
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def breaker(self, model_name):
+        with self._lock:
+            breaker = self.breakers.get(model_name)
+            if breaker is None:
+                breaker = self.breakers[model_name] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, self.clock)
+            return breaker
+
+    def hedge_delay(self, model_name):
+        """Seconds before a call to `model_name` is hedged, None while too few samples."""
+        delay = self.latencies.quantile(model_name, self.hedge_quantile, self.min_samples)
+        if delay is None:
+            return None
+        return max(self.min_hedge_delay, delay)
+
+    def _submit(self, query_text, model_name, num_responses):
+        # Attempts keep the caller's context (e.g. the query's current_priority)
+        return self._executor.submit(contextvars.copy_context().run, self.backend.generate,
+                                     query_text, model_name, num_responses)
+
+    def _abandon(self, model_name, futures):
+        """Cancel the attempts not started yet; count the running ones until they end."""
+        def release(_):
+            with self._lock:
+                self.abandoned[model_name] -= 1
+
+        for future in futures:
+            if future.cancel():
+                continue
+            with self._lock:
+                self.abandoned[model_name] = self.abandoned.get(model_name, 0) + 1
+            future.add_done_callback(release)
+
+    def _hedged_call(self, query_text, model_name, num_responses):
+        deadline = self.deadlines.get(model_name, self.default_deadline)
+        with self._lock:
+            abandoned = self.abandoned.get(model_name, 0)
+        if abandoned >= self.max_abandoned:
+            raise BackendError(f"{model_name} has {abandoned} calls still running past "
+                               f"their deadline", status_code=503)
+        delay = self.hedge_delay(model_name)
+        start = self.clock()
+        primary = self._submit(query_text, model_name, num_responses)
+        running = [primary]
+        hedge_at = delay
+
+        while True:
+            elapsed = self.clock() - start
+            if deadline is not None and elapsed >= deadline:
+                with self._lock:
+                    self.deadlines_exceeded += 1
+                self._abandon(model_name, running)
+                raise DeadlineExceeded(f"{model_name} did not answer within {deadline:g}s")
+            if hedge_at is not None and elapsed >= hedge_at:
+                running.append(self._submit(query_text, model_name, num_responses))
+                hedges = len(running) - 1
+                with self._lock:
+                    self.hedges += 1
+                hedge_at = hedge_at + delay if hedges < self.max_hedges else None
+
+            # 1. Wait for an answer, the next hedge or the deadline, whichever comes first
+            timeouts = [moment - elapsed for moment in (deadline, hedge_at) if moment is not None]
+            done, _ = wait(running, timeout=min(timeouts) if timeouts else None,
+                           return_when=FIRST_COMPLETED)
+            # 2. The first success wins; the losers finish in the background
+            for future in done:
+                running.remove(future)
+                error = future.exception()
+                if error is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+            # 3. Every attempt failed: a hedge does not retry errors, the scheduler does
+            if not running:
+                raise error
+
+    def _with_failover(self, model_name, call):
+        """(call(model), None), or (call(fallback), fallback) when `model_name` is down."""
+        breaker = self.breaker(model_name)
+        if breaker.allow():
+            try:
+                result = call(model_name)
+            except BackendError:
+                breaker.record_failure()
+                if model_name not in self.fallbacks:
+                    raise
+            else:
+                breaker.record_success()
+                return result, None
+        fallback = self.fallbacks.get(model_name)
+        if fallback is None:
+            raise CircuitOpenError(f"{model_name} is unavailable (circuit breaker open)")
+
+        with self._lock:
+            self.fallbacks_used += 1
+        # The fallback has its own breaker but no further fallback
+        fallback_breaker = self.breaker(fallback)
+        if not fallback_breaker.allow():
+            raise CircuitOpenError(
+                f"{model_name} and its fallback {fallback} are unavailable (circuit breaker open)")
+        try:
+            result = call(fallback)
+        except BackendError:
+            fallback_breaker.record_failure()
+            raise
+        fallback_breaker.record_success()
+        return result, fallback
+
+    def generate(self, query_text, model_name, num_responses=4):
+        responses, fallback = self._with_failover(
+            model_name, lambda model: self._hedged_call(query_text, model, num_responses))
+        if fallback is None:
+            return responses
+        return [dict(response, fallback_model=fallback) for response in responses]
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        results, fallback = self._with_failover(
+            model_name, lambda model: self.backend.generate_batch(prompts, model, num_responses))
+        if fallback is None:
+            return results
+        return [[dict(response, fallback_model=fallback) for response in responses]
+                for responses in results]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
@@ -0,0 +1,339 @@
+# Opt-in run instrumentation: spans, counters and latency histograms, exported as
+# Prometheus text and a JSON trace (Chrome trace event format, opens in Perfetto)
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+from .llm_backends import LLMBackend
+
+PROMETHEUS_PREFIX = "sen_survey_"
+QUANTILES = (0.5, 0.95, 0.99)
+
+_HELP = {
+    "queries_total": "Teacher queries created",
+    "model_calls_total": "Backend requests sent, including retried attempts",
+    "responses_total": "Responses returned by the backend",
+    "errors_total": "Backend requests that raised",
+    "cache_hits_total": "Model calls served from the response cache",
+    "cache_misses_total": "Model calls not found in the response cache",
+    "cache_evictions_total": "Entries evicted from the response cache",
+    "cassette_hits_total": "Model calls replayed from the cassette",
+    "cassette_misses_total": "Model calls not found on the cassette",
+    "retries_total": "Backend requests retried by the scheduler",
+    "throttled_total": "Backend requests rejected with HTTP 429",
+    "hedged_requests_total": "Duplicate requests sent for model calls slower than their p95",
+    "hedge_wins_total": "Model calls answered by the duplicate request",
+    "deadlines_exceeded_total": "Model calls abandoned at their deadline",
+    "fallbacks_total": "Model calls answered by the fallback model",
+    "breaker_trips_total": "Times a model's circuit breaker opened",
+    "span_seconds": "Duration of instrumented stages and model calls",
+}
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram: bucket 0 holds values up to `min_value`, bucket i the range
+    (min_value * growth**(i-1), min_value * growth**i]. Memory is fixed however many values
+    are observed, and quantiles are within half a bucket (~5% for growth=1.1).
+    """
+
+    def __init__(self, min_value=1e-6, growth=1.1, num_buckets=256):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets = [0] * num_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(math.ceil(math.log(value / self.min_value) / self._log_growth),
+                        len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimated q-quantile (geometric middle of its bucket, clamped to min/max)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                break
+        if index == 0:
+            estimate = self.min_value
+        else:
+            estimate = self.min_value * self.growth ** (index - 0.5)
+        return min(max(estimate, self.min), self.max)
+
+    def summary(self):
+        stats = {"count": self.count, "sum": self.sum,
+                 "mean": self.sum / self.count if self.count else None,
+                 "min": self.min if self.count else None, "max": self.max}
+        for q in QUANTILES:
+            stats[f"p{round(q * 100)}"] = self.quantile(q)
+        return stats
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Metrics:
+    """
+    Collects one run's instrumentation; thread-safe.
+
+    counters    increment(name, value, **labels), e.g. queries_total
+    histograms  observe(name, seconds, **labels); p50/p95/p99 from LatencyHistogram
+    spans       `with metrics.span(name, **labels):` feeds span_seconds{span=name, ...}
+                and one trace event (up to `max_trace_events`; later ones are counted only)
+    tracked     track(obj, attribute=counter_name) reads counters an object already keeps
+                (ResponseCache.hits, ModelScheduler.retries, ...) when exporting
+    """
+
+    enabled = True
+
+    def __init__(self, max_trace_events=100_000, clock=time.perf_counter):
+        self.max_trace_events = max_trace_events
+        self.clock = clock
+        self.counters = {}
+        self.histograms = {}
+        self.trace_events = []
+        self.dropped_events = 0
+        self._tracked = []
+        self._origin = clock()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_span(self, name, start, duration, labels=None, failed=False):
+        """Record a finished span that started at clock() value `start`."""
+        labels = labels or {}
+        self.observe("span_seconds", duration, span=name, **labels)
+        with self._lock:
+            if len(self.trace_events) >= self.max_trace_events:
+                self.dropped_events += 1
+                return
+            args = dict(labels, error=True) if failed else labels
+            self.trace_events.append({
+                "name": name, "ph": "X", "pid": self._pid, "tid": threading.get_ident(),
+                "ts": round((start - self._origin) * 1e6, 3), "dur": round(duration * 1e6, 3),
+                "args": args,
+            })
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        start = self.clock()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record_span(name, start, self.clock() - start, labels, failed)
+
+    def track(self, obj, **attributes):
+        """Export obj.<attribute> as the counter named by each keyword when writing."""
+        self._tracked.append((obj, attributes))
+
+    def _counter_values(self):
+        with self._lock:
+            values = dict(self.counters)
+        for obj, attributes in self._tracked:
+            for attribute, name in attributes.items():
+                key = (name, ())
+                values[key] = values.get(key, 0) + getattr(obj, attribute)
+        return values
+
+    def summary(self):
+        """Counters and latency statistics as a JSON-ready dict."""
+        with self._lock:
+            histograms = {name + _format_labels(labels): histogram.summary()
+                          for (name, labels), histogram in sorted(self.histograms.items())}
+        return {
+            "counters": {name + _format_labels(labels): value
+                         for (name, labels), value in sorted(self._counter_values().items())},
+            "latency": histograms,
+            "trace_events": len(self.trace_events),
+            "dropped_trace_events": self.dropped_events,
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format: counters, and histograms as summaries."""
+        families = {}
+        for (name, labels), value in sorted(self._counter_values().items()):
+            families.setdefault(name, ("counter", []))[1].append(
+                f"{PROMETHEUS_PREFIX}{name}{_format_labels(labels)} {value}")
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+        for (name, labels), histogram in histograms:
+            lines = families.setdefault(name, ("summary", []))[1]
+            for q in QUANTILES:
+                lines.append(f"{PROMETHEUS_PREFIX}{name}"
+                             f"{_format_labels(labels + (('quantile', q),))} "
+                             f"{histogram.quantile(q):.9g}")
+            lines.append(f"{PROMETHEUS_PREFIX}{name}_sum{_format_labels(labels)} "
+                         f"{histogram.sum:.9g}")
+            lines.append(f"{PROMETHEUS_PREFIX}{name}_count{_format_labels(labels)} "
+                         f"{histogram.count}")
+
+        output = []
+        for name, (kind, lines) in families.items():
+            if name in _HELP:
+                output.append(f"# HELP {PROMETHEUS_PREFIX}{name} {_HELP[name]}")
+            output.append(f"# TYPE {PROMETHEUS_PREFIX}{name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+    def trace(self):
+        with self._lock:
+            events = list(self.trace_events)
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def write_prometheus(self, filename):
+        """Atomically (re)write `filename`, e.g. for node_exporter's textfile collector."""
+        _write_atomic(filename, self.to_prometheus())
+        return filename
+
+    def write_trace(self, filename):
+        _write_atomic(filename, json.dumps(self.trace()))
+        return filename
+
+
+class NullMetrics:
+    """Stand-in when instrumentation is off: every call is a no-op."""
+
+    enabled = False
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, seconds, **labels):
+        pass
+
+    def record_span(self, name, start, duration, labels=None, failed=False):
+        pass
+
+    def span(self, name, **labels):
+        return _NULL_SPAN
+
+    def track(self, obj, **attributes):
+        pass
+
+
+_NULL_SPAN = contextlib.nullcontext()
+NULL_METRICS = NullMetrics()
+
+
+def _write_atomic(filename, text):
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, filename)
+
+
+def traced(stage):
+    """Method decorator: a `stage` span per call when the instance's metrics are enabled."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.metrics.enabled:
+                return method(self, *args, **kwargs)
+            with self.metrics.span(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class InstrumentedBackend(LLMBackend):
+    """
+    Wraps the raw backend so every request sent (each retried attempt too) is one
+    model_call span with its model label, and its responses and errors are counted.
+    Cache hits never reach it; they are read from the ResponseCache counters.
+    """
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def _record(self, model_name, start, results, failed):
+        metrics = self.metrics
+        metrics.record_span("model_call", start, metrics.clock() - start,
+                            {"model": model_name}, failed)
+        metrics.increment("model_calls_total", model=model_name)
+        if failed:
+            metrics.increment("errors_total", model=model_name)
+        else:
+            metrics.increment("responses_total", results, model=model_name)
+
+    def generate(self, query_text, model_name, num_responses=4):
+        start = self.metrics.clock()
+        try:
+            responses = self.backend.generate(query_text, model_name, num_responses)
+        except Exception:
+            self._record(model_name, start, 0, True)
+            raise
+        self._record(model_name, start, len(responses), False)
+        return responses
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        start = self.metrics.clock()
+        try:
+            results = self.backend.generate_batch(prompts, model_name, num_responses)
+        except Exception:
+            self._record(model_name, start, 0, True)
+            raise
+        self._record(model_name, start, sum(len(responses) for responses in results), False)
+        return results
+
+    async def agenerate(self, query_text, model_name, num_responses=4):
+        start = self.metrics.clock()
+        try:
+            responses = await self.backend.agenerate(query_text, model_name, num_responses)
+        except Exception:
+            self._record(model_name, start, 0, True)
+            raise
+        self._record(model_name, start, len(responses), False)
+        return responses
+
+    def close(self):
+        self.backend.close()
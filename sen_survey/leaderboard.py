@@ -0,0 +1,256 @@
+# Quality-score leaderboard: grouped statistics and bootstrap confidence intervals over
+# long-format responses (one row per scored response)
+import re
+
+import numpy as np
+
+from .prompt_templates import compile_template
+from .records import iter_model_responses
+
+DEFAULT_DIMENSIONS = ("model", "sen_category", "age_group", "template")
+
+_QUALITY_COLUMN = re.compile(r"^(?P<model>.+)_Response_(?P<rank>\d+)_Quality$")
+
+
+def _require_pandas():
+    try:
+        import pandas
+    except ImportError as exc:
+        raise ImportError("The quality leaderboard needs pandas: pip install pandas") from exc
+    return pandas
+
+
+def scores_frame(questions):
+    """Long frame (model, sen_category, age_group, subject, teacher_query, quality_score)."""
+    pd = _require_pandas()
+    columns = {name: [] for name in ("model", "sen_category", "age_group", "subject",
+                                     "teacher_query", "quality_score")}
+    for question in questions:
+        for model, responses in iter_model_responses(question):
+            for response in responses:
+                columns["model"].append(model)
+                columns["sen_category"].append(question["sen_category"])
+                columns["age_group"].append(question["age_group"])
+                columns["subject"].append(question["subject"])
+                columns["teacher_query"].append(question["teacher_query_text"])
+                columns["quality_score"].append(response["quality_score"])
+
+    frame = pd.DataFrame(columns)
+    frame["quality_score"] = pd.to_numeric(frame["quality_score"])
+    for name in ("model", "sen_category", "age_group", "subject", "teacher_query"):
+        frame[name] = frame[name].astype("category")
+    return frame
+
+
+def read_scores(filename):
+    """
+    Long frame from a columnar_export Parquet/Arrow file or the wide multi-model CSV.
+    Only the columns the leaderboard uses are read; categoricals stay dictionary-encoded.
+    In the wide CSV, models are named by their column prefix (e.g. "GPT4o").
+    """
+    pd = _require_pandas()
+    if filename.endswith((".parquet", ".arrow", ".feather")):
+        columns = ["model", "sen_category", "age_group", "subject", "teacher_query",
+                   "quality_score"]
+        if filename.endswith(".parquet"):
+            return pd.read_parquet(filename, columns=columns)
+        return pd.read_feather(filename, columns=columns)
+
+    header = pd.read_csv(filename, nrows=0).columns
+    quality = {column: _QUALITY_COLUMN.match(column).group("model") for column in header
+               if _QUALITY_COLUMN.match(column)}
+    base = {"SEN_Category": "sen_category", "Age_Group": "age_group",
+            "Subject": "subject", "Teacher_Query": "teacher_query"}
+    wide = pd.read_csv(filename, usecols=list(base) + list(quality),
+                       dtype={column: "category" for column in base})
+    frame = wide.rename(columns=base).melt(
+        id_vars=list(base.values()), value_vars=list(quality),
+        var_name="model", value_name="quality_score")
+    frame["model"] = frame["model"].map(quality).astype("category")
+    return frame
+
+
+def add_template_column(frame, templates):
+    """
+    Adds a categorical "template" column: the template of `templates` each teacher query
+    was rendered from (None if none matches). Each distinct query text is matched once.
+    """
+    pd = _require_pandas()
+    queries = frame["teacher_query"]
+    if isinstance(queries.dtype, pd.CategoricalDtype):
+        codes, texts = queries.cat.codes.to_numpy(), queries.cat.categories
+    else:
+        codes, texts = pd.factorize(queries)
+    compiled = [compile_template(template) for template in templates]
+    labels = []
+    for text in texts:
+        labels.append(next((template.template for template in compiled
+                            if template.match(text) is not None), None))
+    labels = pd.Categorical(labels, categories=list(dict.fromkeys(templates)))
+    frame["template"] = pd.Categorical.from_codes(
+        np.where(codes >= 0, labels.codes[codes], -1), labels.categories)
+    return frame
+
+
+def _group_codes(frame, dimension, valid):
+    """(int codes of the valid rows, group labels) of a column or a tuple of columns."""
+    pd = _require_pandas()
+    names = (dimension,) if isinstance(dimension, str) else tuple(dimension)
+    codes, labels = None, [()]
+    for name in names:
+        if name not in frame:
+            hint = " (see add_template_column)" if name == "template" else ""
+            raise ValueError(f"No {name!r} column to group by{hint}")
+        column = frame[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column_codes, categories = column.cat.codes.to_numpy(), column.cat.categories
+        else:
+            column_codes, categories = pd.factorize(column)
+        column_codes = np.asarray(column_codes)
+        if valid is not None:
+            column_codes = column_codes[valid]
+        # Missing labels (code -1) form their own group
+        if (column_codes < 0).any():
+            column_codes = np.where(column_codes < 0, len(categories), column_codes)
+        categories = list(categories) + [None]
+        codes = column_codes if codes is None else (
+            codes.astype(np.int64) * len(categories) + column_codes)
+        labels = [label + (category,) for label in labels for category in categories]
+
+    labels = [label[0] if len(label) == 1
+              else " | ".join("" if part is None else str(part) for part in label)
+              for label in labels]
+    return codes, labels
+
+
+def bootstrap_mean_ci(values, n_boot=1000, confidence=0.95, rng=None, chunk_draws=1 << 22):
+    """
+    Percentile bootstrap confidence interval of the mean of `values`: n_boot resamples of
+    len(values) values drawn with replacement, in chunks of about `chunk_draws` draws.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.nan, np.nan
+    means = np.empty(n_boot)
+    step = max(1, chunk_draws // n)
+    for start in range(0, n_boot, step):
+        stop = min(n_boot, start + step)
+        means[start:stop] = values[rng.integers(0, n, (stop - start, n))].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return low, high
+
+
+def normal_block_mean_ci(sorted_values, n_boot=1000, confidence=0.95, blocks=256, rng=None):
+    """
+    Normal approximation of the bootstrap CI of the mean of ascending `sorted_values`,
+    for groups too large to resample value by value.
+
+    The counts a resample takes from each of `blocks` equal-count blocks of the sorted
+    values are drawn exactly (multinomial); the sum of each block's draws is then drawn
+    from a normal with that sum's exact mean and variance, not resampled. With
+    n <= blocks every block is one value and this is the plain bootstrap.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    n = len(sorted_values)
+    if n == 0:
+        return np.nan, np.nan
+    k = min(n, blocks)
+    edges = np.arange(k + 1) * n // k
+    sizes = np.diff(edges)
+    means = np.add.reduceat(sorted_values, edges[:-1]) / sizes
+    variances = np.maximum(
+        np.add.reduceat(sorted_values * sorted_values, edges[:-1]) / sizes - means * means, 0)
+
+    draws = rng.multinomial(n, sizes / n, size=n_boot)
+    totals = draws @ means
+    if variances.any():
+        totals += (np.sqrt(draws * variances) * rng.standard_normal(draws.shape)).sum(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(totals / n, [alpha, 1 - alpha])
+    return low, high
+
+
+def quality_leaderboard(frame, dimensions=DEFAULT_DIMENSIONS, quantiles=(0.25, 0.5, 0.75),
+                        n_boot=1000, confidence=0.95, blocks=256, exact_up_to=10_000,
+                        seed=0):
+    """
+    Per-group quality statistics for every dimension (a column name or a tuple of names):
+    count, mean, std, `quantiles` and a bootstrap CI of the mean, ranked by mean within
+    each dimension. Rows with no score are ignored.
+
+    Groups of up to `exact_up_to` scores are bootstrapped (bootstrap_mean_ci); larger
+    ones, whose resampled means are normal to within sampling noise anyway, use
+    normal_block_mean_ci over `blocks` blocks, which costs O(n_boot * blocks) per group
+    instead of O(n_boot * n).
+
+    Counts and moments are weighted bincounts. For quantiles and the bootstrap, one
+    np.sort of (group code + score scaled into [0, 1)) puts every group in a contiguous
+    ascending run, several times faster than an argsort; the scores read back from the
+    sorted keys are exact to ~1e-14 of the score range.
+    """
+    pd = _require_pandas()
+    rng = np.random.default_rng(seed)
+    scores = frame["quality_score"].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(scores)
+    if valid.all():
+        valid = None
+    else:
+        scores = scores[valid]
+    low, high = (scores.min(), scores.max()) if len(scores) else (0.0, 1.0)
+    scale = (1 - 2.0 ** -20) / (high - low) if high > low else 0.0
+    unit = (scores - low) * scale
+
+    rows = []
+    for dimension in dimensions:
+        codes, labels = _group_codes(frame, dimension, valid)
+        # 1. Moments per group
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.bincount(codes, scores, minlength=len(labels))
+        squares = np.bincount(codes, scores * scores, minlength=len(labels))
+        present = np.flatnonzero(counts)
+        counts, sums, squares = counts[present], sums[present], squares[present]
+        means = sums / counts
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stds = np.sqrt(np.maximum(squares - sums * means, 0) / (counts - 1))
+        stds[counts < 2] = np.nan
+
+        # 2. Group-major, ascending scores; quantiles are reads at fixed positions
+        keys = np.sort(codes + unit)
+        group_of_row = np.repeat(present.astype(np.float64), counts)
+        values = (keys - group_of_row) / scale + low if scale else np.full(len(keys), low)
+        starts = np.cumsum(counts) - counts
+        quantile_values = {}
+        for q in quantiles:
+            position = q * (counts - 1)
+            floor = np.floor(position).astype(np.int64)
+            ceiling = np.minimum(floor + 1, counts - 1)
+            fraction = position - floor
+            quantile_values[f"q{q * 100:g}"] = (values[starts + floor] * (1 - fraction)
+                                                + values[starts + ceiling] * fraction)
+
+        # 3. Bootstrap CI of every group's mean, and the ranking
+        name = dimension if isinstance(dimension, str) else " x ".join(dimension)
+        ranks = np.empty(len(present), dtype=np.int64)
+        ranks[np.argsort(-means, kind="stable")] = np.arange(1, len(present) + 1)
+        for i, group in enumerate(present):
+            group_values = values[starts[i]:starts[i] + counts[i]]
+            if counts[i] <= exact_up_to:
+                ci_low, ci_high = bootstrap_mean_ci(group_values, n_boot, confidence, rng)
+            else:
+                ci_low, ci_high = normal_block_mean_ci(
+                    group_values, n_boot, confidence, blocks, rng)
+            row = {"dimension": name, "group": labels[group], "rank": ranks[i],
+                   "count": counts[i], "mean": means[i], "std": stds[i]}
+            row.update((key, column[i]) for key, column in quantile_values.items())
+            row.update(ci_low=ci_low, ci_high=ci_high)
+            rows.append(row)
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table["_order"] = table.groupby("dimension", sort=False).ngroup()
+    return (table.sort_values(["_order", "rank"]).drop(columns="_order")
+            .reset_index(drop=True))
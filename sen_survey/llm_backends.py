@@ -0,0 +1,306 @@
+# Pluggable LLM backends used by the SEN question generators
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+
+class BackendError(RuntimeError):
+    """Raised when a backend cannot produce responses (HTTP errors, bad payloads...)."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMBackend:
+    """
+    Base class for response backends.
+    A backend turns (query_text, model_name, num_responses) into a list of response dicts
+    with the keys "id", "type", "content" and "quality_score".
+    """
+
+    def generate(self, query_text, model_name, num_responses=4):
+        raise NotImplementedError
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        """
+        Answer several prompts for one model. Backends whose provider accepts batched
+        inputs override this to send a single request; the default loops over generate.
+        """
+        return [self.generate(prompt, model_name, num_responses) for prompt in prompts]
+
+    def cache_params(self):
+        """Generation parameters that change the output; used to build cache keys."""
+        return {"backend": type(self).__name__}
+
+    async def agenerate(self, query_text, model_name, num_responses=4):
+        """Async variant; by default runs the blocking call in a worker thread."""
+        import asyncio
+        return await asyncio.to_thread(self.generate, query_text, model_name, num_responses)
+
+    def close(self):
+        pass
+
+
+class SimulatedBackend(LLMBackend):
+    """Offline backend returning templated strategies (the generator's original behaviour)."""
+
+    # Define model-specific response variations (simulated)
+    model_response_types = {
+        "GPT": ["Instructional", "Social", "Environmental", "Behavioral"],
+        "Gemini": ["Behavioral", "Assessment", "Instructional", "Social"],
+        "Llama": ["Environmental", "Instructional", "Social", "Behavioral"],
+        "Mistral": ["Behavioral", "Environmental", "Instructional", "Social"],
+    }
+    default_response_types = ["Instructional",
+                              "Environmental", "Social", "Behavioral"]
+
+    def __init__(self, rng=None):
+        # Pass a seeded random.Random for reproducible responses
+        self.rng = rng or random.Random()
+        # model_name -> (response templates, default content, response ids); built once
+        # per model so every record shares the same strings
+        self._model_strings = {}
+
+    def _strings_for(self, model_name):
+        strings = self._model_strings.get(model_name)
+        if strings is not None:
+            return strings
+
+        # Template content based on type (prepended with model name for tracking)
+        response_templates = {
+            "Environmental": f"({model_name}) Structure the learning space; provide a quiet corner, use visual timetables, and ensure minimal clutter to manage sensory input.",
+            "Instructional": f"({model_name}) Simplify instructions into visual, multi-step checklists. Use immediate, frequent positive reinforcement tied to effort, not just outcome.",
+            "Social": f"({model_name}) Implement a structured peer-buddy system specific to the activity. Role-play social interactions and use brief 'social stories' before lessons.",
+            "Behavioral": f"({model_name}) Establish clear, co-created classroom rules. Use a points/token system focused on self-regulation and impulse control, with specific, non-judgmental feedback.",
+            "Assessment": f"({model_name}) Use alternative assessment formats (e.g., oral presentation, video recording) and focus IEP goals on functional skills development rather than pure academic metrics."
+        }
+        default_content = f"({model_name}) Default strategy content."
+        # At most one response per type is returned
+        response_ids = [f"{model_name}_{i+1}" for i in range(len(response_templates))]
+        strings = self._model_strings[model_name] = (
+            response_templates, default_content, response_ids)
+        return strings
+
+    def generate(self, query_text, model_name, num_responses=4):
+        responses = []
+
+        response_types = self.default_response_types
+        for family, types in self.model_response_types.items():
+            if family in model_name:
+                response_types = types
+                break
+
+        # Ensure we use exactly num_responses types
+        response_types = response_types[:num_responses]
+        response_templates, default_content, response_ids = self._strings_for(model_name)
+
+        selected_types = self.rng.sample(
+            response_types, min(num_responses, len(response_types)))
+
+        for i, type_name in enumerate(selected_types):
+            response = {
+                "id": response_ids[i],
+                "type": type_name,
+                "content": response_templates.get(type_name, default_content),
+                "quality_score": self.rng.uniform(0.7, 0.95) if "GPT" in model_name else self.rng.uniform(0.6, 0.9)
+            }
+            responses.append(response)
+
+        return responses
+
+
+class FaultInjectingBackend(LLMBackend):
+    """
+    Wraps a backend with simulated provider latency and failures, to exercise deadlines,
+    hedging and failover offline. Each call sleeps `latency` (+/- `jitter`), or
+    `spike_latency` for a `spike_probability` share of calls, then fails with
+    BackendError(503) for an `error_rate` share. `models` overrides any of these per
+    model, e.g. {"Llama 3": {"error_rate": 1.0}}.
+    """
+
+    def __init__(self, backend, latency=0.02, jitter=0.005, spike_probability=0.0,
+                 spike_latency=1.0, error_rate=0.0, models=None, seed=None, sleep=time.sleep):
+        self.backend = backend
+        self.profile = {"latency": latency, "jitter": jitter,
+                        "spike_probability": spike_probability,
+                        "spike_latency": spike_latency, "error_rate": error_rate}
+        self.models = models or {}
+        self.rng = random.Random(seed)
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def _inject(self, model_name):
+        profile = dict(self.profile, **self.models.get(model_name, {}))
+        with self._lock:
+            spike = self.rng.random() < profile["spike_probability"]
+            jitter = self.rng.uniform(-profile["jitter"], profile["jitter"])
+            failed = self.rng.random() < profile["error_rate"]
+        self.sleep(profile["spike_latency"] if spike else max(0.0, profile["latency"] + jitter))
+        if failed:
+            raise BackendError(f"{model_name} is unavailable (injected fault)", status_code=503)
+
+    def generate(self, query_text, model_name, num_responses=4):
+        self._inject(model_name)
+        return self.backend.generate(query_text, model_name, num_responses)
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        # One request, so one delay for the whole batch
+        self._inject(model_name)
+        return self.backend.generate_batch(prompts, model_name, num_responses)
+
+    def close(self):
+        self.backend.close()
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header: delay-seconds or an HTTP-date (RFC 9110).
+    None when absent or unparseable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# One pooled keep-alive session per (scheme, host, port), shared by every backend instance
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_pooled_session(url, pool_maxsize=32):
+    """Return the shared requests.Session for the host of `url`, creating it on first use."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    parts = urlsplit(url)
+    host_key = (parts.scheme, parts.hostname, parts.port)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(host_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=pool_maxsize, max_retries=0)
+            session.mount(f"{parts.scheme}://", adapter)
+            _SESSIONS[host_key] = session
+        return session
+
+
+def close_pooled_sessions():
+    """Close every pooled session (e.g. at the end of a run)."""
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Backend for any OpenAI-compatible /chat/completions endpoint (OpenAI, OpenRouter, vLLM...).
+    Requests to the same host reuse one pooled keep-alive session.
+    """
+
+    system_prompt = ("You are an experienced UK SENCo. Answer the teacher's question with one "
+                     "concise, practical strategy.")
+
+    def __init__(self, api_key=None, base_url="https://api.openai.com/v1", model_map=None,
+                 timeout=60, temperature=0.9, max_tokens=300, pool_maxsize=32):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        # Maps the survey's display names ("GPT-4o") to provider model ids ("gpt-4o")
+        self.model_map = model_map or {}
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.pool_maxsize = pool_maxsize
+
+    def cache_params(self):
+        return {
+            "backend": type(self).__name__,
+            "base_url": self.base_url,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "system_prompt": self.system_prompt
+        }
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _post(self, path, payload):
+        url = f"{self.base_url}{path}"
+        session = get_pooled_session(url, self.pool_maxsize)
+        try:
+            reply = session.post(url, json=payload,
+                                 headers=self._headers(), timeout=self.timeout)
+        except Exception as exc:
+            raise BackendError(f"Request to {url} failed: {exc}") from exc
+
+        if reply.status_code >= 400:
+            raise BackendError(
+                f"{url} returned HTTP {reply.status_code}: {reply.text[:200]}",
+                status_code=reply.status_code,
+                retry_after=parse_retry_after(reply.headers.get("Retry-After")))
+        try:
+            return reply.json()
+        except ValueError as exc:
+            raise BackendError(f"{url} returned invalid JSON") from exc
+
+    def generate(self, query_text, model_name, num_responses=4):
+        payload = {
+            "model": self.model_map.get(model_name, model_name),
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": query_text}
+            ],
+            "n": num_responses,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        body = self._post("/chat/completions", payload)
+
+        responses = []
+        for i, choice in enumerate(body.get("choices", [])[:num_responses]):
+            responses.append({
+                "id": f"{model_name}_{i+1}",
+                "type": "Generated",
+                "content": choice["message"]["content"].strip(),
+                # No quality signal from the provider; scored later by teachers
+                "quality_score": None
+            })
+        return responses
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        """
+        Not provider-side batching: /chat/completions takes one conversation per request
+        and the Batch API is asynchronous (results within hours), so this sends one
+        /chat/completions request per prompt, concurrently (at most `pool_maxsize` at once,
+        over the pooled keep-alive connections), with exactly the messages generate would
+        send. Token usage and rate-limit cost are those of len(prompts) requests; only the
+        wall time shrinks, to about one round trip per batch.
+        """
+        if len(prompts) <= 1:
+            return [self.generate(prompt, model_name, num_responses) for prompt in prompts]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(min(len(prompts), self.pool_maxsize)) as pool:
+            return list(pool.map(
+                lambda prompt: self.generate(prompt, model_name, num_responses), prompts))
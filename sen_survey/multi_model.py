@@ -0,0 +1,726 @@
+# Complete SEN Teacher Query and LLM Answer Generator for Microsoft Forms Survey
+import contextlib
+import json
+import csv
+import random
+from datetime import datetime
+from itertools import islice
+
+from .batching import RequestBatcher
+from .cassette import CassetteBackend
+from .checkpoint import RunCheckpoint
+from .columnar_export import export_long_table
+from .instrumentation import NULL_METRICS, InstrumentedBackend, traced
+from .llm_backends import SimulatedBackend
+from .prompt_templates import compile_template
+from .query_ids import SequentialIdAllocator, default_allocator
+from .records import FormsQuestion, TeacherQuery, as_dict, iter_model_responses
+from .rate_limit import ModelScheduler, current_priority
+from .response_cache import CachedBackend
+from .survey_design import SurveyDesign
+
+# asyncio, numpy (query_synthesis), multiprocessing (sharding) and concurrent.futures
+# (hedging) are imported by the methods that need them, so importing the generator stays cheap
+
+
+class SENQuestionGenerator:
+    def __init__(self, openai_api_key=None, backend=None, cache=None,
+                 rate_limits=None, retry_policy=None, id_allocator=None, seed=None,
+                 metrics=None, cassette=None, hedging=None):
+        self.openai_api_key = openai_api_key
+        # All random choices (and the simulated responses) draw from this stream
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Sortable, collision-free query ids (see query_ids.py); with a cassette the ids
+        # and created dates come from its run, so a replay writes the recorded records
+        self.created_date = None
+        if id_allocator is None and cassette is not None:
+            id_allocator = SequentialIdAllocator(cassette.run_id)
+            self.created_date = cassette.created
+        self.id_allocator = id_allocator or default_allocator()
+        # Where responses come from; see llm_backends.py (e.g. OpenAICompatibleBackend)
+        if backend is None:
+            # With a cassette the simulated responses draw from their own stream, so the
+            # queries are the same whether the responses are recorded or replayed
+            if cassette is None:
+                rng = self.rng
+            else:
+                rng = random.Random() if seed is None else random.Random(f"{seed}:responses")
+            backend = SimulatedBackend(rng=rng)
+        self.backend = backend
+        # Optional instrumentation.Metrics: stage spans, per-model call latency and counters
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        if self.metrics.enabled:
+            self.backend = InstrumentedBackend(self.backend, self.metrics)
+        # Optional per-model limits, e.g. {"GPT-4o": {"requests_per_minute": 500, "tokens_per_minute": 30000}}
+        self.scheduler = None
+        if rate_limits or retry_policy:
+            self.scheduler = ModelScheduler(
+                self.backend, limits=rate_limits, retry_policy=retry_policy)
+            self.backend = self.scheduler
+            self.metrics.track(self.scheduler, retries="retries_total",
+                               throttled="throttled_total")
+        # Latencies the hedging layer hedges at: those of calls reaching the scheduler
+        latencies = None
+        if hedging is not None:
+            from .hedging import LatencyRecorder
+            self.backend = latencies = LatencyRecorder(self.backend)
+        # Optional cassette.Cassette: record every model call of the run, or replay one
+        # (outside the scheduler and instrumentation: replays are neither throttled nor timed)
+        self.cassette = cassette
+        if cassette is not None:
+            self.backend = CassetteBackend(self.backend, cassette)
+            self.metrics.track(cassette, hits="cassette_hits_total",
+                               misses="cassette_misses_total")
+        # Optional response_cache.ResponseCache; warm reruns then skip the model calls
+        self.cache = cache
+        if cache is not None:
+            self.backend = CachedBackend(self.backend, cache)
+            self.metrics.track(cache, hits="cache_hits_total", misses="cache_misses_total",
+                               evictions="cache_evictions_total")
+        # Optional hedging.HedgedBackend settings: hedge slow calls at the model's p95,
+        # per-model deadlines and fallbacks, e.g.
+        # {"deadlines": {"Llama 3": 20.0}, "fallbacks": {"Llama 3": "GPT-4o"}}
+        # Outermost, so a fallback's answer is cached and recorded under its own model
+        self.hedged = None
+        if hedging is not None:
+            from .hedging import HedgedBackend
+            self.hedged = HedgedBackend(self.backend, latencies=latencies, **hedging)
+            self.backend = self.hedged
+            self.metrics.track(self.hedged, hedges="hedged_requests_total",
+                               hedge_wins="hedge_wins_total",
+                               deadlines_exceeded="deadlines_exceeded_total",
+                               fallbacks_used="fallbacks_total",
+                               breaker_trips="breaker_trips_total")
+
+        # SEN Categories from UK Education System
+        self.sen_categories = {
+            "ASD": "Autism Spectrum Disorder", "ADHD": "Attention Deficit Hyperactivity Disorder",
+            "SEMH": "Social, Emotional, Mental Health", "SLCN": "Speech, Language, Communication Needs",
+            "MLD": "Moderate Learning Difficulties", "SPLD": "Specific Learning Difficulties",
+            "PD": "Physical Disability", "VI": "Visual Impairment", "HI": "Hearing Impairment"
+        }
+        self.age_groups = ["Early Years (3-5)", "Key Stage 1 (5-7)",
+                           "Key Stage 2 (7-11)", "Key Stage 3 (11-14)", "Key Stage 4 (14-16)"]
+        self.subjects = ["Mathematics", "English", "Science",
+                         "Art", "PE", "Social Skills", "Life Skills"]
+
+        # **UPDATED: Teacher Question Templates**
+        self.teacher_question_templates = [
+            "A teacher has a {age_group} student with {sen_type} struggling with {subject}. What are the **three most effective, quick-to-implement** intervention strategies for this specific {focus_point}?",
+            "What specific {resource_type} resources or differentiation techniques are recommended for adapting a {subject} lesson to meet the needs of a {age_group} student with {sen_type} who is dealing with {focus_point}?",
+            "When a {age_group} student with {sen_type} exhibits {focus_point} during {activity}, what is the recommended school policy or best practice for de-escalation and positive behavior support in a mainstream/SEN school setting?",
+            "How can a teacher best communicate concerns about {focus_point} to the parents/carers of a student with {sen_type} in {age_group}, ensuring a collaborative approach?",
+            "What are measurable and achievable Individual Education Plan (IEP) goals for a {age_group} student with {sen_type} who is currently exhibiting {focus_point} in {subject}?"
+        ]
+
+        # **UPDATED: Teacher Focus Points (specific difficulties)**
+        self.teacher_focus_points = {
+            "ASD": ["sensory overload in a busy classroom", "difficulty transitioning between subjects/tasks", "rigid thinking impacting problem-solving"],
+            "ADHD": ["consistent difficulty maintaining focus on multi-step tasks", "managing impulsive interruptions during whole-class instruction", "fidgeting/motor restlessness distracting other students"],
+            "SEMH": ["dealing with extreme anxiety preventing participation", "responding to non-verbal cues of distress or withdrawal", "re-integrating after a significant emotional outburst"],
+            "SLCN": ["supporting understanding of complex instructions in Science", "improving oral contribution during group work", "scaffolding essay writing for better structure"],
+            "MLD": ["general academic underachievement", "memory recall challenges"],
+            "SPLD": ["decoding and reading fluency", "handwriting and recording work"],
+            "PD": ["accessible resources in Art", "managing fatigue during a full school day"],
+            "VI": ["adapting visual worksheets in Math", "safe movement around the classroom"],
+            "HI": ["ensuring full access to verbal instruction", "using technology to support communication"]
+        }
+
+        # Remaining template slots and query attributes
+        self.resource_types = ["visual", "digital", "kinaesthetic", "low-tech"]
+        self.activities = ["group discussion",
+                           "independent work", "assessment", "break time"]
+        self.difficulty_levels = ["Low", "Medium", "High"]
+        self.priorities = ["High", "Medium", "Low"]
+
+    def close(self):
+        """Close the backend chain: stops the hedging threads and finishes a recording."""
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_responses_from_llm(self, query_text, model_name, num_responses=4):
+        """
+        Generates multiple LLM responses for a query using a specific model.
+        The work is delegated to self.backend (simulated templates by default).
+        """
+        return self.backend.generate(query_text, model_name, num_responses)
+
+    def _created_date(self, created_date=None):
+        return created_date or self.created_date or datetime.now().isoformat()
+
+    def create_teacher_query(self, sen_type, age_group, subject, template=None, focus_point=None):
+        """
+        Creates a query that a teacher would realistically ask about an SEN student.
+        The template and focus point are picked at random unless given.
+        """
+        if template is None:
+            template = self.rng.choice(self.teacher_question_templates)
+        if focus_point is None:
+            focus_point = self.rng.choice(self.teacher_focus_points.get(
+                sen_type, ["general support needs"]))
+
+        # Compiled once per template; recurring prompts come back as one shared string
+        query = compile_template(template).render(
+            sen_type=self.sen_categories[sen_type],
+            age_group=age_group,
+            subject=subject,
+            focus_point=focus_point,
+            resource_type=self.rng.choice(self.resource_types),
+            activity=self.rng.choice(self.activities),
+        )
+
+        self.metrics.increment("queries_total")
+        return {
+            "id": self.id_allocator.next_id(),
+            "sen_category": sen_type,
+            "sen_full_name": self.sen_categories[sen_type],
+            "age_group": age_group,
+            "subject": subject,
+            "teacher_query_text": query,
+            "difficulty_level": self.rng.choice(self.difficulty_levels),
+            "priority": self.rng.choice(self.priorities)
+        }
+
+    @traced("synthesize_queries")
+    def synthesize_queries(self, num_queries, seed=None):
+        """
+        Bulk, vectorized alternative to calling create_teacher_query in a loop.
+        Returns a columnar query_synthesis.QueryBatch; use .iter_records() for dicts.
+        """
+        from .query_synthesis import synthesize_queries
+        self.metrics.increment("queries_total", num_queries)
+        return synthesize_queries(self, num_queries, seed=seed)
+
+    def create_random_query(self):
+        """Picks an SEN type, age group and subject at random and creates the query."""
+        sen_type = self.rng.choice(list(self.sen_categories.keys()))
+        age_group = self.rng.choice(self.age_groups)
+        subject = self.rng.choice(self.subjects)
+        return self.create_teacher_query(sen_type, age_group, subject)
+
+    @traced("generate_question_set")
+    def generate_question_set(self, num_queries=25,
+                              models=["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"],
+                              batch_size=None, run_id=None, checkpoint_dir="checkpoints",
+                              dedup=None, compact=False, num_responses=4):
+        """
+        Generates a set of teacher queries, with each query answered by multiple LLMs.
+        With `batch_size`, the model calls are packed into batches of up to that many
+        queries per backend request (see batching.RequestBatcher).
+        With `dedup` (a dedup.QueryDeduplicator), near-duplicate queries are dropped or,
+        in "merge" mode, kept with `duplicate_of` and the original's responses, before
+        any model is called.
+        With `run_id`, every finished query is checkpointed and a rerun with the same
+        run_id only generates the queries that are still missing (`batch_size` and
+        `dedup` apply there too).
+        With `compact`, records are returned as slotted records.TeacherQuery objects,
+        a fraction of the size of the dicts, for large in-memory surveys.
+        """
+        if run_id:
+            checkpoint = self.run_with_checkpoint(
+                run_id, num_queries, models, checkpoint_dir, dedup=dedup,
+                batch_size=batch_size, num_responses=num_responses)
+            records = checkpoint.iter_records()
+        elif batch_size:
+            records = self._generate_question_set_batched(
+                num_queries, models, batch_size, dedup, num_responses)
+        else:
+            records = self.iter_question_set(num_queries, models, dedup=dedup,
+                                             num_responses=num_responses)
+
+        if compact:
+            records = map(TeacherQuery.from_dict, records)
+        return list(records)
+
+    def iter_question_set(self, num_queries=25,
+                          models=["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"],
+                          created_date=None, dedup=None, compact=False, num_responses=4):
+        """
+        Lazily generates the same records as generate_question_set, one query at a time.
+        Feed it to stream_to_files (or the exporters) to keep memory flat for huge runs.
+        `created_date` pins the timestamp of every record (for reproducible output).
+        """
+        records = self._iter_answered(num_queries, models, created_date, dedup, num_responses)
+        return map(TeacherQuery.from_dict, records) if compact else records
+
+    def _iter_answered(self, num_queries, models, created_date, dedup, num_responses=4):
+        # Responses of the queries that merged duplicates point to
+        answered = {}
+        for query_data in self._iter_queries(num_queries, dedup):
+            original = query_data.get("duplicate_of")
+            if original is not None:
+                yield {
+                    **query_data,
+                    "all_model_responses": answered[original],
+                    "created_date": self._created_date(created_date)
+                }
+                continue
+            record = self.answer_query(query_data, models, created_date, num_responses)
+            if dedup is not None and dedup.mode == "merge":
+                answered[query_data["id"]] = record["all_model_responses"]
+            yield record
+
+    def _iter_queries(self, num_queries, dedup=None):
+        """Creates `num_queries` random queries, passed through `dedup` when given."""
+        # 1. Select parameters and create the core query
+        queries = (self.create_random_query() for i in range(num_queries))
+        return queries if dedup is None else dedup.process(queries)
+
+    @traced("answer_query")
+    def answer_query(self, query_data, models, created_date=None, num_responses=4):
+        """Collects every model's responses for one query into the final record."""
+        model_responses = {}
+
+        # Rate-limited models serve "High" priority queries first
+        priority = current_priority.set(query_data.get("priority", "Medium"))
+        try:
+            # Generate responses from EACH model
+            for model in models:
+                responses = self.get_responses_from_llm(
+                    query_data["teacher_query_text"], model, num_responses)
+                model_responses[model] = responses
+        finally:
+            current_priority.reset(priority)
+
+        # Compile the final structured data
+        return {
+            **query_data,
+            "all_model_responses": model_responses,
+            "created_date": self._created_date(created_date)
+        }
+
+    @traced("generate_stratified_question_set")
+    def generate_stratified_question_set(self, num_queries=25,
+                                         models=["GPT-4o", "Gemini 25 Pro",
+                                                 "Llama 3", "Mistral Large"],
+                                         design=None):
+        """
+        Balanced alternative to generate_question_set: queries are spread evenly over the
+        SEN x age x subject x template x focus point cells of `design`
+        (a survey_design.SurveyDesign; the full space by default) instead of sampled.
+        """
+        return list(self.iter_stratified_question_set(num_queries, models, design))
+
+    def iter_stratified_question_set(self, num_queries=25,
+                                     models=["GPT-4o", "Gemini 25 Pro",
+                                             "Llama 3", "Mistral Large"],
+                                     design=None):
+        """Lazy version of generate_stratified_question_set (one cell at a time)."""
+        design = design or SurveyDesign(self)
+        for query_data in design.iter_queries(num_queries):
+            yield self.answer_query(query_data, models)
+
+    @traced("generate_question_set_sharded")
+    def generate_question_set_sharded(self, num_queries=25,
+                                      models=["GPT-4o", "Gemini 25 Pro",
+                                              "Llama 3", "Mistral Large"],
+                                      seed=0, workers=None, shard_size=1000, created_date=None):
+        """
+        Multi-process generation with the simulated backend: the query space is cut into
+        fixed shards, each generated by a worker with its own RNG derived from `seed`.
+        Output is identical for a given seed whatever the number of workers
+        (pin `created_date` as well for byte-identical files). See sharding.py.
+        """
+        from .sharding import iter_sharded_question_set
+        return list(iter_sharded_question_set(
+            type(self), num_queries, models, seed=seed, workers=workers,
+            shard_size=shard_size, created_date=created_date))
+
+    @traced("run_with_checkpoint")
+    def run_with_checkpoint(self, run_id, num_queries=25,
+                            models=["GPT-4o", "Gemini 25 Pro",
+                                    "Llama 3", "Mistral Large"],
+                            checkpoint_dir="checkpoints", dedup=None, batch_size=None,
+                            num_responses=4):
+        """
+        Resumable run: appends each completed query to checkpoints/<run_id>.jsonl
+        and skips the ones already there. Returns the RunCheckpoint; export with e.g.
+        export_to_csv(checkpoint.iter_records()).
+
+        With a seeded generator, query i draws from an rng seeded with (seed, i), so a
+        resumed run writes the same records as an uninterrupted one (with `batch_size`,
+        as long as it was interrupted between batches); sequential ids follow the index.
+        The seed and num_responses are part of the checkpoint's settings.
+
+        With `batch_size`, the missing queries of each block of `batch_size` indices are
+        answered in batched requests and checkpointed per batch. With `dedup`, a resumed
+        run first indexes the checkpointed queries, so new queries are compared against
+        them too; a dropped query is logged as done without a record.
+        """
+        checkpoint = RunCheckpoint(run_id, checkpoint_dir)
+        done = checkpoint.completed_indices()
+        merge = dedup is not None and dedup.mode == "merge"
+        # Responses of the queries that merged duplicates point to
+        answered = {}
+        if dedup is not None:
+            for record in checkpoint.iter_records():
+                if dedup.check(record) is None and merge:
+                    answered[record["id"]] = record["all_model_responses"]
+
+        sequential_ids = isinstance(self.id_allocator, SequentialIdAllocator)
+        step = batch_size or 1
+        with checkpoint.open(num_queries, models, self.seed, num_responses):
+            for start in range(0, num_queries, step):
+                chunk = [i for i in range(start, min(start + step, num_queries)) if i not in done]
+                if not chunk:
+                    continue
+                # 1. Create the chunk's queries; only those without an original are asked
+                records = {}
+                originals = []
+                for i in chunk:
+                    if self.seed is not None:
+                        # Query i depends on (seed, i) alone, never on which ran before it
+                        self.rng.seed(f"{self.seed}:{i}")
+                    if sequential_ids:
+                        self.id_allocator.seek(i)
+                    query_data = self.create_random_query()
+                    original = dedup.check(query_data) if dedup is not None else None
+                    if original is None:
+                        originals.append((i, query_data))
+                    elif merge:
+                        records[i] = {**query_data, "duplicate_of": original}
+                    else:
+                        records[i] = None
+
+                # 2. Answer them, one query at a time or in batched requests
+                queries = [query_data for _, query_data in originals]
+                if batch_size:
+                    if self.seed is not None:
+                        self.rng.seed(f"{self.seed}:batch:{start}")
+                    results = self._answer_batched(queries, models, batch_size, num_responses)
+                else:
+                    results = [self.answer_query(query_data, models, num_responses=num_responses)
+                               for query_data in queries]
+                for (i, query_data), record in zip(originals, results):
+                    records[i] = record
+                    if merge:
+                        answered[query_data["id"]] = record["all_model_responses"]
+
+                # 3. Log the chunk in query order
+                for i in chunk:
+                    record = records[i]
+                    if record is not None and "duplicate_of" in record:
+                        record = {**record,
+                                  "all_model_responses": answered[record["duplicate_of"]],
+                                  "created_date": self._created_date()}
+                    checkpoint.append(i, record)
+
+        return checkpoint
+
+    def _generate_question_set_batched(self, num_queries, models, batch_size, dedup=None,
+                                       num_responses=4):
+        """Creates every query first, then answers them per model in batched requests."""
+        query_set = list(self._iter_queries(num_queries, dedup))
+        originals = [query_data for query_data in query_set if "duplicate_of" not in query_data]
+        answered = {record["id"]: record["all_model_responses"] for record in
+                    self._answer_batched(originals, models, batch_size, num_responses)}
+
+        all_data = []
+        for query_data in query_set:
+            model_responses = answered[query_data.get("duplicate_of", query_data["id"])]
+            all_data.append({
+                **query_data,
+                "all_model_responses": model_responses,
+                "created_date": self._created_date()
+            })
+        return all_data
+
+    def _answer_batched(self, queries, models, batch_size, num_responses=4):
+        """Records of `queries` answered per model in batched requests."""
+        batcher = RequestBatcher(self.backend, max_batch_size=batch_size)
+        requests = [(query_data["teacher_query_text"], model, num_responses)
+                    for query_data in queries for model in models]
+        results = iter(batcher.run(requests))
+        return [{
+            **query_data,
+            "all_model_responses": {model: next(results) for model in models},
+            "created_date": self._created_date()
+        } for query_data in queries]
+
+    async def aget_responses_from_llm(self, query_text, model_name, num_responses=4):
+        """
+        Async variant of get_responses_from_llm.
+        Blocking backends are run in a worker thread so several models can be awaited at once.
+        """
+        return await self.backend.agenerate(query_text, model_name, num_responses)
+
+    async def agenerate_question_set(self, num_queries=25,
+                                     models=["GPT-4o", "Gemini 25 Pro",
+                                             "Llama 3", "Mistral Large"],
+                                     max_concurrency=16, per_model_concurrency=4,
+                                     batch_size=None, batch_wait=0.02):
+        """
+        Asyncio version of generate_question_set.
+        Every (query, model) call is scheduled at once; at most `max_concurrency` calls
+        are in flight overall and at most `per_model_concurrency` per model.
+        With `batch_size`, calls waiting on the same model are packed into batches of up to
+        `batch_size` queries, each sent after at most `batch_wait` seconds; the two limits
+        then count batch requests in flight.
+        The returned list has the same shape and query order as generate_question_set.
+        """
+        import asyncio
+
+        global_limit = asyncio.Semaphore(max_concurrency)
+        model_limits = {model: asyncio.Semaphore(
+            per_model_concurrency) for model in models}
+        batcher = RequestBatcher(
+            self.backend, max_batch_size=batch_size, max_wait=batch_wait,
+            max_concurrency=max_concurrency,
+            per_model_concurrency=per_model_concurrency) if batch_size else None
+
+        async def call_model(query_text, model):
+            if batcher is not None:
+                # The batcher holds the limits per batch, so waiting calls can still fill one
+                return await batcher.submit(query_text, model)
+            async with model_limits[model]:
+                async with global_limit:
+                    return await self.aget_responses_from_llm(query_text, model)
+
+        async def answer_query(query_data):
+            # Rate-limited models serve "High" priority queries first
+            current_priority.set(query_data["priority"])
+            # Fan out to EACH model concurrently, keep the results keyed by model name
+            results = await asyncio.gather(
+                *(call_model(query_data["teacher_query_text"], model) for model in models))
+            return {
+                **query_data,
+                "all_model_responses": dict(zip(models, results)),
+                "created_date": self._created_date()
+            }
+
+        # 1. Create all queries up front (cheap, CPU only)
+        query_set = [self.create_random_query() for i in range(num_queries)]
+
+        # 2. Overlap the model calls of all queries
+        return list(await asyncio.gather(*(answer_query(q) for q in query_set)))
+
+    @traced("generate_question_set_async")
+    def generate_question_set_async(self, num_queries=25,
+                                    models=["GPT-4o", "Gemini 25 Pro",
+                                            "Llama 3", "Mistral Large"],
+                                    max_concurrency=16, per_model_concurrency=4,
+                                    batch_size=None, batch_wait=0.02):
+        """Blocking wrapper around agenerate_question_set for use from scripts."""
+        import asyncio
+        return asyncio.run(self.agenerate_question_set(
+            num_queries=num_queries, models=models,
+            max_concurrency=max_concurrency, per_model_concurrency=per_model_concurrency,
+            batch_size=batch_size, batch_wait=batch_wait))
+
+    @traced("format_for_microsoft_forms")
+    def format_for_microsoft_forms(self, questions, default_model_for_options="GPT-4o",
+                                   option_selector=None):
+        """
+        Format questions for easy copy-paste into Microsoft Forms.
+        Uses responses from the specified default model for the multiple-choice options,
+        or, with `option_selector` (an option_selection.DiverseOptionSelector), the most
+        diverse responses across all models.
+        Returns plain dicts (json.dumps-able); iter_forms_data yields compact entries.
+        """
+        return [forms_question.to_dict() for forms_question in self.iter_forms_data(
+            questions, default_model_for_options, option_selector)]
+
+    def iter_forms_data(self, questions, default_model_for_options="GPT-4o",
+                        option_selector=None):
+        """
+        Lazy version of format_for_microsoft_forms; accepts any iterable of questions.
+        Yields records.FormsQuestion entries, read-only Mappings rendered when read
+        (records.as_dict gives the dict).
+        """
+        for _, forms_question in self._iter_with_forms(
+                questions, default_model_for_options, option_selector):
+            yield forms_question
+
+    def _iter_with_forms(self, questions, default_model_for_options, option_selector=None,
+                         chunk_size=256):
+        """
+        Yields (question, FormsQuestion). With a selector, options are picked for a chunk
+        of questions at a time so the similarity scoring is batched.
+        """
+        questions = iter(questions)
+        number = 0
+        while True:
+            chunk = list(islice(questions, chunk_size if option_selector else 1))
+            if not chunk:
+                return
+            picks = option_selector.select_many(chunk) if option_selector else [None] * len(chunk)
+            for question, question_picks in zip(chunk, picks):
+                number += 1
+                yield question, self._format_forms_question(
+                    number, question, default_model_for_options, question_picks)
+
+    def _format_forms_question(self, i, question, default_model_for_options, picks=None):
+        # Text and options are rendered from the question when read (see records.FormsQuestion).
+        # We rename the option to obscure the model source for the survey
+        return FormsQuestion(i, question, default_model_for_options,
+                             option_format="Option {number} (Focus: {type}): {content}",
+                             option_picks=picks)
+
+    @traced("export_to_csv")
+    def export_to_csv(self, questions, filename="sen_survey_teacher_queries_multi_model.csv"):
+        """
+        Export questions to CSV, flattening the nested responses from multiple models.
+        Rows are written as they are read, so `questions` may be a generator.
+        """
+        questions = iter(questions)
+        first = next(questions, None)
+        if first is None:
+            return filename
+
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            writer = self._open_csv_writer(f, first)
+            writer.writerow(self._csv_row(first))
+            for question in questions:
+                writer.writerow(self._csv_row(question))
+        return filename
+
+    @traced("export_to_jsonl")
+    def export_to_jsonl(self, questions, filename="sen_survey_teacher_queries_multi_model.jsonl"):
+        """Export the full nested records, one JSON object per line."""
+        with open(filename, 'w', encoding='utf-8') as f:
+            for question in questions:
+                f.write(json.dumps(as_dict(question), ensure_ascii=False) + "\n")
+        return filename
+
+    @traced("export_to_parquet")
+    def export_to_parquet(self, questions, filename="sen_survey_responses_long.parquet",
+                          row_group_size=65_536):
+        """
+        Export in long/tidy form: one row per (query, model, response) with dictionary-encoded
+        categoricals, written in row groups. Requires pyarrow; see columnar_export.py.
+        """
+        export_long_table(questions, filename, file_format="parquet",
+                          row_group_size=row_group_size)
+        return filename
+
+    def _csv_columns(self, question):
+        """Header for the flattened CSV; the model list and response count come from `question`."""
+        columns = ["Question_ID", "SEN_Category", "Age_Group", "Subject",
+                   "Teacher_Query", "Difficulty_Level", "Created_Date"]
+
+        model_responses = list(iter_model_responses(question))
+        models = [model_name for model_name, _ in model_responses]
+        num_responses_per_model = len(model_responses[0][1]) if models else 0
+
+        for model_name in models:
+            model_prefix = model_name.replace(
+                ' ', '_').replace('.', '').replace('-', '')
+            for i in range(num_responses_per_model):
+                prefix = f"{model_prefix}_Response_{i+1}"
+                columns += [f"{prefix}_Type",
+                            f"{prefix}_Content", f"{prefix}_Quality"]
+        return columns
+
+    def _open_csv_writer(self, f, first_question):
+        writer = csv.DictWriter(f, fieldnames=self._csv_columns(first_question),
+                                restval='', extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        return writer
+
+    def _csv_row(self, question):
+        base_row = {
+            "Question_ID": question['id'],
+            "SEN_Category": question['sen_category'],
+            "Age_Group": question['age_group'],
+            "Subject": question['subject'],
+            "Teacher_Query": question['teacher_query_text'],
+            "Difficulty_Level": question['difficulty_level'],
+            "Created_Date": question['created_date']
+        }
+
+        # Add data for each model and its responses
+        # (columns are left blank if no response was generated)
+        for model_name, responses in iter_model_responses(question):
+            model_prefix = model_name.replace(
+                ' ', '_').replace('.', '').replace('-', '')
+
+            for i, response in enumerate(responses):
+                prefix = f"{model_prefix}_Response_{i+1}"
+                base_row[f"{prefix}_Type"] = response['type']
+                base_row[f"{prefix}_Content"] = response['content']
+                base_row[f"{prefix}_Quality"] = response['quality_score']
+
+        return base_row
+
+    @traced("create_forms_import_file")
+    def create_forms_import_file(self, forms_data, filename="microsoft_forms_teacher_queries_import.txt"):
+        """Create a text file with formatted questions for Microsoft Forms"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            self._write_forms_header(f)
+            for question_data in forms_data:
+                self._write_forms_question(f, question_data)
+
+        return filename
+
+    def _write_forms_header(self, f):
+        f.write(
+            "MICROSOFT FORMS SURVEY QUESTIONS - SEN Teacher Feedback (Queries)\n")
+        f.write("="*60 + "\n\n")
+        f.write("Instructions for Microsoft Forms Setup:\n")
+        f.write("1. Create a new Microsoft Form\n")
+        f.write(
+            "2. For each question below, create a 'Multiple Choice' question\n")
+        f.write("3. Copy the question text and all options\n")
+        f.write(
+            "4. Ensure the source model for the options is noted in the Form's description/metadata.\n")
+        f.write(
+            "5. Add a text box after each multiple choice for detailed feedback on the 'Other' option.\n\n")
+        f.write("="*60 + "\n\n")
+
+    def _write_forms_question(self, f, question_data):
+        f.write(f"QUESTION {question_data['question_number']}:\n")
+        f.write("-" * 40 + "\n")
+        f.write(f"{question_data['question_text']}\n\n")
+
+        f.write("OPTIONS (Source Model: {})\n".format(
+            question_data['metadata']['options_source_model']))
+        for i, option in enumerate(question_data['options'], 1):
+            f.write(f"{i}. {option}\n")
+
+        f.write(
+            f"\nFOLLOW-UP TEXT BOX: {question_data['follow_up_text']}\n")
+        f.write("\n" + "="*60 + "\n\n")
+
+    @traced("stream_to_files")
+    def stream_to_files(self, questions, csv_filename="sen_survey_teacher_queries_multi_model.csv",
+                        forms_filename="microsoft_forms_teacher_queries_import.txt",
+                        jsonl_filename=None, default_model_for_options="GPT-4o",
+                        option_selector=None):
+        """
+        Single pass over `questions` (typically iter_question_set(...)) writing the CSV,
+        the Forms import file and optionally a JSONL file record by record.
+        Only the current record is held in memory. Pass None to skip a file.
+        Returns the number of questions written.
+        """
+        count = 0
+        with contextlib.ExitStack() as stack:
+            csv_file = stack.enter_context(open(
+                csv_filename, 'w', encoding='utf-8', newline='')) if csv_filename else None
+            forms_file = stack.enter_context(open(
+                forms_filename, 'w', encoding='utf-8')) if forms_filename else None
+            jsonl_file = stack.enter_context(open(
+                jsonl_filename, 'w', encoding='utf-8')) if jsonl_filename else None
+
+            writer = None
+            if forms_file:
+                self._write_forms_header(forms_file)
+
+            for count, (question, forms_question) in enumerate(self._iter_with_forms(
+                    questions, default_model_for_options, option_selector), 1):
+                if csv_file:
+                    if writer is None:
+                        writer = self._open_csv_writer(csv_file, question)
+                    writer.writerow(self._csv_row(question))
+                if forms_file:
+                    self._write_forms_question(forms_file, forms_question)
+                if jsonl_file:
+                    jsonl_file.write(json.dumps(
+                        as_dict(question), ensure_ascii=False) + "\n")
+
+        return count
@@ -0,0 +1,209 @@
+# Diverse multiple-choice options: maximal marginal relevance over hashed TF-IDF vectors
+import re
+import zlib
+
+import numpy as np
+
+from .records import iter_model_responses
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashedTermCounts:
+    """
+    Sparse term-frequency vectors of texts (word unigrams and bigrams hashed into
+    `n_features` buckets), cached per text so a response shared by many questions is
+    tokenised once. Once `max_cached` texts are held, new ones are not cached.
+
+    Each distinct word is hashed once (crc32, memoised); a bigram's bucket is mixed
+    from its two word hashes in NumPy rather than hashing the joined string.
+    """
+
+    def __init__(self, n_features=1 << 20, max_cached=200_000, max_words=1_000_000):
+        self.n_features = n_features
+        self.max_cached = max_cached
+        self.max_words = max_words
+        self._cache = {}
+        self._word_hashes = {}
+
+    def _hash_words(self, text):
+        hashes = []
+        known = self._word_hashes
+        for word in _WORD.findall(text.lower()):
+            value = known.get(word)
+            if value is None:
+                value = zlib.crc32(word.encode("utf-8"))
+                if len(known) < self.max_words:
+                    known[word] = value
+            hashes.append(value)
+        return hashes
+
+    def _term_keys(self, hashes, rows):
+        """Bucket of every unigram and in-text bigram, offset by row * n_features."""
+        hashes = np.asarray(hashes, dtype=np.int64)
+        bigram = rows[1:] == rows[:-1]
+        bigrams = (hashes[:-1][bigram] * 1_000_003) ^ hashes[1:][bigram]
+        buckets = np.concatenate([hashes, bigrams]) % self.n_features
+        return np.concatenate([rows, rows[:-1][bigram]]) * self.n_features + buckets
+
+    def vector(self, text):
+        """(bucket indices, sublinear term frequencies) of `text`, both sorted by bucket."""
+        vector = self._cache.get(text)
+        if vector is not None:
+            return vector
+
+        hashes = self._hash_words(text)
+        indices, counts = np.unique(
+            self._term_keys(hashes, np.zeros(len(hashes), dtype=np.int64)), return_counts=True)
+        vector = (indices, (1 + np.log(counts)).astype(np.float32))
+        if len(self._cache) < self.max_cached:
+            self._cache[text] = vector
+        return vector
+
+    def count_many(self, texts):
+        """
+        Uncached term frequencies of many texts in one NumPy pass, as flat
+        (text rows, bucket indices, sublinear term frequencies) arrays sorted by row.
+        """
+        hashes, lengths = [], []
+        for text in texts:
+            text_hashes = self._hash_words(text)
+            hashes.extend(text_hashes)
+            lengths.append(len(text_hashes))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        keys, counts = np.unique(self._term_keys(hashes, rows), return_counts=True)
+        rows, indices = np.divmod(keys, self.n_features)
+        return rows, indices, (1 + np.log(counts)).astype(np.float32)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class DiverseOptionSelector:
+    """
+    Picks the `num_options` most diverse responses to a question from every model's
+    answers, with maximal marginal relevance:
+
+        argmax  relevance * (1 - diversity) - diversity * max similarity to the picks
+
+    Relevance is the cosine similarity to the teacher query. Vectors are TF-IDF with the
+    IDF taken over the question's candidate pool, so wording every candidate shares
+    (including the query) counts for little. Questions are scored a block at a time:
+    one batched matrix product gives every pairwise similarity of the block's pools.
+    """
+
+    def __init__(self, num_options=4, diversity=0.7, models=None, n_features=1 << 20,
+                 max_cached=200_000):
+        if not 0 <= diversity <= 1:
+            raise ValueError("diversity must be between 0 and 1")
+        self.num_options = num_options
+        self.diversity = diversity
+        # Restrict the pool to these models (all of a question's models by default)
+        self.models = models
+        self.terms = HashedTermCounts(n_features, max_cached)
+
+    def _candidates(self, question):
+        """[(model, position, response), ...] of every response in the pool."""
+        candidates = []
+        for model, responses in iter_model_responses(question):
+            if self.models is not None and model not in self.models:
+                continue
+            for position, response in enumerate(responses):
+                candidates.append((model, position, response))
+        return candidates
+
+    def _similarities(self, pools):
+        """
+        Cosine similarities within each pool of texts under that pool's TF-IDF, for a
+        block of pools at once: returns a (pools, size, size) array, zero-padded to the
+        largest pool. A term found in only one text of a pool adds to that text's norm
+        but to no similarity, so only terms shared inside a pool become dense columns.
+        """
+        size = max(len(texts) for texts in pools)
+        similarity = np.zeros((len(pools), size, size), dtype=np.float32)
+        flat = [self.terms.vector(text) for texts in pools for text in texts]
+        lengths = [len(indices) for indices, _ in flat]
+        if not sum(lengths):
+            return similarity
+
+        # One entry per (text, term): its pool, its padded row and its TF
+        pool_of_text = np.repeat(np.arange(len(pools)), [len(texts) for texts in pools])
+        row_of_text = np.concatenate([np.arange(len(texts)) for texts in pools])
+        pool = np.repeat(pool_of_text, lengths)
+        row = np.repeat(pool_of_text * size + row_of_text, lengths)
+        term = np.concatenate([indices for indices, _ in flat])
+        values = np.concatenate([values for _, values in flat])
+
+        # Document frequency of every term within its own pool
+        keys, inverse, counts = np.unique(pool * self.terms.n_features + term,
+                                          return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        frequency = counts[inverse]
+        pool_sizes = np.array([len(texts) for texts in pools])
+        values = values * (np.log((1 + pool_sizes[pool]) / (1 + frequency)) + 1)
+        norms = np.sqrt(np.bincount(row, values * values, minlength=len(pools) * size))
+        values /= norms[row]
+
+        shared = frequency > 1
+        if shared.any():
+            # Dense columns per pool: rank of each shared term among its pool's shared terms
+            shared_keys = np.flatnonzero(counts > 1)
+            key_pool = keys[shared_keys] // self.terms.n_features
+            first = np.searchsorted(key_pool, np.arange(len(pools)))
+            column = np.searchsorted(shared_keys, inverse[shared]) - first[pool[shared]]
+            width = int(column.max()) + 1
+            weights = np.zeros((len(pools) * size, width), dtype=np.float32)
+            weights[row[shared], column] = values[shared]
+            weights = weights.reshape(len(pools), size, width)
+            similarity = weights @ weights.transpose(0, 2, 1)
+
+        # A text is identical to itself even when it shares no term with its pool
+        texts = pool_of_text * size + row_of_text
+        similarity.reshape(len(pools), size * size)[
+            pool_of_text, row_of_text * (size + 1)] = np.where(norms[texts] > 0, 1, 0)
+        return similarity
+
+    def select(self, question):
+        """The chosen options as [(model, response position), ...] in pick order."""
+        return self.select_many([question])[0]
+
+    def select_many(self, questions, block_size=256):
+        """select() for many questions, scoring `block_size` questions per NumPy pass."""
+        picks = []
+        for start in range(0, len(questions), block_size):
+            picks.extend(self._select_block(questions[start:start + block_size]))
+        return picks
+
+    def _select_block(self, questions):
+        candidates = [self._candidates(question) for question in questions]
+        size = max(len(pool) for pool in candidates)
+        if size == 0:
+            return [[] for _ in questions]
+
+        # Row 0 of every pool is the query itself; rows 1.. are the candidates
+        similarity = self._similarities([
+            [question["teacher_query_text"]] + [response["content"] for _, _, response in pool]
+            for question, pool in zip(questions, candidates)])
+        relevance = similarity[:, 0, 1:]
+        pairwise = similarity[:, 1:, 1:]
+
+        rows = np.arange(len(questions))
+        counts = np.array([len(pool) for pool in candidates])
+        available = np.arange(size) < counts[:, None]
+        wanted = np.minimum(self.num_options, counts)
+
+        picked = np.full((len(questions), size), -1)
+        best = np.argmax(np.where(available, relevance, -np.inf), axis=1)
+        # Highest similarity of every candidate to any pick so far
+        redundancy = pairwise[rows, best].copy()
+        for step in range(min(self.num_options, size)):
+            if step:
+                score = (1 - self.diversity) * relevance - self.diversity * redundancy
+                best = np.argmax(np.where(available, score, -np.inf), axis=1)
+                np.maximum(redundancy, pairwise[rows, best], out=redundancy)
+            active = step < wanted
+            picked[active, step] = best[active]
+            available[rows[active], best[active]] = False
+
+        return [[pool[i][:2] for i in order[:count]]
+                for pool, order, count in zip(candidates, picked, wanted)]
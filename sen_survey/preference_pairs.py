@@ -0,0 +1,379 @@
+# RLHF preference pairs from teacher choices, written as bounded, compressed shards
+import gzip
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .records import FormsQuestion
+from .response_ingestion import parse_selected_option
+
+TEACHER_SOURCE = "teacher"
+
+PAIR_FIELDS = ("question_id", "response_id", "teacher", "sen_category", "age_group",
+               "subject", "prompt", "rating_score", "chosen", "rejected", "chosen_source",
+               "rejected_source", "chosen_type", "rejected_type", "pair_id")
+
+# Fields of a rendered Forms entry dict (FormsQuestion.to_dict())
+_QUESTION_TEXT = re.compile(r"^Question \d+: (?P<prompt>.*?)\n\nSEN Category: .*?\n"
+                            r"Age Group: (?P<age_group>.*?)\nSubject: (?P<subject>.*?)\n",
+                            re.DOTALL)
+_OPTION = re.compile(r"^Option \d+ \((?:Focus: )?(?P<type>[^)]*)\): (?P<content>.*)\Z",
+                     re.DOTALL)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError(
+            "Parquet preference shards need pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def anonymize_teacher(teacher_id, salt):
+    """Stable pseudonym for a teacher identifier; None stays None."""
+    if teacher_id in (None, ""):
+        return None
+    digest = hashlib.sha256(f"{salt}:{teacher_id}".encode("utf-8")).hexdigest()
+    return f"teacher_{digest[:16]}"
+
+
+def pair_schema():
+    """Arrow schema of the pair records, so shards agree even on all-None columns."""
+    pa = _require_pyarrow()
+    return pa.schema([(name, pa.float64() if name == "rating_score" else pa.string())
+                      for name in PAIR_FIELDS])
+
+
+def _parse_option(label):
+    """{"type", "content"} of a rendered option line."""
+    match = _OPTION.match(label)
+    if match is None:
+        return {"type": None, "content": label}
+    return {"type": match.group("type"), "content": match.group("content")}
+
+
+def submission_key(submission):
+    """
+    The submission's response_id, or, for exports without one, a stable digest of who
+    answered what and when (so pair ids never collapse onto "None").
+    """
+    response_id = submission.get("response_id")
+    if response_id not in (None, ""):
+        return str(response_id)
+    fields = [submission.get(name) for name in (
+        "teacher_id", "submission_timestamp", "question_id", "selected_option",
+        "improvement_text")]
+    digest = hashlib.sha1(json.dumps(fields, default=str).encode("utf-8")).hexdigest()
+    return f"anon_{digest[:16]}"
+
+
+class PreferencePairBuilder:
+    """
+    Turns teacher answers (response_ingestion.iter_submissions) into chosen/rejected pairs.
+
+    For every answer joined to its Forms question:
+      - the selected option is preferred over each option left unselected;
+      - a teacher's improved response (the 'Other' text box) is preferred over every
+        option, i.e. "Original LLM vs Teacher Enhanced".
+    Teacher identifiers are replaced with salted pseudonyms. Repeated submissions (same
+    submission_key and question, within the last `max_seen`) are skipped, as in
+    response_ingestion.WinRateTally.
+
+    `forms_data` holds FormsQuestion entries (generator.iter_forms_data) or their dicts
+    (format_for_microsoft_forms, or Forms JSON read back); the question fields of a dict
+    are read from its text, and sen_category from its metadata when present.
+    """
+
+    def __init__(self, forms_data, salt="sen-survey", default_model=None, max_seen=1_000_000):
+        self.salt = salt
+        # Source of options whose entry does not name a model (single-model generator)
+        self.default_model = default_model
+        self.max_seen = max_seen
+        self.unmatched = 0
+        self.duplicates = 0
+        # (submission key, question id) -> None, least recently seen first
+        self._seen = OrderedDict()
+        # Hash index: query id and Forms question number -> Forms entry
+        self._questions = {}
+        for forms_question in forms_data:
+            self._questions[str(forms_question["question_number"])] = forms_question
+            query_id = self._query_id(forms_question)
+            if query_id is not None:
+                self._questions[query_id] = forms_question
+
+    @staticmethod
+    def _query_id(forms_question):
+        if isinstance(forms_question, FormsQuestion):
+            return forms_question.query["id"]
+        return forms_question.get("metadata", {}).get("scenario_id")
+
+    def _options(self, forms_question):
+        """[(source model, response), ...] in option order."""
+        if not isinstance(forms_question, FormsQuestion):
+            metadata = forms_question.get("metadata", {})
+            # The last option is always 'Other'
+            responses = [_parse_option(label) for label in forms_question["options"][:-1]]
+            models = metadata.get("option_sources") or [
+                metadata.get("options_source_model", self.default_model)] * len(responses)
+            return list(zip(models, responses))
+        responses = forms_question._option_responses()
+        if forms_question.option_picks is not None:
+            return list(zip((model for model, _ in forms_question.option_picks), responses))
+        model = forms_question.options_model or self.default_model
+        return [(model, response) for response in responses]
+
+    def _question_fields(self, forms_question):
+        """(query id, sen_category, age_group, subject, prompt) of a Forms entry."""
+        if isinstance(forms_question, FormsQuestion):
+            query = forms_question.query
+            return (query["id"], query["sen_category"], query["age_group"],
+                    query["subject"], query["teacher_query_text"])
+        metadata = forms_question.get("metadata", {})
+        match = _QUESTION_TEXT.match(forms_question["question_text"])
+        return (metadata.get("scenario_id"), metadata.get("sen_category"),
+                match and match.group("age_group"), match and match.group("subject"),
+                match and match.group("prompt"))
+
+    def _is_repeat(self, key):
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            self.duplicates += 1
+            return True
+        self._seen[key] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        return False
+
+    def pairs_for(self, submission):
+        """Pair records of one answer (none if the question is unknown or a repeat)."""
+        question_id = str(submission["question_id"]).strip()
+        forms_question = self._questions.get(question_id)
+        if forms_question is None:
+            self.unmatched += 1
+            return []
+        key = submission_key(submission)
+        if self._is_repeat((key, question_id)):
+            return []
+        options = self._options(forms_question)
+        selected = parse_selected_option(submission["selected_option"])
+        improvement = (submission["improvement_text"] or "").strip()
+
+        # 1. (chosen, rejected) sources: option numbers, or 0 for the teacher's text
+        matchups = []
+        if selected and selected <= len(options):
+            matchups += [(selected, number) for number in range(1, len(options) + 1)
+                         if number != selected]
+        if improvement:
+            matchups += [(0, number) for number in range(1, len(options) + 1)]
+
+        # 2. One record per matchup, sharing the question fields
+        query_id, sen_category, age_group, subject, prompt = \
+            self._question_fields(forms_question)
+        response_id = submission["response_id"]
+        base = {
+            "question_id": query_id,
+            "response_id": None if response_id in (None, "") else str(response_id),
+            "teacher": anonymize_teacher(submission["teacher_id"], self.salt),
+            "sen_category": sen_category,
+            "age_group": age_group,
+            "subject": subject,
+            "prompt": prompt,
+            "rating_score": submission["rating_score"],
+        }
+        pairs = []
+        for chosen, rejected in matchups:
+            rejected_model, rejected_response = options[rejected - 1]
+            if chosen:
+                chosen_model, chosen_response = options[chosen - 1]
+                chosen_source, chosen_text = chosen_model, chosen_response["content"]
+                chosen_type = chosen_response["type"]
+            else:
+                chosen_source, chosen_text, chosen_type = TEACHER_SOURCE, improvement, None
+            pair = dict(base, chosen=chosen_text, rejected=rejected_response["content"],
+                        chosen_source=chosen_source, rejected_source=rejected_model,
+                        chosen_type=chosen_type, rejected_type=rejected_response["type"])
+            pair["pair_id"] = hashlib.sha1(
+                f"{key}|{query_id or question_id}|{chosen}|{rejected}"
+                .encode("utf-8")).hexdigest()[:20]
+            pairs.append(pair)
+        return pairs
+
+    def iter_pairs(self, submissions):
+        for submission in submissions:
+            yield from self.pairs_for(submission)
+
+
+class ShardedPairWriter:
+    """
+    Writes records into numbered shards of at most `max_records` records and roughly
+    `max_bytes` of serialised (uncompressed) data, then a manifest.json listing every
+    shard's file, record count, size and SHA-256.
+
+    Records are serialised on the calling thread as they stream in; each full shard is
+    compressed, hashed and written by a pool of `workers` threads (zlib, hashlib and
+    pyarrow release the GIL). At most `workers` shards are in flight, so memory stays
+    around (workers + 1) * max_bytes however many records are written.
+
+    format: "jsonl" (gzip-compressed) or "parquet" (zstd; requires pyarrow). Parquet
+    shards use `schema` (pair_schema() by default), so a shard whose column is all None
+    still gets the same column type as the others.
+
+    Use it as a context manager, or call write()/write_all() and then close(); the
+    directory and the pool are created on first use.
+    """
+
+    def __init__(self, directory, prefix="pairs", file_format="jsonl",
+                 max_records=100_000, max_bytes=64 << 20, workers=4, compresslevel=6,
+                 schema=None):
+        if file_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unsupported shard format {file_format!r}")
+        if file_format == "parquet":
+            _require_pyarrow()
+            schema = schema if schema is not None else pair_schema()
+        self.schema = schema
+        self.directory = directory
+        self.prefix = prefix
+        self.file_format = file_format
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.compresslevel = compresslevel
+        # Serialised lines (jsonl) or {column: values} (parquet) of the shard being filled
+        self._buffer = []
+        self._count = 0
+        self._size = 0
+        self._shards = []
+        self._pending = []
+        self._pool = None
+        self.manifest = None
+
+    def _open(self):
+        if self.manifest is not None:
+            raise ValueError("ShardedPairWriter is closed")
+        if self._pool is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def __enter__(self):
+        self._open()
+        return self
+
+    def write(self, record):
+        if self._pool is None:
+            self._open()
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        if self._count and (self._count >= self.max_records
+                            or self._size + len(line) > self.max_bytes):
+            self._flush()
+        if self.file_format == "jsonl":
+            self._buffer.append(line)
+        else:
+            # Column lists only reference the record's values, far smaller than the dicts
+            if not self._count:
+                self._buffer = {name: [] for name in self.schema.names}
+            for key, column in self._buffer.items():
+                column.append(record.get(key))
+        self._count += 1
+        self._size += len(line)
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+        return self
+
+    def _flush(self):
+        if not self._count:
+            return
+        index = len(self._shards) + len(self._pending)
+        extension = "jsonl.gz" if self.file_format == "jsonl" else "parquet"
+        path = os.path.join(self.directory, f"{self.prefix}-{index:05d}.{extension}")
+        self._pending.append(self._pool.submit(
+            self._write_shard, path, self._buffer, self._count))
+        self._buffer, self._count, self._size = [], 0, 0
+
+        # Back-pressure: wait for the oldest shards once too many are in flight
+        while len(self._pending) >= self.workers:
+            self._shards.append(self._pending.pop(0).result())
+
+    def _write_shard(self, path, payload, count):
+        temporary = path + ".tmp"
+        if self.file_format == "jsonl":
+            data = gzip.compress(b"".join(payload), compresslevel=self.compresslevel, mtime=0)
+            with open(temporary, "wb") as f:
+                f.write(data)
+        else:
+            pa = _require_pyarrow()
+            pa.parquet.write_table(pa.Table.from_pydict(payload, schema=self.schema),
+                                   temporary, compression="zstd")
+        digest = _file_sha256(temporary)
+        os.replace(temporary, path)
+        return {"file": os.path.basename(path), "records": count,
+                "bytes": os.path.getsize(path), "sha256": digest}
+
+    def close(self):
+        """Writes the last shard and the manifest; returns the manifest."""
+        if self.manifest is not None:
+            return self.manifest
+        self._open()
+        try:
+            self._flush()
+            self._shards.extend(future.result() for future in self._pending)
+            self._pending = []
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+
+        manifest = {
+            "format": self.file_format,
+            "compression": "gzip" if self.file_format == "jsonl" else "zstd",
+            "created": datetime.now().isoformat(),
+            "num_records": sum(shard["records"] for shard in self._shards),
+            "shards": self._shards,
+        }
+        path = os.path.join(self.directory, "manifest.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        self.manifest = manifest
+        return manifest
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        elif self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def verify_manifest(directory):
+    """Re-hashes every shard listed in the manifest; returns the files that differ."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [shard["file"] for shard in manifest["shards"]
+            if _file_sha256(os.path.join(directory, shard["file"])) != shard["sha256"]]
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_preference_dataset(forms_data, submissions, directory, file_format="jsonl",
+                             salt="sen-survey", default_model=None, **writer_options):
+    """
+    Streams `submissions` through a PreferencePairBuilder into sharded files under
+    `directory`; returns the manifest.
+    """
+    builder = PreferencePairBuilder(forms_data, salt=salt, default_model=default_model)
+    with ShardedPairWriter(directory, file_format=file_format, **writer_options) as writer:
+        writer.write_all(builder.iter_pairs(submissions))
+    return dict(writer.manifest, unmatched=builder.unmatched, duplicates=builder.duplicates)
@@ -0,0 +1,103 @@
+# Pre-compiled prompt templates and interning of recurring record strings
+import re
+import sys
+from functools import lru_cache
+from operator import itemgetter
+from string import Formatter
+
+# Record fields whose values recur across records (created_date is unique per record)
+INTERNED_FIELDS = ("sen_category", "sen_full_name", "age_group", "subject",
+                   "teacher_query_text", "difficulty_level", "priority")
+
+
+class CompiledTemplate:
+    """
+    A str.format template parsed once into literal text and slot names.
+
+    render() looks the slot values up in a cache of previously rendered prompts, so a
+    prompt that recurs is built once and every record using it shares the same string.
+    Only the slots the template uses are part of the key; once `max_cached` distinct
+    prompts are held, new ones are rendered without being cached.
+    """
+
+    __slots__ = ("template", "slots", "segments", "_positional", "_key", "_cache", "max_cached",
+                 "_pattern")
+
+    def __init__(self, template, max_cached=4096):
+        self.template = template
+        self.max_cached = max_cached
+        # [(literal text, slot name or None), ...]
+        self.segments = []
+        slots = []
+        for literal, name, format_spec, conversion in Formatter().parse(template):
+            if name is not None and (format_spec or conversion or not name.isidentifier()):
+                raise ValueError(
+                    f"Unsupported placeholder {{{name}}} in template {template!r}")
+            self.segments.append((literal, name))
+            if name is not None and name not in slots:
+                slots.append(name)
+        self.slots = tuple(slots)
+
+        # Segments re-joined as a positional format string over the slot tuple, so a
+        # render is a single C-level str.format call with no name lookups
+        self._positional = "".join(
+            literal.replace("{", "{{").replace("}", "}}")
+            + ("" if name is None else f"{{{slots.index(name)}}}")
+            for literal, name in self.segments)
+        if len(slots) > 1:
+            self._key = itemgetter(*slots)
+        else:
+            # itemgetter of a single name returns the bare value, not a tuple
+            self._key = lambda values: tuple(values[slot] for slot in slots)
+        self._cache = {}
+        self._pattern = None
+
+    def render(self, **values):
+        """Same text as template.format(**values); extra keyword arguments are ignored."""
+        key = self._key(values)
+        text = self._cache.get(key)
+        if text is None:
+            text = sys.intern(self._positional.format(*key))
+            if len(self._cache) < self.max_cached:
+                self._cache[key] = text
+        return text
+
+    def match(self, text):
+        """The slot values `text` was rendered from, or None if this template cannot produce it."""
+        if self._pattern is None:
+            parts, seen = [], set()
+            for literal, name in self.segments:
+                parts.append(re.escape(literal))
+                if name in seen:
+                    parts.append(f"(?P={name})")
+                elif name is not None:
+                    parts.append(f"(?P<{name}>.+?)")
+                    seen.add(name)
+            self._pattern = re.compile("".join(parts), re.DOTALL)
+        match = self._pattern.fullmatch(text)
+        return match.groupdict() if match else None
+
+    def __len__(self):
+        return len(self._cache)
+
+
+@lru_cache(maxsize=64)
+def compile_template(template):
+    """
+    The CompiledTemplate of `template`, compiled on first use and shared afterwards.
+    At most 64 templates (each caching up to 4096 prompts) are kept, least recently used
+    dropped first, so a long-lived process does not grow without bound.
+    """
+    return CompiledTemplate(template)
+
+
+def intern_fields(record, fields=INTERNED_FIELDS):
+    """
+    Replaces the string values of `fields` with their interned copies, in place.
+    Used for records rebuilt from JSON or pickles, where every value is a new string.
+    """
+    for field in fields:
+        value = record.get(field)
+        if type(value) is str:
+            record[field] = sys.intern(value)
+    return record
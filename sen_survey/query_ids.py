@@ -0,0 +1,163 @@
+# Collision-free, sortable query ID allocation
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+# query_<12 hex: ms since epoch><6 hex: worker><8 hex: sequence>
+TIME_BITS, WORKER_BITS, SEQUENCE_BITS = 48, 24, 32
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def random_worker_id():
+    """Worker component for a process: its pid mixed with 24 random bits."""
+    return (os.getpid() * 2654435761 ^ random.SystemRandom().getrandbits(WORKER_BITS)) & MAX_WORKER
+
+
+class QueryIdAllocator:
+    """
+    Snowflake-style ids: millisecond timestamp, worker id, per-worker sequence.
+
+    Ids sort by creation time (fixed-width lowercase hex), are strictly increasing within
+    an allocator, thread-safe, and cannot collide across processes with distinct worker
+    ids. Pass an explicit worker_id (e.g. a shard number) when workers are coordinated.
+    """
+
+    def __init__(self, worker_id=None, prefix="query_", clock=time.time):
+        if worker_id is not None and not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER}")
+        self.explicit_worker = worker_id is not None
+        self.worker_id = worker_id if worker_id is not None else random_worker_id()
+        self.prefix = prefix
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._next_sequence = 0
+
+    def _reserve(self, count):
+        """Reserve `count` consecutive sequence numbers; returns (ms, first_sequence)."""
+        with self._lock:
+            now_ms = int(self.clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._next_sequence = 0
+            # Same millisecond or clock went backwards: keep counting on the last timestamp
+            if self._next_sequence + count - 1 > MAX_SEQUENCE:
+                # Sequence space exhausted for this ms; borrow the next millisecond
+                self._last_ms += 1
+                self._next_sequence = 0
+            first = self._next_sequence
+            self._next_sequence += count
+            return self._last_ms, first
+
+    def next_id(self):
+        ms, sequence = self._reserve(1)
+        return f"{self.prefix}{ms:012x}{self.worker_id:06x}{sequence:08x}"
+
+    def reserve_block(self, count):
+        """
+        Reserve `count` consecutive ids in one lock acquisition and return them as an
+        IdBlock, which formats each id only when it is read.
+        """
+        if count > MAX_SEQUENCE + 1:
+            raise ValueError(
+                f"A block holds at most {MAX_SEQUENCE + 1} ids; use allocate()")
+        ms, first = self._reserve(count)
+        return IdBlock(f"{self.prefix}{ms:012x}{self.worker_id:06x}", first, count)
+
+    def allocate(self, count):
+        """`count` ids as a list of strings; far faster than calling next_id in a loop."""
+        ids = []
+        remaining = count
+        while remaining:
+            chunk = min(remaining, MAX_SEQUENCE + 1)
+            ids.extend(self.reserve_block(chunk))
+            remaining -= chunk
+        return ids
+
+    def reseed_worker(self):
+        """Pick a fresh random worker id (called in forked children)."""
+        if not self.explicit_worker:
+            self.worker_id = random_worker_id()
+
+
+class IdBlock:
+    """A reserved run of ids sharing one time/worker head; behaves like a read-only list."""
+
+    __slots__ = ("head", "first", "count", "_format")
+
+    def __init__(self, head, first, count, width=8):
+        self.head = head
+        self.first = first
+        self.count = count
+        self._format = head.replace("%", "%%") + f"%0{width}x"
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("id block index out of range")
+        return self._format % (self.first + index)
+
+    def __iter__(self):
+        return map(self._format.__mod__, range(self.first, self.first + self.count))
+
+
+class SequentialIdAllocator:
+    """
+    Deterministic ids `<prefix><namespace>_<12 hex counter>` for reproducible runs
+    (e.g. sharded generation, where the counter is the query's global index).
+    """
+
+    def __init__(self, namespace, start=0, prefix="query_"):
+        self.head = f"{prefix}{namespace}_"
+        self._next = start
+        self._lock = threading.Lock()
+
+    def _reserve(self, count):
+        with self._lock:
+            first = self._next
+            self._next += count
+            return first
+
+    def next_id(self):
+        return f"{self.head}{self._reserve(1):012x}"
+
+    def seek(self, position):
+        """The next id is the one of counter `position` (e.g. a resumed query's index)."""
+        with self._lock:
+            self._next = position
+
+    def reserve_block(self, count):
+        return IdBlock(self.head, self._reserve(count), count, width=12)
+
+    def allocate(self, count):
+        return list(self.reserve_block(count))
+
+
+def parse_query_id(query_id, prefix="query_"):
+    """Splits an allocator id into (created datetime UTC, worker_id, sequence)."""
+    body = query_id[len(prefix):]
+    ms, worker, sequence = int(body[:12], 16), int(
+        body[12:18], 16), int(body[18:], 16)
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc), worker, sequence
+
+
+_default_allocator = QueryIdAllocator()
+
+
+def default_allocator():
+    """Process-wide allocator shared by generators that are not given one."""
+    return _default_allocator
+
+
+# A forked child inherits the parent's worker id; give it its own
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_default_allocator.reseed_worker)
@@ -0,0 +1,150 @@
+# Vectorized bulk synthesis of teacher queries
+import numpy as np
+
+from .prompt_templates import compile_template
+
+# Order of the categorical draws; fixed so a seed always gives the same batch
+DRAW_FIELDS = ["sen_category", "age_group", "subject", "template", "focus_point",
+               "resource_type", "activity", "difficulty_level", "priority"]
+
+
+class QueryBatch:
+    """
+    Columnar batch of teacher queries.
+
+    codes[field] holds one small integer per query and categories[field] the labels the
+    codes point into, so every categorical is stored once per batch. teacher_query_text
+    is an object array whose entries are shared between queries with identical slots.
+    """
+
+    def __init__(self, ids, codes, categories, teacher_query_text):
+        self.ids = ids
+        self.codes = codes
+        self.categories = categories
+        self.teacher_query_text = teacher_query_text
+
+    def __len__(self):
+        return len(self.teacher_query_text)
+
+    def column(self, field):
+        """Decoded labels for one categorical field, as an object array."""
+        return np.asarray(self.categories[field], dtype=object)[self.codes[field]]
+
+    def iter_records(self):
+        """Yields query dicts shaped like SENQuestionGenerator.create_teacher_query output."""
+        sen = self.codes["sen_category"]
+        age = self.codes["age_group"]
+        subject = self.codes["subject"]
+        difficulty = self.codes["difficulty_level"]
+        priority = self.codes["priority"]
+        sen_codes = self.categories["sen_category"]
+        sen_names = self.categories["sen_full_name"]
+        ages = self.categories["age_group"]
+        subjects = self.categories["subject"]
+        difficulties = self.categories["difficulty_level"]
+        priorities = self.categories["priority"]
+
+        for i in range(len(self)):
+            yield {
+                "id": self.ids[i],
+                "sen_category": sen_codes[sen[i]],
+                "sen_full_name": sen_names[sen[i]],
+                "age_group": ages[age[i]],
+                "subject": subjects[subject[i]],
+                "teacher_query_text": self.teacher_query_text[i],
+                "difficulty_level": difficulties[difficulty[i]],
+                "priority": priorities[priority[i]]
+            }
+
+    def to_records(self):
+        return list(self.iter_records())
+
+
+def synthesize_queries(generator, num_queries, seed=None):
+    """
+    Draws every categorical choice for `num_queries` queries at once with a seeded NumPy
+    generator, then renders each distinct prompt only once per template.
+    `generator` supplies the vocabularies (an SENQuestionGenerator).
+    """
+    rng = np.random.default_rng(seed)
+    n = num_queries
+
+    sen_codes = list(generator.sen_categories)
+    focus_lists = [generator.teacher_focus_points.get(code, ["general support needs"])
+                   for code in sen_codes]
+    # All focus points in one flat vocabulary; each SEN type owns a contiguous slice
+    focus_offsets = np.cumsum([0] + [len(points) for points in focus_lists[:-1]])
+    focus_counts = np.array([len(points) for points in focus_lists])
+    focus_labels = [point for points in focus_lists for point in points]
+
+    # 1. All categorical selections in one go
+    sizes = {
+        "sen_category": len(sen_codes),
+        "age_group": len(generator.age_groups),
+        "subject": len(generator.subjects),
+        "template": len(generator.teacher_question_templates),
+        "resource_type": len(generator.resource_types),
+        "activity": len(generator.activities),
+        "difficulty_level": len(generator.difficulty_levels),
+        "priority": len(generator.priorities),
+    }
+    codes = {}
+    for field in DRAW_FIELDS:
+        if field == "focus_point":
+            sen = codes["sen_category"]
+            local = (rng.random(n) * focus_counts[sen]).astype(np.int32)
+            codes[field] = (focus_offsets[sen] + local).astype(np.int32)
+        else:
+            codes[field] = rng.integers(
+                0, sizes[field], n, dtype=np.int32)
+
+    categories = {
+        "sen_category": sen_codes,
+        "sen_full_name": [generator.sen_categories[code] for code in sen_codes],
+        "age_group": list(generator.age_groups),
+        "subject": list(generator.subjects),
+        "template": list(generator.teacher_question_templates),
+        "focus_point": focus_labels,
+        "resource_type": list(generator.resource_types),
+        "activity": list(generator.activities),
+        "difficulty_level": list(generator.difficulty_levels),
+        "priority": list(generator.priorities),
+    }
+    # Template slot name -> (code column, labels)
+    slot_sources = {
+        "sen_type": ("sen_category", categories["sen_full_name"]),
+        "age_group": ("age_group", categories["age_group"]),
+        "subject": ("subject", categories["subject"]),
+        "focus_point": ("focus_point", categories["focus_point"]),
+        "resource_type": ("resource_type", categories["resource_type"]),
+        "activity": ("activity", categories["activity"]),
+    }
+
+    # 2. Render prompts grouped by template; only the slots a template uses make it distinct.
+    #    Compiled templates also share the rendered strings across batches
+    prompts = np.empty(n, dtype=object)
+    for t, template in enumerate(categories["template"]):
+        rows = np.flatnonzero(codes["template"] == t)
+        if not len(rows):
+            continue
+        compiled = compile_template(template)
+        slots = compiled.slots
+
+        # Mixed-radix key over the used slots -> one int64 per query
+        key = np.zeros(len(rows), dtype=np.int64)
+        for slot in slots:
+            field, labels = slot_sources[slot]
+            key = key * len(labels) + codes[field][rows]
+        unique_keys, first_rows, inverse = np.unique(
+            key, return_index=True, return_inverse=True)
+
+        rendered = np.empty(len(unique_keys), dtype=object)
+        for u, row in enumerate(rows[first_rows]):
+            rendered[u] = compiled.render(**{
+                slot: slot_sources[slot][1][codes[slot_sources[slot][0]][row]] for slot in slots})
+        prompts[rows] = rendered[inverse.ravel()]
+
+    # 3. One reserved block of ids; each id string is only built when read
+    ids = generator.id_allocator.reserve_block(n)
+
+    return QueryBatch(ids, codes, categories, prompts)
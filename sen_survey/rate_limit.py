@@ -0,0 +1,228 @@
+# Per-model token-bucket rate limiting and adaptive retry scheduling
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from .llm_backends import BackendError, LLMBackend
+
+# Lower rank is served first; matches the "priority" field of teacher queries
+PRIORITY_RANKS = {"High": 0, "Medium": 1, "Low": 2}
+
+# Priority of the model call being made in the current thread / asyncio task
+current_priority = contextvars.ContextVar(
+    "current_priority", default="Medium")
+
+
+class ManualClock:
+    """Simulated clock: sleep() advances time instantly. Pass .now / .sleep to ModelScheduler."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += max(0.0, seconds)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`.
+    `capacity` bounds the burst size; the default (10 seconds' worth) keeps the
+    sending rate smooth instead of spending a whole minute's quota at once.
+    A request larger than `capacity` waits for a full bucket and then takes the bucket
+    into debt (a negative balance), so later requests wait until its full cost is repaid.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = capacity if capacity is not None else max(
+            1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until a request of `amount` tokens may be sent (0 if it may be sent now)."""
+        self._refill()
+        # An oversized request can never find `amount` tokens; a full bucket lets it through
+        amount = min(amount, self.capacity)
+        # Small tolerance so float rounding after a timed sleep cannot stall the caller
+        if self.tokens >= amount - 1e-9:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        """Spend the full `amount`, going into debt if it exceeds the balance."""
+        self._refill()
+        self.tokens -= amount
+
+    def slow_down(self, factor=0.5, floor=0.1):
+        """Multiplicative decrease after the provider throttled us."""
+        self.rate = max(self.max_rate * floor, self.rate * factor)
+
+    def speed_up(self, step=0.05):
+        """Additive increase back towards the configured rate after a success."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate * step)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff ("full jitter") honouring Retry-After when given."""
+
+    retryable_status_codes = {408, 409, 429, 500, 502, 503, 504}
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0, rng=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def is_retryable(self, exc):
+        if not isinstance(exc, BackendError):
+            return False
+        # No status code means the request never got an answer (timeout, reset...)
+        return exc.status_code is None or exc.status_code in self.retryable_status_codes
+
+    def delay(self, attempt, retry_after=None):
+        backoff = self.rng.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            return max(retry_after, backoff)
+        return backoff
+
+
+class ModelScheduler(LLMBackend):
+    """
+    Wraps a backend with per-model request/token buckets and retries.
+
+    limits: {"GPT-4o": {"requests_per_minute": 500, "tokens_per_minute": 30000}, ...}
+    Models without an entry are not rate limited. When several callers (threads or
+    asyncio tasks) wait on the same model, the one with the best `current_priority`
+    ("High" > "Medium" > "Low") is served first, FIFO within a priority. The generator
+    sets current_priority to the query's priority around its model calls, sync and
+    async alike; batched calls carry whatever priority their caller has set.
+    """
+
+    def __init__(self, backend, limits=None, retry_policy=None, tokens_per_response=300,
+                 clock=time.monotonic, sleep=time.sleep, poll_interval=0.01):
+        self.backend = backend
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.tokens_per_response = tokens_per_response
+        self.clock = clock
+        self.sleep = sleep
+        self.poll_interval = poll_interval
+
+        self.request_buckets = {}
+        self.token_buckets = {}
+        for model_name, model_limits in (limits or {}).items():
+            if model_limits.get("requests_per_minute"):
+                self.request_buckets[model_name] = TokenBucket(
+                    model_limits["requests_per_minute"], clock=clock)
+            if model_limits.get("tokens_per_minute"):
+                self.token_buckets[model_name] = TokenBucket(
+                    model_limits["tokens_per_minute"], clock=clock)
+
+        self.retries = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._waiting = {}
+        self._sequence = itertools.count()
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def estimate_tokens(self, prompts, num_responses):
+        """Rough prompt (~4 chars/token) + completion budget for a call."""
+        prompt_tokens = sum(len(prompt) for prompt in prompts) // 4
+        return prompt_tokens + self.tokens_per_response * num_responses * len(prompts)
+
+    def _wait_time(self, model_name, tokens):
+        waits = [0.0]
+        if model_name in self.request_buckets:
+            waits.append(self.request_buckets[model_name].wait_time(1))
+        if model_name in self.token_buckets:
+            waits.append(self.token_buckets[model_name].wait_time(tokens))
+        return max(waits)
+
+    def acquire(self, model_name, tokens, priority="Medium"):
+        """Block until this call may be sent, serving higher priorities first."""
+        if model_name not in self.request_buckets and model_name not in self.token_buckets:
+            return
+
+        ticket = (PRIORITY_RANKS.get(priority, 1), next(self._sequence))
+        with self._lock:
+            queue = self._waiting.setdefault(model_name, [])
+            heapq.heappush(queue, ticket)
+
+        while True:
+            with self._lock:
+                wait = self._wait_time(model_name, tokens)
+                if queue[0] == ticket and wait == 0.0:
+                    heapq.heappop(queue)
+                    if model_name in self.request_buckets:
+                        self.request_buckets[model_name].consume(1)
+                    if model_name in self.token_buckets:
+                        self.token_buckets[model_name].consume(tokens)
+                    return
+                if queue[0] != ticket:
+                    # Someone more urgent is ahead of us; check back shortly
+                    wait = self.poll_interval
+            self.sleep(wait)
+
+    def _record_retry(self, model_name, status_code):
+        with self._lock:
+            self.retries += 1
+            if status_code == 429:
+                self.throttled += 1
+                for buckets in (self.request_buckets, self.token_buckets):
+                    if model_name in buckets:
+                        buckets[model_name].slow_down()
+
+    def _reward(self, model_name):
+        with self._lock:
+            for buckets in (self.request_buckets, self.token_buckets):
+                if model_name in buckets:
+                    buckets[model_name].speed_up()
+
+    def _call_with_retries(self, model_name, tokens, call):
+        priority = current_priority.get()
+        attempt = 0
+        while True:
+            self.acquire(model_name, tokens, priority)
+            try:
+                result = call()
+            except BackendError as exc:
+                if attempt >= self.retry_policy.max_retries or not self.retry_policy.is_retryable(exc):
+                    raise
+                self._record_retry(model_name, exc.status_code)
+                self.sleep(self.retry_policy.delay(attempt, exc.retry_after))
+                attempt += 1
+                continue
+            self._reward(model_name)
+            return result
+
+    def generate(self, query_text, model_name, num_responses=4):
+        tokens = self.estimate_tokens([query_text], num_responses)
+        return self._call_with_retries(
+            model_name, tokens,
+            lambda: self.backend.generate(query_text, model_name, num_responses))
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        tokens = self.estimate_tokens(prompts, num_responses)
+        return self._call_with_retries(
+            model_name, tokens,
+            lambda: self.backend.generate_batch(prompts, model_name, num_responses))
+
+    def close(self):
+        self.backend.close()
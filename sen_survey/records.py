@@ -0,0 +1,413 @@
+# Compact slotted record types for queries, model responses and Forms questions
+import math
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+
+
+class Vocabulary:
+    """
+    Process-wide label <-> small integer code table for one categorical field.
+    Codes are assigned on first sight, so custom vocabularies work unchanged; records
+    pickle their labels (not codes) and are re-coded in the receiving process.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.labels = []
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def code(self, label):
+        if label is None:
+            return None
+        code = self._codes.get(label)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(label)
+                if code is None:
+                    code = len(self.labels)
+                    self.labels.append(sys.intern(label))
+                    self._codes[label] = code
+        return code
+
+    def label(self, code):
+        return None if code is None else self.labels[code]
+
+    def __len__(self):
+        return len(self.labels)
+
+
+SEN_CATEGORIES = Vocabulary("sen_category")
+SEN_FULL_NAMES = Vocabulary("sen_full_name")
+AGE_GROUPS = Vocabulary("age_group")
+SUBJECTS = Vocabulary("subject")
+DIFFICULTY_LEVELS = Vocabulary("difficulty_level")
+PRIORITIES = Vocabulary("priority")
+RESPONSE_TYPES = Vocabulary("response_type")
+
+# Packed "missing" markers: no response type code, no quality score
+_NO_CODE = 0xFFFF
+_NO_SCORE = math.nan
+
+# One shared instance per distinct small tuple (model lists, response counts and ids)
+_shared_tuples = {}
+_MAX_SHARED = 100_000
+
+
+def _shared(values):
+    shared = _shared_tuples.get(values)
+    if shared is None:
+        if len(_shared_tuples) >= _MAX_SHARED:
+            return values
+        shared = _shared_tuples.setdefault(values, values)
+    return shared
+
+
+class _Record(Mapping):
+    """
+    Read-only Mapping view over the slots, so dict-based consumers keep working
+    (items(), values(), isinstance(record, Mapping)). json.dumps needs as_dict(record).
+    """
+
+    __slots__ = ()
+    _keys = ()
+
+    def keys(self):
+        return list(self._keys)
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._keys else default
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, _Record)):
+            return self.to_dict() == as_dict(other)
+        return NotImplemented
+
+    def __reduce__(self):
+        # Codes are only meaningful inside one process; pickle the labels
+        return type(self).from_dict, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ModelResponse(_Record):
+    """
+    One model answer: {"id", "type", "content", "quality_score"}, plus "fallback_model"
+    when a fallback model answered instead (see hedging.HedgedBackend).
+    """
+
+    __slots__ = ("id", "type_code", "content", "quality_score", "fallback_model")
+
+    def __init__(self, id, type, content, quality_score, fallback_model=None):
+        self.id = id
+        self.type_code = RESPONSE_TYPES.code(type)
+        self.content = content
+        self.quality_score = quality_score
+        self.fallback_model = fallback_model
+
+    @classmethod
+    def _from_packed(cls, id, type_code, content, quality_score, fallback_model=None):
+        response = cls.__new__(cls)
+        response.id = id
+        response.type_code = None if type_code == _NO_CODE else type_code
+        response.content = content
+        response.quality_score = None if math.isnan(quality_score) else quality_score
+        response.fallback_model = fallback_model
+        return response
+
+    @property
+    def _keys(self):
+        if self.fallback_model is None:
+            return ("id", "type", "content", "quality_score")
+        return ("id", "type", "content", "quality_score", "fallback_model")
+
+    @property
+    def type(self):
+        return RESPONSE_TYPES.label(self.type_code)
+
+    @classmethod
+    def from_dict(cls, response):
+        return cls(response.get("id"), response.get("type"), response.get("content"),
+                   response.get("quality_score"), response.get("fallback_model"))
+
+    def to_dict(self):
+        response = {"id": self.id, "type": self.type, "content": self.content,
+                    "quality_score": self.quality_score}
+        if self.fallback_model is not None:
+            response["fallback_model"] = self.fallback_model
+        return response
+
+
+class TeacherQuery(_Record):
+    """
+    A teacher query and the responses of every model, with the categorical fields held
+    as Vocabulary codes. Reads like the generator's dict records: query["age_group"],
+    query["all_model_responses"][model][0]["content"], ...
+
+    Responses are packed column-wise over all models (ids, type codes, contents, quality
+    scores, fallback models if any, plus the number of responses per model) and handed
+    out as ModelResponse objects when read. Records of the single-model generator (single_model.py) keep their
+    one response list under "llm_responses" instead of "all_model_responses".
+    """
+
+    __slots__ = ("id", "sen_code", "sen_name_code", "age_code", "subject_code",
+                 "teacher_query_text", "difficulty_code", "priority_code", "created_date",
+                 "duplicate_of", "models", "counts", "response_ids", "response_types",
+                 "response_contents", "quality_scores", "fallback_models", "single_model")
+
+    def __init__(self, id, sen_category, sen_full_name, age_group, subject,
+                 teacher_query_text, difficulty_level=None, priority=None,
+                 all_model_responses=None, created_date=None, duplicate_of=None,
+                 single_model=False):
+        all_model_responses = all_model_responses or {}
+        self.id = id
+        self.sen_code = SEN_CATEGORIES.code(sen_category)
+        self.sen_name_code = SEN_FULL_NAMES.code(sen_full_name)
+        self.age_code = AGE_GROUPS.code(age_group)
+        self.subject_code = SUBJECTS.code(subject)
+        self.teacher_query_text = teacher_query_text
+        self.difficulty_code = DIFFICULTY_LEVELS.code(difficulty_level)
+        self.priority_code = PRIORITIES.code(priority)
+        self.created_date = created_date
+        self.duplicate_of = duplicate_of
+        self.single_model = single_model
+        self.models = _shared(tuple(all_model_responses))
+
+        counts, ids, contents, fallbacks = [], [], [], []
+        types, scores = array("H"), array("d")
+        for responses in all_model_responses.values():
+            counts.append(len(responses))
+            for response in responses:
+                ids.append(response["id"])
+                code = RESPONSE_TYPES.code(response["type"])
+                types.append(_NO_CODE if code is None else code)
+                contents.append(response["content"])
+                score = response["quality_score"]
+                scores.append(_NO_SCORE if score is None else score)
+                fallbacks.append(response.get("fallback_model"))
+        # Counts and ids repeat from record to record, so one tuple of each is shared
+        self.counts = _shared(tuple(counts))
+        self.response_ids = _shared(tuple(ids))
+        self.response_types = types
+        self.response_contents = tuple(contents)
+        self.quality_scores = scores
+        # Usually no response came from a fallback model: nothing stored then
+        self.fallback_models = _shared(tuple(fallbacks)) if any(fallbacks) else None
+
+    @property
+    def _keys(self):
+        keys = ["id", "sen_category", "sen_full_name", "age_group", "subject",
+                "teacher_query_text", "difficulty_level", "priority"]
+        if self.duplicate_of is not None:
+            keys.append("duplicate_of")
+        keys.append("llm_responses" if self.single_model else "all_model_responses")
+        keys.append("created_date")
+        return keys
+
+    @property
+    def sen_category(self):
+        return SEN_CATEGORIES.label(self.sen_code)
+
+    @property
+    def sen_full_name(self):
+        return SEN_FULL_NAMES.label(self.sen_name_code)
+
+    @property
+    def age_group(self):
+        return AGE_GROUPS.label(self.age_code)
+
+    @property
+    def subject(self):
+        return SUBJECTS.label(self.subject_code)
+
+    @property
+    def difficulty_level(self):
+        return DIFFICULTY_LEVELS.label(self.difficulty_code)
+
+    @property
+    def priority(self):
+        return PRIORITIES.label(self.priority_code)
+
+    def _responses(self, start, stop):
+        fallbacks = self.fallback_models
+        return [ModelResponse._from_packed(self.response_ids[i], self.response_types[i],
+                                           self.response_contents[i], self.quality_scores[i],
+                                           fallbacks[i] if fallbacks else None)
+                for i in range(start, stop)]
+
+    def iter_model_responses(self):
+        """Yields (model, [ModelResponse, ...]) in model order."""
+        start = 0
+        for model, count in zip(self.models, self.counts):
+            yield model, self._responses(start, start + count)
+            start += count
+
+    @property
+    def all_model_responses(self):
+        return dict(self.iter_model_responses())
+
+    @property
+    def llm_responses(self):
+        return self._responses(0, self.counts[0]) if self.counts else []
+
+    def responses_for(self, model):
+        """The responses of `model` (empty if it was not asked), without building a dict."""
+        if model not in self.models:
+            return []
+        position = self.models.index(model)
+        start = sum(self.counts[:position])
+        return self._responses(start, start + self.counts[position])
+
+    @classmethod
+    def from_dict(cls, record, model_name=None):
+        """
+        Converts a generator record. A single-model record ("llm_responses") is stored
+        under `model_name` (its "llm_responses" key is kept on the way back out).
+        """
+        single_model = "llm_responses" in record
+        if single_model:
+            all_model_responses = {model_name: record["llm_responses"]}
+        else:
+            all_model_responses = record.get("all_model_responses")
+        return cls(record["id"], record["sen_category"], record.get("sen_full_name"),
+                   record["age_group"], record["subject"], record["teacher_query_text"],
+                   record.get("difficulty_level"), record.get("priority"),
+                   all_model_responses, record.get("created_date"),
+                   record.get("duplicate_of"), single_model)
+
+    def to_dict(self):
+        """The equivalent generator record (same keys, same order)."""
+        record = {}
+        for key in self._keys:
+            if key == "all_model_responses":
+                record[key] = {model: [response.to_dict() for response in responses]
+                               for model, responses in self.iter_model_responses()}
+            elif key == "llm_responses":
+                record[key] = [response.to_dict() for response in self.llm_responses]
+            else:
+                record[key] = getattr(self, key)
+        return record
+
+    def __reduce__(self):
+        model_name = self.models[0] if self.single_model and self.models else None
+        return _rebuild_query, (self.to_dict(), model_name)
+
+
+def _rebuild_query(record, model_name):
+    return TeacherQuery.from_dict(record, model_name)
+
+
+class FormsQuestion(_Record):
+    """
+    One Microsoft Forms multiple-choice question, rendered from its query on demand
+    instead of storing the question text and options of every entry.
+
+    `options_model` picks the model whose responses become the options (None for the
+    single-model generator); `option_format` is the shared option line template.
+    `option_picks` ([(model, response position), ...], e.g. from
+    option_selection.DiverseOptionSelector) overrides `options_model` with responses
+    drawn from several models.
+    """
+
+    __slots__ = ("question_number", "query", "options_model", "option_format", "option_picks")
+
+    question_type = "Multiple Choice"
+    required = True
+    follow_up_text = "If you selected 'Other', please provide your improved response:"
+    other_option = "Other (Please specify your improved response in the text box below)"
+
+    def __init__(self, question_number, query, options_model=None,
+                 option_format="Option {number} ({type}): {content}", option_picks=None):
+        self.question_number = question_number
+        self.query = query
+        self.options_model = options_model
+        self.option_format = option_format
+        self.option_picks = tuple(option_picks) if option_picks is not None else None
+
+    @property
+    def _keys(self):
+        keys = ["question_number", "question_text", "options", "follow_up_text", "metadata"]
+        if self.options_model is None and self.option_picks is None:
+            keys[2:2] = ["question_type"]
+            keys[4:4] = ["required"]
+        return keys
+
+    @property
+    def question_text(self):
+        query = self.query
+        return (f"Question {self.question_number}: {query['teacher_query_text']}\n\n"
+                f"SEN Category: {query['sen_full_name']}\n"
+                f"Age Group: {query['age_group']}\n"
+                f"Subject: {query['subject']}\n\n"
+                "Please select the BEST response from the options below, or choose 'Other' "
+                "to provide your own improved answer:")
+
+    def _option_responses(self):
+        query = self.query
+        if self.option_picks is not None:
+            if isinstance(query, TeacherQuery):
+                return [query.responses_for(model)[position]
+                        for model, position in self.option_picks]
+            return [query["all_model_responses"][model][position]
+                    for model, position in self.option_picks]
+        if self.options_model is None:
+            return query["llm_responses"]
+        if isinstance(query, TeacherQuery):
+            return query.responses_for(self.options_model)
+        return query["all_model_responses"].get(self.options_model, [])
+
+    @property
+    def options(self):
+        options = [self.option_format.format(number=j, type=response["type"],
+                                             content=response["content"])
+                   for j, response in enumerate(self._option_responses(), 1)]
+        options.append(self.other_option)
+        return options
+
+    @property
+    def metadata(self):
+        if self.option_picks is not None:
+            sources = [model for model, _ in self.option_picks]
+            return {"options_source_model": ", ".join(dict.fromkeys(sources)),
+                    "option_sources": sources}
+        if self.options_model is not None:
+            return {"options_source_model": self.options_model}
+        query = self.query
+        return {"sen_category": query["sen_category"], "age_group": query["age_group"],
+                "subject": query["subject"], "scenario_id": query["id"]}
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self._keys}
+
+    def __reduce__(self):
+        return FormsQuestion, (self.question_number, self.query, self.options_model,
+                               self.option_format, self.option_picks)
+
+
+def iter_model_responses(question):
+    """(model, responses) pairs of a dict record or a TeacherQuery, without copying."""
+    if isinstance(question, TeacherQuery):
+        return question.iter_model_responses()
+    return question['all_model_responses'].items()
+
+
+def as_dict(record):
+    """Plain dict form of a record (dicts are returned as they are), e.g. for json.dumps."""
+    return record.to_dict() if isinstance(record, _Record) else record
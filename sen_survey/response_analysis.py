@@ -0,0 +1,352 @@
+# Cross-model agreement analysis: response embeddings, an IVF nearest-neighbour index,
+# per-query and corpus clusters, and consensus/outlier scores per model
+import csv
+import re
+
+import numpy as np
+
+from .option_selection import HashedTermCounts
+from .records import iter_model_responses
+
+_CONTENT_COLUMN = re.compile(r"^(?P<model>.+)_Response_(?P<rank>\d+)_Content$")
+
+
+class ResponseCorpus:
+    """
+    Columnar view of every response of a survey: one row per (query, model, response)
+    in query order, with the response text stored once per distinct text.
+    """
+
+    def __init__(self):
+        self.query_ids = []
+        self.models = []
+        self.texts = []
+        self._model_codes = {}
+        self._text_codes = {}
+        self._query_index = []
+        self._model_index = []
+        self._text_index = []
+
+    def add(self, query_id, model, content):
+        model_code = self._model_codes.get(model)
+        if model_code is None:
+            model_code = self._model_codes[model] = len(self.models)
+            self.models.append(model)
+        text_code = self._text_codes.get(content)
+        if text_code is None:
+            text_code = self._text_codes[content] = len(self.texts)
+            self.texts.append(content)
+        if not self.query_ids or self.query_ids[-1] != query_id:
+            self.query_ids.append(query_id)
+        self._query_index.append(len(self.query_ids) - 1)
+        self._model_index.append(model_code)
+        self._text_index.append(text_code)
+
+    @classmethod
+    def from_records(cls, questions):
+        """From generator records (dicts or records.TeacherQuery), read once."""
+        corpus = cls()
+        for question in questions:
+            for model, responses in iter_model_responses(question):
+                for response in responses:
+                    corpus.add(question["id"], model, response["content"])
+        return corpus
+
+    @classmethod
+    def from_csv(cls, filename):
+        """
+        From the flattened multi-model CSV (SENQuestionGenerator.export_to_csv).
+        Models are named by their column prefix, e.g. "GPT4o" or "Gemini_25_Pro".
+        """
+        corpus = cls()
+        with open(filename, encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            content_columns = []
+            # An empty file has no header (fieldnames is None)
+            for column in reader.fieldnames or ():
+                match = _CONTENT_COLUMN.match(column)
+                if match:
+                    content_columns.append((column, match.group("model")))
+            for row in reader:
+                for column, model in content_columns:
+                    if row[column]:
+                        corpus.add(row["Question_ID"], model, row[column])
+        return corpus
+
+    @property
+    def query_index(self):
+        return np.asarray(self._query_index, dtype=np.int64)
+
+    @property
+    def model_index(self):
+        return np.asarray(self._model_index, dtype=np.int32)
+
+    @property
+    def text_index(self):
+        return np.asarray(self._text_index, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._text_index)
+
+
+class ResponseEmbedder:
+    """
+    Dense `dim`-dimensional TF-IDF embeddings: hashed unigram/bigram counts weighted by
+    the corpus IDF, folded into `dim` signed buckets and L2-normalised, so cosine
+    similarity is a dot product.
+    """
+
+    def __init__(self, dim=256, n_features=1 << 20, chunk_size=50_000):
+        self.dim = dim
+        self.chunk_size = chunk_size
+        self.terms = HashedTermCounts(n_features, max_cached=0)
+        self.idf = None
+
+    def _iter_counts(self, texts):
+        for start in range(0, len(texts), self.chunk_size):
+            yield start, self.terms.count_many(texts[start:start + self.chunk_size])
+
+    def fit(self, texts):
+        document_frequency = np.zeros(self.terms.n_features, dtype=np.int64)
+        for _, (_, indices, _) in self._iter_counts(texts):
+            document_frequency += np.bincount(indices, minlength=self.terms.n_features)
+        self.idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts):
+        if self.idf is None:
+            raise ValueError("ResponseEmbedder.fit() must be called before transform()")
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start, (rows, terms, values) in self._iter_counts(texts):
+            chunk = embeddings[start:start + self.chunk_size]
+            # The bucket comes from the low bits of the term hash, the sign from a high one
+            signs = np.where((terms >> 17) & 1, -1.0, 1.0)
+            chunk[:] = np.bincount(rows * self.dim + terms % self.dim,
+                                   weights=values * self.idf[terms] * signs,
+                                   minlength=len(chunk) * self.dim).reshape(len(chunk), self.dim)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms > 0, norms, 1)
+        return embeddings
+
+    def fit_transform(self, texts):
+        return self.fit(texts).transform(texts)
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over unit vectors (inner product).
+
+    A spherical k-means coarse quantizer splits the vectors into `nlist` lists; a search
+    only scans the `nprobe` lists whose centroids are closest to the query. Queries are
+    processed in blocks and each probed list is scored for all of its queries with one
+    matrix product. The list assignment doubles as a corpus-wide clustering (`labels`).
+    """
+
+    def __init__(self, nlist=None, nprobe=8, train_iterations=10, seed=0):
+        # nlist defaults to 4 * sqrt(number of vectors)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None
+        self.labels = None
+        self._lists = []
+
+    def _nearest_centroids(self, vectors, count, block_size=65_536):
+        nearest = np.empty((len(vectors), count), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            scores = vectors[start:start + block_size] @ self.centroids.T
+            if count == 1:
+                nearest[start:start + block_size, 0] = scores.argmax(axis=1)
+            else:
+                top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+                order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+                nearest[start:start + block_size] = np.take_along_axis(top, order, axis=1)
+        return nearest
+
+    def train(self, vectors, sample_size=None):
+        """Spherical k-means on a sample of `vectors` (32 points per list by default)."""
+        rng = np.random.default_rng(self.seed)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        sample_size = min(len(vectors), sample_size or 32 * nlist)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        self.centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignment = self._nearest_centroids(sample, 1)[:, 0]
+            # Per-list sums from one sort and a segmented reduction (np.add.at is slow)
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=nlist)
+            sums = np.zeros_like(self.centroids)
+            filled = counts > 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+            sums[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = ~filled
+            # Re-seed empty lists with random sample points
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            self.centroids = sums / np.where(norms > 0, norms, 1)
+        self.nlist = nlist
+        return self
+
+    def add(self, vectors):
+        """Index `vectors` (ids are their row numbers); trains first if needed."""
+        if self.centroids is None:
+            self.train(vectors)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.labels = self._nearest_centroids(self.vectors, 1)[:, 0]
+        order = np.argsort(self.labels, kind="stable")
+        bounds = np.searchsorted(self.labels[order], np.arange(self.nlist + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+        return self
+
+    def search(self, queries, k=10, nprobe=None, block_size=16_384):
+        """(ids, similarities) of the approximate `k` nearest indexed vectors per query."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        similarities = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            probes = self._nearest_centroids(block, nprobe)
+            # Best k of every (query, probed list), merged into the final k at the end
+            candidate_ids = np.full((len(block), nprobe, k), -1, dtype=np.int64)
+            candidate_scores = np.full((len(block), nprobe, k), -np.inf, dtype=np.float32)
+
+            # Group the (query, probe slot) pairs by list so each list is scored once
+            pairs = np.argsort(probes, axis=None, kind="stable")
+            pair_lists = probes.ravel()[pairs]
+            bounds = np.flatnonzero(np.diff(pair_lists, prepend=-1, append=self.nlist))
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                members = self._lists[pair_lists[first]]
+                if not len(members):
+                    continue
+                rows, slots = np.divmod(pairs[first:last], nprobe)
+                scores = block[rows] @ self.vectors[members].T
+                keep = min(k, len(members))
+                if keep < len(members):
+                    top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+                    scores = np.take_along_axis(scores, top, axis=1)
+                    hits = members[top]
+                else:
+                    hits = np.broadcast_to(members, scores.shape)
+                candidate_scores[rows, slots, :keep] = scores
+                candidate_ids[rows, slots, :keep] = hits
+
+            candidate_scores = candidate_scores.reshape(len(block), nprobe * k)
+            candidate_ids = candidate_ids.reshape(len(block), nprobe * k)
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            similarities[start:start + block_size] = np.take_along_axis(candidate_scores, top, axis=1)
+            ids[start:start + block_size] = np.take_along_axis(candidate_ids, top, axis=1)
+
+        order = np.argsort(-similarities, axis=1)
+        return np.take_along_axis(ids, order, axis=1), np.take_along_axis(similarities, order, axis=1)
+
+
+def _query_blocks(query_index, block_size):
+    """(start, stop, widest query) row ranges holding `block_size` whole queries each."""
+    bounds = np.flatnonzero(np.diff(query_index, prepend=-1, append=query_index[-1] + 1))
+    for first in range(0, len(bounds) - 1, block_size):
+        last = min(first + block_size, len(bounds) - 1)
+        widths = np.diff(bounds[first:last + 1])
+        yield bounds[first], bounds[last], bounds[first:last], int(widths.max())
+
+
+def analyze_consensus(corpus, embeddings=None, threshold=0.8, k=10, index=None,
+                      block_size=4096):
+    """
+    Agreement between models, from the response embeddings (one row per distinct text;
+    computed with a ResponseEmbedder when not given).
+
+    Per response (arrays aligned with the corpus rows):
+      consensus       mean similarity to the other models' responses to the same query
+      support         highest similarity to another model's response to the same query
+      query_cluster   cluster within its query (responses linked at >= threshold), labelled
+                      by the corpus row of its first member, so labels are unique corpus-wide
+      corpus_cluster  IVF list of its text, a corpus-wide clustering
+    Per model: mean consensus (None if no query had another model's response), outlier
+    rate (share of responses with no other model's response to the same query at
+    >= threshold), and corpus agreement (share of the text's k approximate nearest
+    neighbours in the corpus that another model produced). An empty corpus gives an
+    empty result.
+    """
+    if not len(corpus):
+        empty = np.zeros(0, dtype=np.float32)
+        return {"models": {}, "consensus": empty, "support": empty.copy(),
+                "query_cluster": np.zeros(0, dtype=np.int64),
+                "corpus_cluster": np.zeros(0, dtype=np.int64)}
+    if embeddings is None:
+        embeddings = ResponseEmbedder().fit_transform(corpus.texts)
+    if index is None:
+        index = IVFIndex().add(embeddings)
+
+    query_index = corpus.query_index
+    model_index = corpus.model_index
+    text_index = corpus.text_index
+    consensus = np.full(len(corpus), np.nan, dtype=np.float32)
+    support = np.full(len(corpus), np.nan, dtype=np.float32)
+    query_cluster = np.zeros(len(corpus), dtype=np.int64)
+
+    for start, stop, query_starts, width in _query_blocks(query_index, block_size):
+        # Pad the block's queries into (queries, width) slots
+        sizes = np.diff(np.append(query_starts, stop))
+        slot_query = np.repeat(np.arange(len(query_starts)), sizes)
+        local = np.arange(start, stop) - np.repeat(query_starts, sizes)
+        valid = np.zeros((len(query_starts), width), dtype=bool)
+        valid[slot_query, local] = True
+        vectors = np.zeros((len(query_starts), width, embeddings.shape[1]), dtype=np.float32)
+        vectors[slot_query, local] = embeddings[text_index[start:stop]]
+        models = np.full((len(query_starts), width), -1, dtype=np.int32)
+        models[slot_query, local] = model_index[start:stop]
+
+        similarity = vectors @ vectors.transpose(0, 2, 1)
+        other = (models[:, :, None] != models[:, None, :]) & valid[:, :, None] & valid[:, None, :]
+        others = other.sum(axis=2)
+        mean_other = np.where(other, similarity, 0).sum(axis=2) / np.maximum(others, 1)
+        best_other = np.where(other, similarity, -np.inf).max(axis=2)
+        consensus[start:stop] = np.where(others > 0, mean_other, np.nan)[slot_query, local]
+        support[start:stop] = np.where(others > 0, best_other, np.nan)[slot_query, local]
+
+        # Single-link clusters: transitive closure of the >= threshold links by squaring
+        reach = ((similarity >= threshold) & valid[:, :, None] & valid[:, None, :]).astype(np.float32)
+        reach[:, np.arange(width), np.arange(width)] = 1
+        for _ in range(max(1, int(np.ceil(np.log2(width))))):
+            reach = np.minimum(reach @ reach, 1)
+        # A cluster is named after the corpus row of its first member
+        query_cluster[start:stop] = (np.repeat(query_starts, sizes)
+                                     + reach.argmax(axis=2)[slot_query, local])
+
+    # Corpus agreement through the ANN index: which models produced each neighbour
+    produced = np.zeros((len(corpus.texts), len(corpus.models)), dtype=bool)
+    produced[text_index, model_index] = True
+    neighbours, _ = index.search(embeddings, k=k + 1)
+    # Drop each text itself from its neighbour list
+    neighbours = np.where(neighbours == np.arange(len(neighbours))[:, None], -1, neighbours)
+
+    per_model = {}
+    for code, model in enumerate(corpus.models):
+        rows = model_index == code
+        texts = np.flatnonzero(produced[:, code])
+        neighbour_ids = neighbours[texts]
+        found = neighbour_ids >= 0
+        by_other = np.delete(produced, code, axis=1)[np.where(found, neighbour_ids, 0)].any(axis=2)
+        model_support = support[rows]
+        # NaN where no other model answered the query; null in JSON rather than NaN
+        model_consensus = consensus[rows][~np.isnan(consensus[rows])]
+        per_model[model] = {
+            "responses": int(rows.sum()),
+            "mean_consensus": float(model_consensus.mean()) if len(model_consensus) else None,
+            "outlier_rate": float(np.mean(~(model_support >= threshold))) if rows.any() else None,
+            "corpus_agreement": float((by_other & found).sum() / max(found.sum(), 1)),
+        }
+
+    return {
+        "models": per_model,
+        "consensus": consensus,
+        "support": support,
+        "query_cluster": query_cluster,
+        "corpus_cluster": index.labels[text_index],
+    }
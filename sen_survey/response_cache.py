@@ -0,0 +1,164 @@
+# Persistent, content-addressed cache for LLM generations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from .llm_backends import LLMBackend
+
+
+def make_cache_key(model_name, prompt, **params):
+    """Hash of the model, the prompt text and every generation parameter."""
+    payload = json.dumps({"model": model_name, "prompt": prompt, "params": params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with size and TTL eviction.
+    Safe to share between threads (e.g. the async generation mode).
+    """
+
+    def __init__(self, path="llm_response_cache.sqlite", max_entries=100_000, ttl_seconds=None,
+                 clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached responses for `key`, or None on a miss / expired entry."""
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size -= 1
+                self.evictions += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = self.clock()
+        with self._lock:
+            existed = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now))
+            if not existed:
+                self._size += 1
+            if self.max_entries is not None and self._size > self.max_entries:
+                self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """Drop expired entries, then the least recently used ones down to max_entries."""
+        if self.ttl_seconds is not None:
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE created < ?",
+                (self.clock() - self.ttl_seconds,)).rowcount
+            self._size -= removed
+            self.evictions += removed
+
+        overflow = self._size - self.max_entries
+        if overflow > 0:
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (overflow,)).rowcount
+            self._size -= removed
+            self.evictions += removed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        return self._size
+
+
+class CachedBackend(LLMBackend):
+    """Wraps another backend and serves repeated (model, prompt, parameters) from a ResponseCache."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def generate(self, query_text, model_name, num_responses=4):
+        key = make_cache_key(model_name, query_text,
+                             num_responses=num_responses, **self.cache_params())
+        responses = self.cache.get(key)
+        if responses is None:
+            responses = self.backend.generate(
+                query_text, model_name, num_responses)
+            self.cache.set(key, responses)
+        return responses
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        """Serve cached prompts directly and send only the misses as one batch."""
+        params = self.cache_params()
+        keys = [make_cache_key(model_name, prompt, num_responses=num_responses, **params)
+                for prompt in prompts]
+        results = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, responses in enumerate(results) if responses is None]
+        if missing:
+            fresh = self.backend.generate_batch(
+                [prompts[i] for i in missing], model_name, num_responses)
+            for i, responses in zip(missing, fresh):
+                self.cache.set(keys[i], responses)
+                results[i] = responses
+        return results
+
+    def close(self):
+        self.backend.close()
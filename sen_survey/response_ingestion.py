@@ -0,0 +1,338 @@
+# Teacher response ingestion: stream Forms/Excel/CSV response exports, join every answer
+# to its generated question and keep running win rates per model, option and response type
+import csv
+import os
+import re
+from collections import OrderedDict
+
+from .records import FormsQuestion
+
+# Response schema of AdvancedSENSurveyManager.generate_power_automate_workflow()
+RESPONSE_FIELDS = ("response_id", "teacher_id", "question_id", "selected_option",
+                   "improvement_text", "rating_score", "submission_timestamp")
+
+# Columns of a wide Forms export (one row per submission, one column per question)
+_WIDE_QUESTION = re.compile(r"^Question (?P<number>\d+)\b")
+_WIDE_FIELDS = {"ID": "response_id", "Email": "teacher_id", "Name": "teacher_id",
+                "Completion time": "submission_timestamp"}
+
+_SELECTED = re.compile(r"^\s*(?:Option\s*)?(?P<number>\d+)\b", re.IGNORECASE)
+_OPTION_TYPE = re.compile(r"^Option \d+ \((?:Focus: )?(?P<type>[^)]*)\)")
+
+
+def _require_openpyxl():
+    try:
+        import openpyxl
+    except ImportError as exc:
+        raise ImportError(
+            "Reading Excel exports needs openpyxl: pip install openpyxl") from exc
+    return openpyxl
+
+
+class QuestionIndex:
+    """
+    Hash index from question id to the (model, response type) behind each option.
+
+    A question is registered under its query id and under its Forms question number, so
+    exports that carry either one join in O(1). Identical option tuples are shared, so
+    hundreds of thousands of questions cost a dict entry each.
+    """
+
+    def __init__(self, default_model=None):
+        # Model of questions whose entry does not name one (single-model generator)
+        self.default_model = default_model
+        self._options = {}
+        self._shared = {}
+        # Distinct question numbers: every question has two keys in _options
+        self._questions = 0
+
+    def _share(self, options):
+        options = tuple(options)
+        return self._shared.setdefault(options, options)
+
+    def add(self, forms_question):
+        """Registers a FormsQuestion, or a Forms entry dict (FormsQuestion.to_dict())."""
+        if isinstance(forms_question, FormsQuestion):
+            responses = forms_question._option_responses()
+            if forms_question.option_picks is not None:
+                models = [model for model, _ in forms_question.option_picks]
+            else:
+                models = [forms_question.options_model or self.default_model] * len(responses)
+            options = zip(models, (response["type"] for response in responses))
+            query_id = forms_question.query["id"]
+        else:
+            metadata = forms_question.get("metadata", {})
+            # The last option is always 'Other'
+            labels = forms_question["options"][:-1]
+            models = metadata.get("option_sources") or [
+                metadata.get("options_source_model", self.default_model)] * len(labels)
+            types = [_option_type(label) for label in labels]
+            options = zip(models, types)
+            query_id = metadata.get("scenario_id")
+
+        options = self._share(options)
+        number = str(forms_question["question_number"])
+        if number not in self._options:
+            self._questions += 1
+        self._options[number] = options
+        if query_id is not None:
+            self._options[query_id] = options
+        return options
+
+    @classmethod
+    def from_forms(cls, forms_data, default_model=None):
+        """Index of generator.iter_forms_data(...) / format_for_microsoft_forms(...) output."""
+        index = cls(default_model)
+        for forms_question in forms_data:
+            index.add(forms_question)
+        return index
+
+    def options(self, question_id):
+        """((model, type), ...) per option number - 1, or None for an unknown question."""
+        return self._options.get(str(question_id).strip())
+
+    def __contains__(self, question_id):
+        return self.options(question_id) is not None
+
+    def __len__(self):
+        """Number of questions (not keys: each is registered by number and by id)."""
+        return self._questions
+
+
+def _option_type(label):
+    match = _OPTION_TYPE.match(label)
+    return match.group("type") if match else None
+
+
+def _normalise_header(name):
+    return re.sub(r"[^a-z0-9]+", "_", str(name or "").strip().lower()).strip("_")
+
+
+def _iter_table_rows(filename, sheet=None):
+    """Header-keyed rows of a CSV or .xlsx file, read one row at a time."""
+    if os.path.splitext(filename)[1].lower() in (".xlsx", ".xlsm"):
+        openpyxl = _require_openpyxl()
+        workbook = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.active
+            rows = worksheet.iter_rows(values_only=True)
+            header = [str(name) if name is not None else "" for name in next(rows, ())]
+            for values in rows:
+                yield header, values
+        finally:
+            workbook.close()
+        return
+
+    with open(filename, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        for values in reader:
+            yield header, values
+
+
+def iter_submissions(filename, sheet=None, on_malformed=None):
+    """
+    Streams the answers in a response export as dicts with the RESPONSE_FIELDS keys.
+    A row whose rating is not a number is skipped and passed to `on_malformed`, if given.
+
+    Two layouts are recognised from the header:
+      - long (Power Automate / Excel log): one row per answer, with columns named like
+        the response schema ("question_id", "Question ID", "Selected Option", ...);
+      - wide (Forms "Open in Excel"): one row per submission and one "Question N: ..."
+        column per question, optionally followed by its 'Other' text box column.
+    """
+    plan = None
+    for header, values in _iter_table_rows(filename, sheet):
+        if plan is None:
+            plan = _read_plan(header)
+            fields, positions, questions = plan["fields"], plan["positions"], plan["questions"]
+        if len(values) < len(header):
+            values = list(values) + [None] * (len(header) - len(values))
+
+        row = dict(_EMPTY_SUBMISSION)
+        row.update(zip(fields, [values[i] for i in positions]))
+        if not _read_rating(row):
+            if on_malformed is not None:
+                on_malformed(row)
+            continue
+        if questions is None:
+            yield row
+            continue
+        for number, answer, text in questions:
+            if values[answer] in (None, ""):
+                continue
+            yield dict(row, question_id=number, selected_option=values[answer],
+                       improvement_text=None if text is None else values[text])
+
+
+def _read_plan(header):
+    """
+    The column of each field (the first matching one), and for wide exports the
+    (question number, answer column, text box column or None) of every question.
+    """
+    normalised = [_normalise_header(name) for name in header]
+    if "question_id" in normalised:
+        columns = {name: i for i, name in reversed(list(enumerate(normalised)))
+                   if name in RESPONSE_FIELDS}
+        questions = None
+    else:
+        columns = {_WIDE_FIELDS[name]: i for i, name in reversed(list(enumerate(header)))
+                   if name in _WIDE_FIELDS and name != "Name"}
+        if "Name" in header:
+            columns.setdefault("teacher_id", header.index("Name"))
+        questions = []
+        for i, name in enumerate(header):
+            match = _WIDE_QUESTION.match(name)
+            if match:
+                # The follow-up text box is the next column, unless that is another question
+                follows = i + 1 < len(header) and not _WIDE_QUESTION.match(header[i + 1]) \
+                    and header[i + 1] not in _WIDE_FIELDS
+                questions.append((match.group("number"), i, i + 1 if follows else None))
+        if not questions:
+            raise ValueError(f"Unrecognised response export header: {header}")
+    return {"fields": tuple(columns), "positions": tuple(columns.values()),
+            "questions": questions}
+
+
+_EMPTY_SUBMISSION = dict.fromkeys(RESPONSE_FIELDS)
+
+
+def _read_rating(row):
+    """Parses row["rating_score"] in place; False if it is not a number."""
+    score = row["rating_score"]
+    if score in (None, ""):
+        row["rating_score"] = None
+        return True
+    try:
+        row["rating_score"] = float(score)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def parse_selected_option(selected):
+    """Option number (1-based) of an answer, 0 for 'Other', None if unreadable."""
+    if selected is None:
+        return None
+    if isinstance(selected, (int, float)):
+        return int(selected)
+    text = str(selected).strip()
+    if text.lower().startswith("other"):
+        return 0
+    match = _SELECTED.match(text)
+    return int(match.group("number")) if match else None
+
+
+class WinRateTally:
+    """
+    Running win rates of the answers ingested so far, updated one submission at a time.
+
+    Every answered question counts as one appearance ("shown") for each of its options'
+    models, option positions and response types, and one win for the selected option.
+    Picking 'Other' is a win for no option. A rating is credited to the selected model.
+    Repeated (response_id, question_id) pairs are ignored, so a growing export can be
+    re-ingested without double counting; the most recent `max_seen` pairs are
+    remembered, so memory stays bounded on endless streams.
+
+    An answer only bumps the counter of its (shared option tuple, selected option) pair;
+    summary() expands those few distinct pairs into the per-model/position/type tables.
+    """
+
+    def __init__(self, index, max_seen=1_000_000):
+        self.index = index
+        self.max_seen = max_seen
+        self.unmatched = 0
+        self.invalid = 0
+        self.malformed = 0
+        self.duplicates = 0
+        # (options, selected) -> [answers, rating sum, ratings]
+        self._counts = {}
+        # (response_id, question_id) -> None, least recently seen first
+        self._seen = OrderedDict()
+
+    def add(self, submission):
+        """Tallies one answer; returns False if it was skipped."""
+        question_id = submission["question_id"]
+        options = self.index.options(question_id)
+        if options is None:
+            self.unmatched += 1
+            return False
+        selected = parse_selected_option(submission["selected_option"])
+        if selected is None or selected > len(options):
+            self.invalid += 1
+            return False
+
+        response_id = submission["response_id"]
+        if response_id not in (None, ""):
+            key = (str(response_id), str(question_id))
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self.duplicates += 1
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self.max_seen:
+                self._seen.popitem(last=False)
+
+        counts = self._counts.get((options, selected))
+        if counts is None:
+            counts = self._counts[(options, selected)] = [0, 0.0, 0]
+        counts[0] += 1
+        if selected and submission["rating_score"] is not None:
+            counts[1] += submission["rating_score"]
+            counts[2] += 1
+        return True
+
+    def add_malformed(self, row):
+        """Counts a row that iter_submissions could not read (its on_malformed hook)."""
+        self.malformed += 1
+
+    def update(self, submissions):
+        """Tallies a stream of submissions; returns the number counted."""
+        return sum(self.add(submission) for submission in submissions)
+
+    def summary(self):
+        models, positions, types = {}, {}, {}
+        answered = other = 0
+        for (options, selected), (count, rating_sum, ratings) in self._counts.items():
+            answered += count
+            other += count if selected == 0 else 0
+            for number, (model, response_type) in enumerate(options, 1):
+                won = count if number == selected else 0
+                for table, key in ((models, model), (positions, number), (types, response_type)):
+                    entry = table.setdefault(key, [0, 0, 0.0, 0])
+                    entry[0] += count
+                    entry[1] += won
+                    if won:
+                        entry[2] += rating_sum
+                        entry[3] += ratings
+
+        return {
+            "answered": answered,
+            "other_rate": other / answered if answered else 0.0,
+            "unmatched": self.unmatched,
+            "invalid": self.invalid,
+            "malformed": self.malformed,
+            "duplicates": self.duplicates,
+            "models": _rates(models),
+            "positions": _rates(positions),
+            "response_types": _rates(types),
+        }
+
+
+def _rates(table):
+    return {key: {"shown": shown, "wins": wins, "win_rate": wins / shown,
+                  "mean_rating": rating_sum / ratings if ratings else None}
+            for key, (shown, wins, rating_sum, ratings) in table.items()}
+
+
+def ingest_responses(filenames, index, tally=None, sheet=None):
+    """
+    Streams one or more response exports into `tally` (a new WinRateTally over `index`
+    by default) and returns it; call again with new exports to keep accumulating.
+    """
+    if isinstance(filenames, (str, os.PathLike)):
+        filenames = [filenames]
+    tally = tally if tally is not None else WinRateTally(index)
+    for filename in filenames:
+        tally.update(iter_submissions(filename, sheet, on_malformed=tally.add_malformed))
+    return tally
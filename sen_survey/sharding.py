@@ -0,0 +1,63 @@
+# Multi-process sharded generation with deterministic per-shard seeding
+import hashlib
+import multiprocessing
+import os
+import random
+from datetime import datetime
+
+from .prompt_templates import intern_fields
+from .query_ids import SequentialIdAllocator
+
+
+def derive_seed(seed, shard_index):
+    """Independent 64-bit seed for one shard; depends only on (seed, shard_index)."""
+    digest = hashlib.sha256(f"{seed}:{shard_index}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def shard_bounds(num_queries, shard_size):
+    """[(shard_index, start, stop), ...] covering range(num_queries)."""
+    return [(index, start, min(start + shard_size, num_queries))
+            for index, start in enumerate(range(0, num_queries, shard_size))]
+
+
+def _generate_shard(task):
+    generator_class, seed, shard_index, start, stop, models, created_date = task
+    generator = generator_class(
+        seed=derive_seed(seed, shard_index),
+        # Ids encode the global query index, so they do not depend on the worker
+        id_allocator=SequentialIdAllocator(f"{seed:x}", start=start))
+    return list(generator.iter_question_set(stop - start, models, created_date=created_date))
+
+
+def iter_sharded_question_set(generator_class, num_queries, models, seed=0, workers=None,
+                              shard_size=1000, created_date=None):
+    """
+    Yields the records of `num_queries` queries generated by a process pool.
+
+    Shard boundaries depend only on `shard_size` and each shard's RNG only on
+    (seed, shard index), so the merged output is the same for any worker count.
+    Shards are merged back in query order as they complete. With seed=None a random
+    64-bit seed is drawn once for the run, so its shards still share one seed.
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    if created_date is None:
+        # One timestamp for the whole run rather than one per worker
+        created_date = datetime.now().isoformat()
+
+    tasks = [(generator_class, seed, index, start, stop, list(models), created_date)
+             for index, start, stop in shard_bounds(num_queries, shard_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield from _generate_shard(task)
+        return
+
+    with multiprocessing.Pool(processes=min(workers, len(tasks))) as pool:
+        # imap keeps shard order and only buffers shards that finished early
+        for records in pool.imap(_generate_shard, tasks):
+            # Unpickled records carry their own copies of the shared labels and prompts
+            for record in records:
+                yield intern_fields(record)
@@ -0,0 +1,139 @@
+# Stratified survey design over the SEN x age x subject x template x focus point space
+import math
+from collections import Counter
+from itertools import product
+
+
+class SurveyDesign:
+    """
+    Enumerates the design cells (sen_type, age_group, subject, template, focus_point)
+    and allocates a quota of queries to every cell.
+
+    The total is split evenly over the sen x age x subject x template strata first, then
+    each stratum's share over that SEN type's focus points, so SEN types with fewer focus
+    points are not under-represented. Leftover queries go to strata picked by cycling
+    every dimension at once (and to rotating focus points), so each SEN type, age group,
+    subject and template stays within one query of the others instead of later
+    categories being dropped the way truncating a nested loop would. Cells are produced
+    lazily and each query is generated exactly once, without oversampling.
+    """
+
+    def __init__(self, generator, sen_types=None, age_groups=None, subjects=None,
+                 templates=None):
+        self.generator = generator
+        self.sen_types = list(sen_types or generator.sen_categories)
+        self.age_groups = list(age_groups or generator.age_groups)
+        self.subjects = list(subjects or generator.subjects)
+        self.templates = list(
+            templates or generator.teacher_question_templates)
+
+    def focus_points(self, sen_type):
+        return self.generator.teacher_focus_points.get(sen_type, ["general support needs"])
+
+    def num_cells(self):
+        per_sen = len(self.age_groups) * len(self.subjects) * len(self.templates)
+        return sum(per_sen * len(self.focus_points(sen_type)) for sen_type in self.sen_types)
+
+    def iter_cells(self):
+        """Yields (sen_type, age_group, subject, template, focus_point) without building a list."""
+        for sen_type in self.sen_types:
+            for age_group, subject, template, focus_point in product(
+                    self.age_groups, self.subjects, self.templates, self.focus_points(sen_type)):
+                yield sen_type, age_group, subject, template, focus_point
+
+    def num_strata(self):
+        return len(self.sen_types) * len(self.age_groups) * len(self.subjects) * len(self.templates)
+
+    def _extra_strata(self, remainder):
+        """
+        Positions (in product order) of the strata receiving one leftover query each.
+        The j-th pick takes j modulo each dimension's size, so every dimension cycles
+        evenly. After each full cycle (lcm of the sizes) the digits are shifted to reach
+        new strata; any stratum still taken twice is skipped odometer-style.
+        """
+        sizes = [len(self.sen_types), len(self.age_groups),
+                 len(self.subjects), len(self.templates)]
+        cycle = math.lcm(*sizes)
+        chosen = set()
+        for j in range(remainder):
+            digits = []
+            shift = j // cycle
+            for size in reversed(sizes):
+                digits.append((j + shift) % size)
+                shift //= size
+            digits.reverse()
+            while True:
+                position = 0
+                for digit, size in zip(digits, sizes):
+                    position = position * size + digit
+                if position not in chosen:
+                    break
+                # Advance the innermost dimension, carrying into the outer ones
+                for k in reversed(range(len(sizes))):
+                    digits[k] = (digits[k] + 1) % sizes[k]
+                    if digits[k]:
+                        break
+            chosen.add(position)
+        return chosen
+
+    def iter_quotas(self, total):
+        """Yields (cell, quota) for every cell; quotas sum to `total`."""
+        base, remainder = divmod(total, self.num_strata())
+        extras = self._extra_strata(remainder)
+        strata_cells = product(self.sen_types, self.age_groups,
+                               self.subjects, self.templates)
+        # sen_type -> focus point that receives that SEN type's next leftover query
+        rotation = {}
+
+        for position, (sen_type, age_group, subject, template) in enumerate(strata_cells):
+            share = base + (1 if position in extras else 0)
+
+            focus_points = self.focus_points(sen_type)
+            per_focus, leftover = divmod(share, len(focus_points))
+            start = rotation.get(sen_type, 0)
+            for offset, focus_point in enumerate(focus_points):
+                # Leftovers go round-robin over the SEN type's focus points across its
+                # strata, so every focus point stays within one query of the others
+                bonus = 1 if (offset - start) % len(focus_points) < leftover else 0
+                yield (sen_type, age_group, subject, template, focus_point), per_focus + bonus
+            rotation[sen_type] = (start + leftover) % len(focus_points)
+
+    def iter_queries(self, total):
+        """Generates `total` teacher queries, cell by cell."""
+        for (sen_type, age_group, subject, template, focus_point), quota in self.iter_quotas(total):
+            for _ in range(quota):
+                yield self.generator.create_teacher_query(
+                    sen_type, age_group, subject, template=template, focus_point=focus_point)
+
+    def coverage(self, total):
+        """Coverage statistics of the plan for `total` queries (no queries are generated)."""
+        dimensions = {name: Counter() for name in (
+            "sen_category", "age_group", "subject", "template", "focus_point")}
+        covered = 0
+        smallest = largest = None
+
+        for cell, quota in self.iter_quotas(total):
+            if quota:
+                covered += 1
+            smallest = quota if smallest is None else min(smallest, quota)
+            largest = quota if largest is None else max(largest, quota)
+            for name, value in zip(dimensions, cell):
+                dimensions[name][value] += quota
+
+        cells = self.num_cells()
+        report = {
+            "total_queries": total,
+            "cells": cells,
+            "cells_covered": covered,
+            "cell_coverage": covered / cells if cells else 0.0,
+            "min_per_cell": smallest,
+            "max_per_cell": largest,
+        }
+        for name, counts in dimensions.items():
+            if name == "template":
+                # Report templates by position rather than by their long text
+                counts = Counter({self.templates.index(template): n
+                                  for template, n in counts.items()})
+            report[name] = dict(counts)
+            report[f"{name}_spread"] = max(counts.values()) - min(counts.values())
+        return report
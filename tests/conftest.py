@@ -0,0 +1,52 @@
+import threading
+
+from sen_survey.llm_backends import BackendError, LLMBackend
+
+
+class FakeBackend(LLMBackend):
+    """
+    Answers at once, except the first attempt at each of `slow_prompts`, which blocks until
+    `release` (a threading.Event) is set. Models in `down` answer HTTP 503.
+    """
+
+    def __init__(self, slow_prompts=(), release=None, down=()):
+        self.slow_prompts = set(slow_prompts)
+        self.release = release or threading.Event()
+        self.down = set(down)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate(self, query_text, model_name, num_responses=4):
+        with self._lock:
+            first = (query_text, model_name) not in self.calls
+            self.calls.append((query_text, model_name))
+        if first and query_text in self.slow_prompts:
+            self.release.wait()
+        if model_name in self.down:
+            raise BackendError(f"{model_name} is down", status_code=503)
+        return [{"id": f"{model_name}_{i + 1}", "type": "Social",
+                 "content": f"({model_name}) {query_text}", "quality_score": 0.8}
+                for i in range(num_responses)]
+
+
+class CountingBackend(LLMBackend):
+    """Answers from the prompt text; records each request as (model, prompts in it)."""
+
+    def __init__(self):
+        self.requests = []
+        self.prompts = []
+
+    def _responses(self, prompt, model_name, num_responses):
+        return [{"id": f"{model_name}_{i + 1}", "type": "Social",
+                 "content": f"({model_name}) {i}: {prompt}", "quality_score": 0.8}
+                for i in range(num_responses)]
+
+    def generate(self, query_text, model_name, num_responses=4):
+        self.requests.append((model_name, 1))
+        self.prompts.append(query_text)
+        return self._responses(query_text, model_name, num_responses)
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        self.requests.append((model_name, len(prompts)))
+        self.prompts.extend(prompts)
+        return [self._responses(prompt, model_name, num_responses) for prompt in prompts]
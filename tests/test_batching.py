@@ -0,0 +1,80 @@
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+from conftest import CountingBackend
+
+from sen_survey.batching import RequestBatcher
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.query_ids import SequentialIdAllocator
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+@pytest.mark.parametrize("n, batch_size", [(10, 4), (16, 16), (1, 8), (33, 8)])
+def test_n_prompts_become_ceil_n_over_batch_size_requests(n, batch_size):
+    backend = CountingBackend()
+    requests = [(f"prompt {i}", "GPT-4o", 4) for i in range(n)]
+    results = RequestBatcher(backend, max_batch_size=batch_size).run(requests)
+    assert len(backend.requests) == math.ceil(n / batch_size)
+    # Results are scattered back to the prompt they answer
+    assert [responses[0]["content"] for responses in results] == [
+        f"(GPT-4o) 0: prompt {i}" for i in range(n)]
+
+
+def test_batched_generation_matches_unbatched():
+    def generate(batch_size):
+        backend = CountingBackend()
+        generator = SENQuestionGenerator(seed=3, backend=backend,
+                                         id_allocator=SequentialIdAllocator("test"))
+        records = generator.generate_question_set(10, MODELS, batch_size=batch_size)
+        return [{k: v for k, v in r.items() if k != "created_date"} for r in records], backend
+
+    unbatched, _ = generate(None)
+    batched, backend = generate(4)
+    assert batched == unbatched
+    assert len(backend.requests) == len(MODELS) * math.ceil(10 / 4)
+
+
+def test_async_submissions_are_packed_into_batches():
+    backend = CountingBackend()
+    batcher = RequestBatcher(backend, max_batch_size=4, max_wait=0.01)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(f"prompt {i}", "GPT-4o") for i in range(10)))
+
+    results = asyncio.run(main())
+    assert [responses[0]["content"] for responses in results] == [
+        f"(GPT-4o) 0: prompt {i}" for i in range(10)]
+    assert len(backend.requests) == 3
+
+
+class PeakBackend(CountingBackend):
+    """CountingBackend whose batches take a moment and record the peak number in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_batch(self, prompts, model_name, num_responses=4):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self._lock:
+            self.in_flight -= 1
+        return super().generate_batch(prompts, model_name, num_responses)
+
+
+def test_async_batches_respect_the_concurrency_limits():
+    backend = PeakBackend()
+    generator = SENQuestionGenerator(seed=3, backend=backend)
+    records = generator.generate_question_set_async(
+        24, MODELS, max_concurrency=2, per_model_concurrency=1, batch_size=2, batch_wait=0)
+
+    assert len(records) == 24
+    assert len(backend.requests) >= 24 and backend.max_in_flight <= 2
@@ -0,0 +1,58 @@
+import json
+
+from benchmarks.bench_pipeline import compare_results, main, run_suite
+
+
+def _entry(stage, seconds, peak_bytes=None, n=1000, models=2):
+    entry = {"stage": stage, "n": n, "models": models, "items": n, "seconds": seconds}
+    if peak_bytes is not None:
+        entry["peak_bytes"] = peak_bytes
+    return entry
+
+
+def test_compare_flags_real_slowdowns_and_memory_growth_only():
+    base = {"results": [_entry("export_to_csv", 0.100, 1000), _entry("export_to_jsonl", 0.0001),
+                        _entry("read_csv", 0.050, 1000), {"stage": "export_to_parquet", "n": 1000,
+                                                          "models": 2, "skipped": "no pyarrow"}]}
+    new = {"results": [_entry("export_to_csv", 0.120, 1000), _entry("export_to_jsonl", 0.0005),
+                       _entry("read_csv", 0.050, 2000), _entry("export_to_parquet", 0.5),
+                       _entry("consensus", 0.5)]}
+    rows = {row["stage"]: row for row in compare_results(base, new)}
+
+    assert set(rows) == {"export_to_csv", "export_to_jsonl", "read_csv"}
+    assert rows["export_to_csv"]["regressions"] == ["time"]
+    # 5x slower, but by less than the timer noise floor
+    assert rows["export_to_jsonl"]["regressions"] == []
+    assert rows["read_csv"]["regressions"] == ["memory"]
+    assert compare_results(base, new, threshold=0.25, memory_threshold=1.0)[0]["regressions"] == []
+
+
+def test_run_suite_measures_every_stage_and_model_count_once():
+    stages = ["create_teacher_query", "generate_question_set", "export_to_csv"]
+    saved = []
+    document = run_suite(stages, [10], [1, 2], repeat=1, log=lambda line: None,
+                         save=lambda document: saved.append(len(document["results"])))
+
+    keys = [(e["stage"], e["n"], e["models"]) for e in document["results"]]
+    assert keys == [("create_teacher_query", 10, None), ("generate_question_set", 10, 1),
+                    ("export_to_csv", 10, 1), ("generate_question_set", 10, 2),
+                    ("export_to_csv", 10, 2)]
+    assert saved == [1, 2, 3, 4, 5]
+    for entry in document["results"]:
+        assert entry["items"] > 0 and entry["seconds"] >= 0 and entry["peak_bytes"] > 0
+    json.dumps(document)
+
+
+def test_compare_command_exits_non_zero_on_regressions(tmp_path, capsys):
+    base = tmp_path / "base.json"
+    assert main(["run", "--sizes", "10", "--models", "1", "--stages", "create_teacher_query",
+                 "--repeat", "1", "--no-memory", "-o", str(base)]) == 0
+    document = json.loads(base.read_text(encoding="utf-8"))
+    assert "peak_bytes" not in document["results"][0]
+
+    assert main(["compare", str(base), str(base)]) == 0
+    document["results"][0]["seconds"] += 1.0
+    slower = tmp_path / "slower.json"
+    slower.write_text(json.dumps(document), encoding="utf-8")
+    assert main(["compare", str(base), str(slower)]) == 1
+    assert "REGRESSION (time)" in capsys.readouterr().out
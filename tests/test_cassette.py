@@ -0,0 +1,46 @@
+import pytest
+
+from sen_survey.cassette import Cassette, CassetteMissError
+from sen_survey.cli import main
+from sen_survey.multi_model import SENQuestionGenerator
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def _run(path, mode, seed=3):
+    with Cassette(str(path), mode=mode) as cassette:
+        generator = SENQuestionGenerator(seed=seed, cassette=cassette)
+        return list(generator.iter_question_set(10, MODELS))
+
+
+def test_replay_writes_the_recorded_records(tmp_path):
+    path = tmp_path / "run.cassette"
+    recorded = _run(path, "record")
+    assert _run(path, "replay") == recorded
+
+
+def test_strict_replay_of_an_unrecorded_call_raises(tmp_path):
+    path = tmp_path / "run.cassette"
+    _run(path, "record")
+    with pytest.raises(CassetteMissError):
+        _run(path, "replay", seed=4)
+    # passthrough sends it to the backend instead
+    assert len(_run(path, "passthrough", seed=4)) == 10
+
+
+def test_cli_reports_a_replay_miss(tmp_path, capsys):
+    path = str(tmp_path / "run.cassette")
+    common = ["generate", "-n", "5", "--csv", "", "--forms", ""]
+    assert main([*common, "--seed", "1", "--record", path]) == 0
+    assert main([*common, "--seed", "2", "--replay", path]) == 1
+    assert "has no recording of this call" in capsys.readouterr().err
+
+
+def test_unseeded_recordings_draw_fresh_responses(tmp_path):
+    def contents(path):
+        records = _run(path, "record", seed=None)
+        return [response["content"] for record in records
+                for responses in record["all_model_responses"].values()
+                for response in responses]
+
+    assert contents(tmp_path / "a.cassette") != contents(tmp_path / "b.cassette")
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from sen_survey.checkpoint import RunCheckpoint
+from sen_survey.dedup import QueryDeduplicator
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.query_ids import SequentialIdAllocator
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def test_a_tail_without_its_newline_is_redone(tmp_path):
+    checkpoint = RunCheckpoint("run", str(tmp_path))
+    with checkpoint.open(3, MODELS):
+        checkpoint.append(0, {"id": "q0"})
+    # Crash after writing the JSON of index 1 but before its newline
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"index": 1, "record": {"id": "q1"}}))
+
+    assert checkpoint.completed_indices() == {0}
+    with checkpoint.open(3, MODELS):
+        checkpoint.append(1, {"id": "q1 again"})
+    assert [record["id"] for record in checkpoint.iter_records()] == ["q0", "q1 again"]
+
+
+def test_resumed_run_completes_every_query(tmp_path):
+    generator = SENQuestionGenerator(seed=0)
+    checkpoint = generator.run_with_checkpoint("run", 4, MODELS, str(tmp_path))
+    with open(checkpoint.path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 1)  # drop the last newline only
+
+    assert checkpoint.completed_indices() == {0, 1, 2}
+    generator.run_with_checkpoint("run", 4, MODELS, str(tmp_path))
+    assert checkpoint.completed_indices() == {0, 1, 2, 3}
+    assert len(list(checkpoint.iter_records())) == 4
+
+
+def _generator():
+    generator = SENQuestionGenerator(seed=4, id_allocator=SequentialIdAllocator("t"))
+    generator.created_date = "2026-01-01T00:00:00"
+    return generator
+
+
+def test_checkpointed_runs_honour_dedup(tmp_path):
+    dedup = QueryDeduplicator(mode="merge")
+    records = _generator().generate_question_set(
+        150, MODELS, dedup=dedup, run_id="run", checkpoint_dir=str(tmp_path))
+
+    assert len(records) == 150 and dedup.duplicates > 0
+    by_id = {record["id"]: record for record in records}
+    duplicates = [record for record in records if "duplicate_of" in record]
+    assert len(duplicates) == dedup.duplicates
+    for record in duplicates:
+        original = by_id[record["duplicate_of"]]
+        assert "duplicate_of" not in original
+        assert record["all_model_responses"] == original["all_model_responses"]
+
+
+def test_resumed_filter_run_compares_new_queries_with_the_checkpointed_ones(tmp_path):
+    generator = _generator()
+    checkpoint = generator.run_with_checkpoint(
+        "run", 200, MODELS, str(tmp_path), dedup=QueryDeduplicator(), batch_size=16,
+        num_responses=2)
+    with open(checkpoint.path, "rb") as f:
+        lines = f.readlines()
+    with open(checkpoint.path, "wb") as f:
+        f.writelines(lines[:60])
+
+    generator.run_with_checkpoint("run", 200, MODELS, str(tmp_path),
+                                  dedup=QueryDeduplicator(), batch_size=16, num_responses=2)
+    records = list(checkpoint.iter_records())
+    texts = [record["teacher_query_text"] for record in records]
+    assert checkpoint.completed_indices() == set(range(200))
+    assert 0 < len(records) < 200 and len(set(texts)) == len(texts)
+    assert all(len(responses) == 2 for record in records
+               for responses in record["all_model_responses"].values())
+
+
+def _interrupted_run(tmp_path, keep, **options):
+    """Records of a run cut after `keep` checkpoint lines, then resumed by a new generator."""
+    checkpoint = _generator().run_with_checkpoint("run", 6, MODELS, str(tmp_path), **options)
+    with open(checkpoint.path, "rb") as f:
+        lines = f.readlines()
+    with open(checkpoint.path, "wb") as f:
+        f.writelines(lines[:1 + keep])
+    _generator().run_with_checkpoint("run", 6, MODELS, str(tmp_path), **options)
+    return list(checkpoint.iter_records())
+
+
+@pytest.mark.parametrize("options, keep", [({}, 3), ({"batch_size": 2}, 4)])
+def test_resumed_run_equals_an_uninterrupted_run(tmp_path, options, keep):
+    straight = list(_generator().run_with_checkpoint(
+        "run", 6, MODELS, str(tmp_path / "straight"), **options).iter_records())
+    resumed = _interrupted_run(tmp_path / "resumed", keep, **options)
+    assert resumed == straight
+    assert len({record["teacher_query_text"] for record in resumed}) == 6
+
+
+def test_resume_with_other_settings_is_refused(tmp_path):
+    _generator().run_with_checkpoint("run", 2, MODELS, str(tmp_path))
+    other_seed = SENQuestionGenerator(seed=5)
+    with pytest.raises(ValueError):
+        other_seed.run_with_checkpoint("run", 2, MODELS, str(tmp_path))
+    with pytest.raises(ValueError):
+        _generator().run_with_checkpoint("run", 2, MODELS, str(tmp_path), num_responses=2)
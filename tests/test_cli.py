@@ -0,0 +1,21 @@
+import pytest
+
+from sen_survey.cli import main
+
+
+@pytest.mark.parametrize("flags", [["--seed", "3"], ["--jsonl", "out.jsonl"],
+                                   ["--dedup", "filter"], ["--record", "run.cassette"],
+                                   ["--diverse-options"]])
+def test_single_model_rejects_the_options_it_would_ignore(flags, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["generate", "--single-model", *flags])
+    assert exit_info.value.code == 2
+    assert f"--single-model does not support {flags[0]}" in capsys.readouterr().err
+
+
+def test_single_model_writes_csv_and_forms(tmp_path):
+    csv_file, forms_file = tmp_path / "queries.csv", tmp_path / "forms.txt"
+    assert main(["generate", "--single-model", "-n", "3", "--models", "Llama 3",
+                 "--csv", str(csv_file), "--forms", str(forms_file)]) == 0
+    assert len(csv_file.read_text(encoding="utf-8").splitlines()) == 4
+    assert "Question 3" in forms_file.read_text(encoding="utf-8")
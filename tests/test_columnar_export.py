@@ -0,0 +1,41 @@
+import pytest
+
+from sen_survey.columnar_export import (export_long_table, iter_long_rows, long_schema,
+                                        read_long_table)
+from sen_survey.leaderboard import read_scores
+from sen_survey.multi_model import SENQuestionGenerator
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def _questions(models=MODELS):
+    return SENQuestionGenerator(seed=8).generate_question_set(7, models)
+
+
+@pytest.mark.parametrize("extension, file_format", [("parquet", "parquet"), ("arrow", "arrow")])
+def test_long_table_round_trips(tmp_path, extension, file_format):
+    pytest.importorskip("pyarrow")
+    questions = _questions()
+    filename = str(tmp_path / f"long.{extension}")
+    assert export_long_table(questions, filename, file_format=file_format,
+                             row_group_size=10) == 7 * len(MODELS) * 4
+
+    frame = read_long_table(filename)
+    expected = list(iter_long_rows(questions))
+    assert list(frame.columns) == long_schema().names
+    for name in frame.columns:
+        assert frame[name].tolist() == [row[name] for row in expected], name
+    assert frame["model"].dtype == "category"
+
+
+def test_parquet_is_written_in_row_groups_with_a_fixed_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    two, four = str(tmp_path / "two.parquet"), str(tmp_path / "four.parquet")
+    export_long_table(_questions(), two, row_group_size=10)
+    export_long_table(_questions(MODELS + ["Gemini 25 Pro", "Mistral Large"]), four,
+                      row_group_size=10)
+
+    assert pq.ParquetFile(two).num_row_groups == 6  # 56 rows
+    assert pq.read_schema(two).equals(pq.read_schema(four))
+    scores = read_scores(four)
+    assert sorted(scores["model"].unique()) == sorted(MODELS + ["Gemini 25 Pro", "Mistral Large"])
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+from collections import defaultdict
+
+from sen_survey.llm_backends import LLMBackend
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.query_ids import SequentialIdAllocator
+
+MODELS = ["GPT-4o", "Gemini 25 Pro", "Llama 3", "Mistral Large"]
+
+
+class GatedBackend(LLMBackend):
+    """
+    In-process model: answers derived from (model, prompt). Async calls wait until `gate`
+    calls are in flight at once, so the peak shows how far the calls really overlap.
+    """
+
+    def __init__(self, gate=1, timeout=2.0):
+        self.gate = gate
+        self.timeout = timeout
+        self.in_flight = defaultdict(int)
+        self.max_in_flight = 0
+        self.max_in_flight_per_model = 0
+        self._opened = None
+
+    def _responses(self, query_text, model_name, num_responses):
+        digest = hashlib.sha256(f"{model_name}|{query_text}".encode("utf-8")).digest()
+        return [{"id": f"{model_name}_{i + 1}", "type": "Social",
+                 "content": f"({model_name}) strategy {digest[i]}", "quality_score": digest[i] / 255}
+                for i in range(num_responses)]
+
+    def generate(self, query_text, model_name, num_responses=4):
+        return self._responses(query_text, model_name, num_responses)
+
+    async def agenerate(self, query_text, model_name, num_responses=4):
+        if self._opened is None:
+            self._opened = asyncio.Event()
+        self.in_flight[model_name] += 1
+        total = sum(self.in_flight.values())
+        self.max_in_flight = max(self.max_in_flight, total)
+        self.max_in_flight_per_model = max(self.max_in_flight_per_model,
+                                           self.in_flight[model_name])
+        if total >= self.gate:
+            self._opened.set()
+        try:
+            # Without enough overlap the gate never opens; give up rather than hang
+            await asyncio.wait_for(self._opened.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.in_flight[model_name] -= 1
+        return self._responses(query_text, model_name, num_responses)
+
+
+def _generator(backend):
+    return SENQuestionGenerator(seed=7, backend=backend,
+                                id_allocator=SequentialIdAllocator("test"))
+
+
+def _without_dates(records):
+    return [{key: value for key, value in record.items() if key != "created_date"}
+            for record in records]
+
+
+def test_async_mode_matches_sequential_output_and_overlaps_calls():
+    sequential = _generator(GatedBackend()).generate_question_set(10, MODELS)
+
+    backend = GatedBackend(gate=16)
+    concurrent = _generator(backend).generate_question_set_async(
+        10, MODELS, max_concurrency=16, per_model_concurrency=4)
+
+    assert _without_dates(concurrent) == _without_dates(sequential)
+    assert list(concurrent[0]["all_model_responses"]) == MODELS
+    assert backend.max_in_flight == 16
+
+
+def test_concurrency_limits_are_respected():
+    backend = GatedBackend(gate=6)
+    _generator(backend).generate_question_set_async(
+        10, MODELS, max_concurrency=6, per_model_concurrency=2)
+    assert backend.max_in_flight == 6
+    assert backend.max_in_flight_per_model == 2
@@ -0,0 +1,44 @@
+from sen_survey.dedup import MinHashLSHIndex, QueryDeduplicator, shingles
+from sen_survey.multi_model import SENQuestionGenerator
+
+
+def _exact_unique(queries, threshold):
+    """Greedy dedup by exact shingle Jaccard: the reference LSH should agree with."""
+    kept = []
+    for query_data in queries:
+        current = shingles(query_data["teacher_query_text"])
+        if not any(len(current & other) / len(current | other) >= threshold for other in kept):
+            kept.append(current)
+    return len(kept)
+
+
+def test_bands_put_the_s_curve_midpoint_below_the_threshold():
+    index = MinHashLSHIndex(threshold=0.8)
+    assert index.bands * index.rows <= 128
+    midpoint = (1 - 0.5 ** (1 / index.bands)) ** (1 / index.rows)
+    assert midpoint < 0.8
+
+
+def test_recall_against_exact_jaccard():
+    generator = SENQuestionGenerator(seed=0)
+    queries = [generator.create_random_query() for _ in range(800)]
+    exact = _exact_unique(queries, 0.8)
+    kept = sum(1 for _ in QueryDeduplicator(threshold=0.8).process(queries))
+    # Matches are verified exactly, so LSH can only keep extra (missed) duplicates
+    assert exact <= kept <= exact * 1.03
+
+
+def test_queries_differing_only_in_subject_are_caught():
+    generator = SENQuestionGenerator(seed=1)
+    caught = pairs = 0
+    for seed in range(100):
+        query = generator.create_teacher_query("ASD", "Key Stage 2 (7-11)", "Mathematics")
+        text = query["teacher_query_text"].replace("Mathematics", "Science")
+        original, changed = shingles(query["teacher_query_text"]), shingles(text)
+        if text == query["teacher_query_text"] or len(original & changed) / len(original | changed) < 0.8:
+            continue
+        pairs += 1
+        duplicate = {**query, "id": "duplicate", "teacher_query_text": text}
+        kept = list(QueryDeduplicator(threshold=0.8, seed=seed).process([query, duplicate]))
+        caught += len(kept) == 1
+    assert caught >= 0.9 * pairs
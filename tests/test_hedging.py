@@ -0,0 +1,83 @@
+import time
+
+import pytest
+from conftest import FakeBackend
+
+from sen_survey.hedging import DeadlineExceeded, HedgedBackend
+from sen_survey.llm_backends import BackendError
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.response_cache import ResponseCache
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    fake = FakeBackend(slow_prompts={"slow"})
+    # The deadline only turns a hedging bug into a failure instead of a hang
+    backend = HedgedBackend(fake, min_samples=1, min_hedge_delay=0.01, default_deadline=30)
+    backend.generate("warm-up", "GPT-4o")
+    try:
+        # The first attempt blocks until released, so only the hedge can answer
+        responses = backend.generate("slow", "GPT-4o")
+    finally:
+        fake.release.set()
+    assert responses[0]["content"] == "(GPT-4o) slow"
+    assert (backend.hedges, backend.hedge_wins) == (1, 1)
+    assert fake.calls.count(("slow", "GPT-4o")) == 2
+    backend.close()
+
+
+def test_fallback_answers_are_tagged_and_cached_under_the_fallback_model(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    generator = SENQuestionGenerator(
+        seed=1, cache=cache, backend=FakeBackend(down={"Llama 3"}),
+        hedging={"fallbacks": {"Llama 3": "GPT-4o"}, "failure_threshold": 2})
+    responses = generator.get_responses_from_llm("query", "Llama 3")
+    assert {response["fallback_model"] for response in responses} == {"GPT-4o"}
+    assert generator.hedged.fallbacks_used == 1
+
+    # Once the model is back, its own answer is fetched rather than the cached fallback
+    healthy = SENQuestionGenerator(seed=1, cache=cache, backend=FakeBackend(), hedging={})
+    responses = healthy.get_responses_from_llm("query", "Llama 3")
+    assert responses[0]["content"] == "(Llama 3) query"
+    assert "fallback_model" not in responses[0]
+    cache.close()
+
+
+def test_breaker_opens_and_fails_over_without_calling_the_model():
+    fake = FakeBackend(down={"Llama 3"})
+    backend = HedgedBackend(fake, fallbacks={"Llama 3": "GPT-4o"}, failure_threshold=2)
+    for i in range(5):
+        backend.generate(f"query {i}", "Llama 3")
+    assert sum(model == "Llama 3" for _, model in fake.calls) == 2
+    assert backend.breaker_trips == 1
+    assert backend.fallbacks_used == 5
+
+
+def test_calls_abandoned_at_their_deadline_are_bounded():
+    fake = FakeBackend(slow_prompts={"query 0", "query 1"})
+    backend = HedgedBackend(fake, deadlines={"GPT-4o": 0.01}, max_abandoned=2,
+                            failure_threshold=100)
+    for i in range(2):
+        with pytest.raises(DeadlineExceeded):
+            backend.generate(f"query {i}", "GPT-4o")
+    assert backend.abandoned["GPT-4o"] == 2
+
+    # Refused before it is sent, not after waiting for its own deadline
+    with pytest.raises(BackendError) as error:
+        backend.generate("query 2", "GPT-4o")
+    assert not isinstance(error.value, DeadlineExceeded)
+    assert ("query 2", "GPT-4o") not in fake.calls
+
+    fake.release.set()
+    for _ in range(1000):
+        if backend.abandoned["GPT-4o"] == 0:
+            break
+        time.sleep(0.01)
+    assert backend.abandoned["GPT-4o"] == 0
+    backend.close()
+
+
+def test_generator_close_shuts_down_the_hedging_pool():
+    with SENQuestionGenerator(seed=1, backend=FakeBackend(), hedging={}) as generator:
+        generator.get_responses_from_llm("query", "GPT-4o")
+    with pytest.raises(RuntimeError):
+        generator.get_responses_from_llm("another query", "GPT-4o")
@@ -0,0 +1,112 @@
+import json
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sen_survey.llm_backends import (BackendError, OpenAICompatibleBackend,
+                                     close_pooled_sessions, parse_retry_after)
+
+pytest.importorskip("requests")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-style /chat/completions; answers with the queued error replies first."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append((self.path, self.client_address, body))
+        if server.errors:
+            status, headers = server.errors.pop(0)
+            self._reply(status, {"error": "slow down"}, headers)
+            return
+        question = body["messages"][-1]["content"]
+        self._reply(200, {"choices": [
+            {"index": i, "message": {"role": "assistant", "content": f" {body['model']} {i}: {question} "}}
+            for i in range(body["n"])]})
+
+    def _reply(self, status, payload, headers=()):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.errors = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    close_pooled_sessions()
+
+
+def _backend(server):
+    return OpenAICompatibleBackend(api_key="test", model_map={"GPT-4o": "gpt-4o"},
+                                   base_url=f"http://127.0.0.1:{server.server_port}/v1")
+
+
+def test_generate_parses_choices_and_reuses_one_connection(server):
+    backend = _backend(server)
+    for i in range(3):
+        responses = backend.generate(f"question {i}", "GPT-4o", num_responses=2)
+        assert [response["content"] for response in responses] == [
+            f"gpt-4o 0: question {i}", f"gpt-4o 1: question {i}"]
+        assert responses[1]["id"] == "GPT-4o_2"
+
+    paths = {path for path, _, _ in server.requests}
+    assert paths == {"/v1/chat/completions"}
+    # Keep-alive: every request came over the same client connection
+    assert len({address for _, address, _ in server.requests}) == 1
+    assert server.requests[0][2]["messages"][0]["role"] == "system"
+
+
+def test_batches_send_the_same_chat_requests_as_single_calls(server):
+    backend = _backend(server)
+    single = backend.generate("question 0", "GPT-4o", num_responses=2)
+    batched = backend.generate_batch([f"question {i}" for i in range(3)], "GPT-4o",
+                                     num_responses=2)
+    assert batched[0] == single
+    assert [responses[0]["content"] for responses in batched] == [
+        f"gpt-4o 0: question {i}" for i in range(3)]
+
+    paths = {path for path, _, _ in server.requests}
+    assert paths == {"/v1/chat/completions"}
+    payloads = {json.dumps(body, sort_keys=True) for _, _, body in server.requests}
+    # The batch's first request is byte-for-byte the unbatched one
+    assert len(payloads) == 3
+
+
+@pytest.mark.parametrize("retry_after", ["7", "date"])
+def test_throttling_raises_backend_error_with_retry_after(server, retry_after):
+    if retry_after == "date":
+        retry_after = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30),
+                                      usegmt=True)
+    server.errors.append((429, [("Retry-After", retry_after)]))
+    with pytest.raises(BackendError) as error:
+        _backend(server).generate("question", "GPT-4o")
+    assert error.value.status_code == 429
+    assert 0 < error.value.retry_after <= 30
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+from conftest import CountingBackend, FakeBackend
+
+from sen_survey.instrumentation import (NULL_METRICS, InstrumentedBackend, LatencyHistogram,
+                                        Metrics)
+from sen_survey.llm_backends import BackendError
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.response_cache import ResponseCache
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+class StepClock:
+    """perf_counter stand-in that advances `step` seconds per reading."""
+
+    def __init__(self, step):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def test_histogram_quantiles_are_within_half_a_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.observe(ms / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 1000 and summary["min"] == 0.001 and summary["max"] == 1.0
+    for name, exact in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        assert summary[name] == pytest.approx(exact, rel=0.05), name
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_spans_feed_latency_and_the_trace_until_it_is_full():
+    metrics = Metrics(max_trace_events=2, clock=StepClock(0.25))
+    with metrics.span("export_to_csv"):
+        pass
+    with pytest.raises(KeyError):
+        with metrics.span("model_call", model="GPT-4o"):
+            raise KeyError("boom")
+    with metrics.span("export_to_csv"):
+        pass
+
+    first, failed = metrics.trace_events
+    assert (first["name"], first["dur"], first["args"]) == ("export_to_csv", 250000.0, {})
+    assert failed["args"] == {"model": "GPT-4o", "error": True}
+    summary = metrics.summary()
+    assert summary["latency"]['span_seconds{span="export_to_csv"}']["count"] == 2
+    assert summary["trace_events"] == 2 and summary["dropped_trace_events"] == 1
+
+
+def test_instrumented_backend_counts_responses_and_errors():
+    metrics = Metrics()
+    backend = InstrumentedBackend(FakeBackend(down={"Llama 3"}), metrics)
+    backend.generate("q", "GPT-4o", num_responses=3)
+    with pytest.raises(BackendError):
+        backend.generate("q", "Llama 3")
+
+    counters = metrics.summary()["counters"]
+    assert counters['responses_total{model="GPT-4o"}'] == 3
+    assert counters['model_calls_total{model="Llama 3"}'] == 1
+    assert counters['errors_total{model="Llama 3"}'] == 1
+    assert 'errors_total{model="GPT-4o"}' not in counters
+
+
+def _run(cache, metrics):
+    with SENQuestionGenerator(seed=23, backend=CountingBackend(), cache=cache,
+                              metrics=metrics) as generator:
+        return generator.generate_question_set(5, MODELS)
+
+
+def test_a_cached_run_exports_prometheus_text_and_a_trace(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    metrics = Metrics()
+    _run(cache, metrics)
+    counters = metrics.summary()["counters"]
+    assert counters["queries_total"] == 5
+    assert (counters["cache_hits_total"], counters["cache_misses_total"]) == (0, 10)
+    for model in MODELS:
+        assert counters[f'model_calls_total{{model="{model}"}}'] == 5
+        assert counters[f'responses_total{{model="{model}"}}'] == 20
+
+    with open(metrics.write_prometheus(str(tmp_path / "run.prom")), encoding="utf-8") as f:
+        text = f.read()
+    assert "# TYPE sen_survey_queries_total counter\nsen_survey_queries_total 5\n" in text
+    assert "# TYPE sen_survey_span_seconds summary" in text
+    assert 'sen_survey_span_seconds_count{span="generate_question_set"} 1\n' in text
+    assert 'sen_survey_span_seconds{model="GPT-4o",span="model_call",quantile="0.95"}' in text
+
+    with open(metrics.write_trace(str(tmp_path / "trace.json")), encoding="utf-8") as f:
+        trace = json.load(f)
+    names = [event["name"] for event in trace["traceEvents"]]
+    assert names.count("model_call") == 10 and names.count("generate_question_set") == 1
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in trace["traceEvents"])
+    assert trace["otherData"]["counters"]["queries_total"] == 5
+
+    # Warm rerun: every model call is a cache hit and none reaches the backend
+    warm = Metrics()
+    _run(ResponseCache(str(tmp_path / "cache.sqlite")), warm)
+    counters = warm.summary()["counters"]
+    assert (counters["cache_hits_total"], counters["cache_misses_total"]) == (10, 0)
+    assert not any(name.startswith("model_calls_total") for name in counters)
+
+
+def test_without_metrics_the_backend_is_not_wrapped():
+    backend = CountingBackend()
+    generator = SENQuestionGenerator(seed=23, backend=backend)
+    assert generator.metrics is NULL_METRICS and generator.backend is backend
+    with NULL_METRICS.span("anything"):
+        NULL_METRICS.increment("queries_total")
+    assert len(generator.generate_question_set(2, MODELS)) == 2
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sen_survey.leaderboard import bootstrap_mean_ci, normal_block_mean_ci, quality_leaderboard
+
+
+@pytest.mark.parametrize("n, interval", [
+    (40, lambda values, rng: bootstrap_mean_ci(values, 300, rng=rng)),
+    (5000, lambda values, rng: normal_block_mean_ci(np.sort(values), 300, blocks=64, rng=rng)),
+])
+def test_95_percent_intervals_cover_the_true_mean(n, interval):
+    rng = np.random.default_rng(0)
+    trials = 200
+    covered = 0
+    for _ in range(trials):
+        values = rng.beta(2, 5, n)  # skewed, mean 2/7
+        low, high = interval(values, rng)
+        covered += low <= 2 / 7 <= high
+    assert 0.90 <= covered / trials <= 0.99
+
+
+def test_bootstrap_interval_is_a_resample_of_the_values():
+    values = np.array([0.2, 0.4, 0.9])
+    low, high = bootstrap_mean_ci(values, 2000, rng=np.random.default_rng(1))
+    assert 0.2 <= low < values.mean() < high <= 0.9
+    assert bootstrap_mean_ci(np.array([0.7]), 100) == (0.7, 0.7)
+    assert all(np.isnan(bootstrap_mean_ci(np.array([]), 100)))
+
+
+def test_leaderboard_ranks_groups_by_mean_with_ordered_statistics():
+    rng = np.random.default_rng(2)
+    frame = pd.DataFrame({
+        "model": np.repeat(["Llama 3", "GPT-4o", "Mistral Large"], 60),
+        "sen_category": np.tile(["ASD", "ADHD"], 90),
+        "quality_score": np.concatenate([rng.uniform(0.5, 0.7, 60), rng.uniform(0.7, 0.9, 60),
+                                         rng.uniform(0.6, 0.8, 60)]),
+    })
+    frame.loc[0, "quality_score"] = np.nan
+    table = quality_leaderboard(frame, dimensions=["model", "sen_category"], n_boot=200)
+
+    models = table[table["dimension"] == "model"]
+    assert list(models["group"]) == ["GPT-4o", "Mistral Large", "Llama 3"]
+    assert list(models["rank"]) == [1, 2, 3]
+    assert list(models["count"]) == [60, 60, 59]
+    assert list(table["dimension"]) == ["model"] * 3 + ["sen_category"] * 2
+    assert (table["ci_low"] <= table["mean"]).all() and (table["mean"] <= table["ci_high"]).all()
+    assert (table["q25"] <= table["q50"]).all() and (table["q50"] <= table["q75"]).all()
+    # The bootstrap and the normal approximation agree on a large enough group
+    approximate = quality_leaderboard(frame, dimensions=["model"], n_boot=200, exact_up_to=0)
+    assert np.allclose(approximate["ci_low"], models["ci_low"], atol=0.01)
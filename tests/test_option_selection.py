@@ -0,0 +1,56 @@
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.option_selection import DiverseOptionSelector
+
+QUERY = "How can I support a Year 3 pupil with autism during transitions between lessons?"
+TIMETABLE = [
+    "Use a visual timetable so the pupil can see each transition between lessons coming.",
+    "Use a visual timetable so the pupil can see every transition between lessons coming.",
+    "Use a visual timetable so that the pupil can see each transition between lessons coming.",
+    "Use a visual timetable so the pupil can see each transition between the lessons coming.",
+]
+DISTINCT = [
+    "Give a five-minute warning and a countdown timer before the class changes activity.",
+    "Let the pupil leave slightly early with a trusted adult to avoid the crowded corridor.",
+    "Offer a transition object, such as a card for the next subject, to carry between rooms.",
+]
+
+
+def _question(query=QUERY, duplicates=TIMETABLE, distinct=DISTINCT):
+    def responses(model, texts):
+        return [{"id": f"{model}_{i + 1}", "type": "Social", "content": text,
+                 "quality_score": 0.8} for i, text in enumerate(texts)]
+    return {"teacher_query_text": query,
+            "all_model_responses": {"GPT-4o": responses("GPT-4o", duplicates),
+                                    "Llama 3": responses("Llama 3", distinct)}}
+
+
+def test_near_duplicate_responses_are_not_offered_twice():
+    picks = DiverseOptionSelector(num_options=4).select(_question())
+    assert len(picks) == len(set(picks)) == 4
+    assert sum(model == "GPT-4o" for model, _ in picks) == 1
+    assert {position for model, position in picks if model == "Llama 3"} == {0, 1, 2}
+
+
+def test_small_pools_give_every_response_and_blocks_match_single_questions():
+    selector = DiverseOptionSelector(num_options=4)
+    small = _question(duplicates=TIMETABLE[:1], distinct=DISTINCT[:1])
+    assert sorted(selector.select(small)) == [("GPT-4o", 0), ("Llama 3", 0)]
+
+    generator = SENQuestionGenerator(seed=16)
+    questions = generator.generate_question_set(12, ["GPT-4o", "Llama 3", "Mistral Large"])
+    assert selector.select_many(questions, block_size=5) == [
+        DiverseOptionSelector(num_options=4).select(question) for question in questions]
+
+
+def test_forms_options_come_from_the_selected_responses():
+    generator = SENQuestionGenerator(seed=16)
+    questions = generator.generate_question_set(3, ["GPT-4o", "Llama 3"])
+    selector = DiverseOptionSelector(num_options=4)
+    forms = generator.format_for_microsoft_forms(questions, option_selector=selector)
+
+    for entry, question in zip(forms, questions):
+        picks = selector.select(question)
+        assert entry["metadata"]["option_sources"] == [model for model, _ in picks]
+        for option, (model, position) in zip(entry["options"], picks):
+            assert option.endswith(question["all_model_responses"][model][position]["content"])
+        assert len(entry["options"]) == len(picks) + 1  # plus 'Other'
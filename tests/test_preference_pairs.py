@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.preference_pairs import (PreferencePairBuilder, ShardedPairWriter,
+                                         build_preference_dataset, pair_schema, verify_manifest)
+
+MODELS = ["GPT-4o", "Llama 3"]
+COMPARED = ("prompt", "age_group", "subject", "chosen", "rejected", "chosen_source",
+            "rejected_source", "chosen_type", "rejected_type", "rating_score")
+
+
+def _forms(lazy):
+    generator = SENQuestionGenerator(seed=2)
+    questions = generator.generate_question_set(3, MODELS)
+    if lazy:
+        return list(generator.iter_forms_data(questions))
+    return generator.format_for_microsoft_forms(questions)
+
+
+def _answer(response_id, question_id="1", selected="Option 2", text="", rating=4.0,
+            teacher="t1", timestamp="2026-01-01T09:00"):
+    return {"response_id": response_id, "teacher_id": teacher, "question_id": question_id,
+            "selected_option": selected, "improvement_text": text, "rating_score": rating,
+            "submission_timestamp": timestamp}
+
+
+def test_dict_entries_give_the_same_pairs_as_forms_questions():
+    answers = [_answer("r1"), _answer("r2", "2", "Other", "Use a visual timetable")]
+    lazy = list(PreferencePairBuilder(_forms(True)).iter_pairs(answers))
+    plain = list(PreferencePairBuilder(_forms(False)).iter_pairs(answers))
+    assert len(lazy) == 3 + 4
+    assert [[p[k] for k in COMPARED] for p in plain] == [[p[k] for k in COMPARED] for p in lazy]
+
+
+def test_repeated_submissions_are_paired_once():
+    builder = PreferencePairBuilder(_forms(True))
+    pairs = list(builder.iter_pairs([_answer("r1"), _answer("r1"), _answer("r1", "2")]))
+    assert len(pairs) == 6 and builder.duplicates == 1
+
+
+def test_submissions_without_an_id_get_distinct_stable_pair_ids():
+    forms_data = _forms(True)
+    answers = [_answer(None), _answer("", teacher="t2")]
+    first = [p["pair_id"] for p in PreferencePairBuilder(forms_data).iter_pairs(answers)]
+    again = [p["pair_id"] for p in PreferencePairBuilder(forms_data).iter_pairs(answers)]
+    assert first == again and len(set(first)) == len(first) == 6
+
+
+def test_parquet_shards_share_one_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    # The first shard has no ratings at all, the second has some
+    answers = [_answer(f"r{i}", rating=None if i < 2 else 3.0) for i in range(4)]
+    manifest = build_preference_dataset(_forms(True), answers, str(tmp_path),
+                                        file_format="parquet", max_records=6)
+    schemas = [pq.read_schema(os.path.join(tmp_path, shard["file"]))
+               for shard in manifest["shards"]]
+    assert len(schemas) == 2
+    assert all(schema.equals(pair_schema()) for schema in schemas)
+
+
+def test_writer_works_without_a_with_block(tmp_path):
+    writer = ShardedPairWriter(str(tmp_path / "pairs"), max_records=2, workers=1)
+    writer.write_all({"pair_id": str(i)} for i in range(5))
+    manifest = writer.close()
+
+    assert [shard["records"] for shard in manifest["shards"]] == [2, 2, 1]
+    assert verify_manifest(str(tmp_path / "pairs")) == []
+    with gzip.open(tmp_path / "pairs" / manifest["shards"][-1]["file"]) as f:
+        assert [json.loads(line) for line in f] == [{"pair_id": "4"}]
+    with pytest.raises(ValueError):
+        writer.write({"pair_id": "5"})
@@ -0,0 +1,44 @@
+import json
+import sys
+
+import pytest
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.prompt_templates import (INTERNED_FIELDS, CompiledTemplate, compile_template,
+                                         intern_fields)
+
+
+def test_compiled_templates_render_exactly_like_str_format():
+    generator = SENQuestionGenerator(seed=0)
+    values = {"age_group": "Key Stage 2 (7-11)", "sen_type": "Autism Spectrum Disorder",
+              "subject": "Science", "focus_point": "sensory overload in a busy classroom",
+              "resource_type": "visual", "activity": "break time"}
+    for template in generator.teacher_question_templates:
+        assert compile_template(template).render(**values) == template.format(**values)
+
+    braces = CompiledTemplate("{{literal}} {name} and {name}")
+    assert braces.render(name="x") == "{literal} x and x"
+    assert braces.match("{literal} x and x") == {"name": "x"}
+    with pytest.raises(ValueError):
+        CompiledTemplate("{name!r}")
+
+
+def test_render_cache_is_bounded_and_shares_strings():
+    template = CompiledTemplate("Support for {need} in {subject}", max_cached=2)
+    first = template.render(need="ASD", subject="Art")
+    assert template.render(need="ASD", subject="Art") is first
+    for subject in ("PE", "Science", "English"):
+        assert template.render(need="ASD", subject=subject) == f"Support for ASD in {subject}"
+    assert len(template) == 2
+
+    assert compile_template("{a}-{b}") is compile_template("{a}-{b}")
+    assert compile_template.cache_info().maxsize == 64
+
+
+def test_records_read_back_share_interned_values_but_not_their_dates():
+    record = json.loads(json.dumps({"age_group": "Key Stage 1 (5-7)",
+                                    "created_date": "2026-01-01T00:00:00"}))
+    intern_fields(record)
+    assert record["age_group"] is sys.intern("Key Stage 1 (5-7)")
+    # Unique per record: interning would only grow the intern table
+    assert "created_date" not in INTERNED_FIELDS
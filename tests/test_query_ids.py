@@ -0,0 +1,55 @@
+import multiprocessing
+import threading
+
+from sen_survey.query_ids import QueryIdAllocator, default_allocator, parse_query_id
+from sen_survey.single_model import SENQuestionGenerator as SingleModelGenerator
+
+
+def _ids_from_default_allocator(count):
+    allocator = default_allocator()
+    return [allocator.next_id() for _ in range(count)] + allocator.allocate(count)
+
+
+def test_threads_sharing_an_allocator_never_collide():
+    allocator = QueryIdAllocator()
+    results = [None] * 8
+
+    def work(index):
+        ids = []
+        for _ in range(200):
+            ids.append(allocator.next_id())
+            ids.extend(allocator.reserve_block(50))
+        results[index] = ids
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_ids = [query_id for ids in results for query_id in ids]
+    assert len(set(all_ids)) == len(all_ids) == 8 * 200 * 51
+    # Every thread sees strictly increasing ids
+    assert all(ids == sorted(ids) and len(set(ids)) == len(ids) for ids in results)
+
+
+def test_processes_never_collide():
+    # Forked workers inherit the default allocator and must re-pick their worker id
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods()
+                                          else "spawn")
+    with context.Pool(4) as pool:
+        results = pool.map(_ids_from_default_allocator, [20_000] * 8)
+
+    all_ids = [query_id for ids in results for query_id in ids]
+    assert len(set(all_ids)) == len(all_ids) == 8 * 40_000
+    for ids in results:
+        assert ids == sorted(ids)
+        workers = {parse_query_id(query_id)[1] for query_id in ids}
+        assert len(workers) == 1
+
+
+def test_single_model_generator_uses_the_allocator():
+    generator = SingleModelGenerator()
+    ids = [question["id"] for question in generator.generate_question_set(50)]
+    assert len(set(ids)) == 50 and ids == sorted(ids)
+    assert all(parse_query_id(query_id)[1] == parse_query_id(ids[0])[1] for query_id in ids)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.query_ids import SequentialIdAllocator
+
+
+def _batch(n, seed=9):
+    generator = SENQuestionGenerator(id_allocator=SequentialIdAllocator("bulk"))
+    return generator, generator.synthesize_queries(n, seed=seed)
+
+
+def test_every_prompt_is_its_template_rendered_with_its_drawn_slots():
+    generator, batch = _batch(2000)
+    templates = batch.column("template")
+    focus_points = batch.column("focus_point")
+    resource_types = batch.column("resource_type")
+    activities = batch.column("activity")
+
+    for i, record in enumerate(batch.iter_records()):
+        assert record["teacher_query_text"] == templates[i].format(
+            sen_type=record["sen_full_name"], age_group=record["age_group"],
+            subject=record["subject"], focus_point=focus_points[i],
+            resource_type=resource_types[i], activity=activities[i])
+        assert focus_points[i] in generator.teacher_focus_points[record["sen_category"]]
+        assert record["sen_full_name"] == generator.sen_categories[record["sen_category"]]
+
+
+def test_records_have_the_create_teacher_query_shape_and_unique_ids():
+    generator, batch = _batch(500)
+    records = batch.to_records()
+    assert len(records) == len(batch) == 500
+    assert set(records[0]) == set(generator.create_teacher_query("ASD", "Key Stage 1 (5-7)", "Art"))
+    assert len({record["id"] for record in records}) == 500
+
+
+def test_a_seed_gives_the_same_batch_and_covers_every_category():
+    _, first = _batch(5000, seed=1)
+    _, again = _batch(5000, seed=1)
+    _, other = _batch(5000, seed=2)
+    assert list(first.teacher_query_text) == list(again.teacher_query_text)
+    assert list(first.teacher_query_text) != list(other.teacher_query_text)
+    for field, labels in first.categories.items():
+        if field in first.codes:
+            assert np.bincount(first.codes[field], minlength=len(labels)).min() > 0, field
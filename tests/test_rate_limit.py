@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+
+from sen_survey.llm_backends import BackendError, LLMBackend
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.rate_limit import (ManualClock, ModelScheduler, RetryPolicy, TokenBucket,
+                                   current_priority)
+
+
+class ThrottlingBackend(LLMBackend):
+    """Returns HTTP 429 (Retry-After: `retry_after`) for the first `throttle` calls."""
+
+    def __init__(self, clock, throttle=0, retry_after=5.0):
+        self.clock = clock
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate(self, query_text, model_name, num_responses=4):
+        with self._lock:
+            self.calls.append((self.clock.now(), query_text, current_priority.get()))
+            throttled = len(self.calls) <= self.throttle
+        if throttled:
+            raise BackendError("rate limited", status_code=429, retry_after=self.retry_after)
+        return [{"id": f"{model_name}_1", "type": "Social", "content": query_text,
+                 "quality_score": 0.8}]
+
+
+def _scheduler(backend, clock, limits=None, sleep=None, max_retries=5):
+    return ModelScheduler(backend, limits=limits,
+                          retry_policy=RetryPolicy(max_retries=max_retries, rng=random.Random(0)),
+                          clock=clock.now, sleep=sleep or clock.sleep)
+
+
+def test_429s_are_retried_after_retry_after_with_backoff():
+    clock = ManualClock()
+    backend = ThrottlingBackend(clock, throttle=3, retry_after=5.0)
+    scheduler = _scheduler(backend, clock)
+
+    assert scheduler.generate("question", "GPT-4o")[0]["content"] == "question"
+    assert (scheduler.retries, scheduler.throttled) == (3, 3)
+    times = [when for when, _, _ in backend.calls]
+    assert all(later - earlier >= 5.0 for earlier, later in zip(times, times[1:]))
+
+
+def test_retries_give_up_after_max_retries():
+    clock = ManualClock()
+    scheduler = _scheduler(ThrottlingBackend(clock, throttle=10), clock, max_retries=2)
+    try:
+        scheduler.generate("question", "GPT-4o")
+    except BackendError as exc:
+        assert exc.status_code == 429
+    else:
+        raise AssertionError("expected the third 429 to be raised")
+    assert scheduler.retries == 2
+
+
+def test_requests_per_minute_are_spread_without_bursts():
+    clock = ManualClock()
+    backend = ThrottlingBackend(clock)
+    # 60 requests/min with the default 10-second burst: 10 at once, then one per second
+    scheduler = _scheduler(backend, clock, limits={"GPT-4o": {"requests_per_minute": 60}})
+    for i in range(40):
+        scheduler.generate(f"question {i}", "GPT-4o")
+    times = [when for when, _, _ in backend.calls]
+    assert times[9] == 0.0
+    assert 29.0 <= times[-1] <= 31.0
+    # No 60-second window holds more than the limit plus the burst
+    assert all(sum(start <= t < start + 60 for t in times) <= 70 for start in times)
+
+
+def test_oversized_requests_are_paid_for_in_full():
+    clock = ManualClock()
+    # 600 tokens/min = 10 per second, with a 100-token burst
+    bucket = TokenBucket(600, clock=clock.now)
+    assert bucket.wait_time(1000) == 0.0
+    bucket.consume(1000)
+    assert bucket.tokens == -900
+
+    # The next request waits for the 900-token debt and its own 100 tokens
+    assert bucket.wait_time(100) == 100.0
+    clock.sleep(bucket.wait_time(100))
+    assert bucket.wait_time(100) == 0.0
+
+
+def test_high_priority_waiters_are_served_first():
+    clock = ManualClock()
+    backend = ThrottlingBackend(clock)
+    # Time only moves when the test advances it; waiters just poll
+    scheduler = _scheduler(backend, clock, limits={"GPT-4o": {"requests_per_minute": 6}},
+                           sleep=lambda seconds: time.sleep(0.001))
+    scheduler.generate("drains the burst", "GPT-4o")
+
+    def call(priority):
+        current_priority.set(priority)
+        scheduler.generate(priority, "GPT-4o")
+
+    threads = []
+    for priority in ["Low", "Medium", "High"]:
+        threads.append(threading.Thread(target=call, args=(priority,)))
+        threads[-1].start()
+        while len(scheduler._waiting.get("GPT-4o", [])) < len(threads):
+            time.sleep(0.001)
+
+    for served in range(2, 5):
+        clock.sleep(10.0)
+        while len(backend.calls) < served:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    assert [query for _, query, _ in backend.calls[1:]] == ["High", "Medium", "Low"]
+
+
+def test_sync_generation_calls_models_at_the_query_priority():
+    clock = ManualClock()
+    backend = ThrottlingBackend(clock)
+    generator = SENQuestionGenerator(seed=2, backend=backend, retry_policy=RetryPolicy())
+    records = generator.generate_question_set(10, ["GPT-4o"])
+    assert [priority for _, _, priority in backend.calls] == [r["priority"] for r in records]
+    assert current_priority.get() == "Medium"
@@ -0,0 +1,46 @@
+import json
+import pickle
+from collections.abc import Mapping
+
+from conftest import FakeBackend
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.records import as_dict
+from sen_survey.single_model import SENQuestionGenerator as SingleModelGenerator
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def test_forms_data_is_plain_json_like_the_dict_records():
+    generator = SENQuestionGenerator(seed=3)
+    questions = generator.generate_question_set(5, MODELS)
+    compact = SENQuestionGenerator(seed=3).generate_question_set(5, MODELS, compact=True)
+
+    forms_data = generator.format_for_microsoft_forms(compact)
+    assert all(type(entry) is dict for entry in forms_data)
+    assert forms_data == generator.format_for_microsoft_forms(questions)
+    json.dumps(forms_data)
+
+    single = SingleModelGenerator()
+    json.dumps(single.format_for_microsoft_forms(single.generate_question_set(3, compact=True)))
+
+    # The lazy entries stay compact but read like any other Mapping
+    entry = next(generator.iter_forms_data(compact))
+    assert isinstance(entry, Mapping) and isinstance(compact[0], Mapping)
+    assert dict(entry.items()) == forms_data[0]
+    assert json.loads(json.dumps(as_dict(compact[0]))) == compact[0]
+
+
+def test_compact_records_keep_the_fallback_model():
+    generator = SENQuestionGenerator(
+        seed=1, backend=FakeBackend(down={"Llama 3"}),
+        hedging={"fallbacks": {"Llama 3": "GPT-4o"}})
+    questions = generator.generate_question_set(2, MODELS, compact=True)
+
+    for question in questions:
+        record = as_dict(question)
+        assert {r["fallback_model"] for r in record["all_model_responses"]["Llama 3"]} == {
+            "GPT-4o"}
+        assert all("fallback_model" not in r for r in record["all_model_responses"]["GPT-4o"])
+        assert question["all_model_responses"]["Llama 3"][0]["fallback_model"] == "GPT-4o"
+        assert pickle.loads(pickle.dumps(question)) == record
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+
+from sen_survey.cli import main
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.response_analysis import ResponseCorpus, ResponseEmbedder, analyze_consensus
+
+TIMETABLE = "Use a visual timetable and warn the pupil before every transition."
+BREAKS = "Offer short movement breaks and a quiet corner when the pupil is overwhelmed."
+PHONICS = "Teach phonics in short multi-sensory sessions with overlearning of each sound."
+
+
+def _corpus(rows):
+    corpus = ResponseCorpus()
+    for query_id, model, content in rows:
+        corpus.add(query_id, model, content)
+    return corpus
+
+
+def test_agreeing_models_share_a_query_cluster_with_global_labels():
+    corpus = _corpus([
+        ("q1", "GPT-4o", TIMETABLE), ("q1", "Llama 3", TIMETABLE), ("q1", "Mistral Large", PHONICS),
+        ("q2", "GPT-4o", BREAKS), ("q2", "Llama 3", BREAKS),
+    ])
+    result = analyze_consensus(corpus, k=2)
+
+    # Labels are corpus rows of each cluster's first member, so they never clash across queries
+    assert result["query_cluster"].tolist() == [0, 0, 2, 3, 3]
+    assert np.allclose(result["support"][[0, 1, 3, 4]], 1.0)
+    assert result["support"][2] < 0.8
+    assert result["models"]["Mistral Large"]["outlier_rate"] == 1.0
+    assert result["models"]["Llama 3"]["outlier_rate"] == 0.0
+
+
+def test_a_model_never_compared_has_null_consensus():
+    corpus = _corpus([("q1", "GPT-4o", TIMETABLE), ("q1", "Llama 3", BREAKS),
+                      ("q2", "Solo", PHONICS)])
+    result = analyze_consensus(corpus, k=2)
+    assert np.isnan(result["consensus"][2])
+    assert result["models"]["Solo"]["mean_consensus"] is None
+    json.dumps(result["models"], allow_nan=False)
+
+
+def test_empty_corpus_gives_an_empty_result(tmp_path):
+    empty_csv = tmp_path / "empty.csv"
+    empty_csv.write_text("", encoding="utf-8")
+    corpus = ResponseCorpus.from_csv(str(empty_csv))
+    assert len(corpus) == 0
+
+    result = analyze_consensus(corpus)
+    assert result["models"] == {}
+    assert all(len(result[key]) == 0 for key in
+               ("consensus", "support", "query_cluster", "corpus_cluster"))
+
+
+def test_embeddings_are_unit_vectors_and_identical_texts_match():
+    embeddings = ResponseEmbedder(dim=64).fit_transform([TIMETABLE, TIMETABLE, PHONICS])
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+    assert embeddings[0] @ embeddings[1] > 0.999 > embeddings[0] @ embeddings[2]
+
+
+def test_consensus_command_writes_valid_json(tmp_path):
+    records = tmp_path / "records.jsonl"
+    generator = SENQuestionGenerator(seed=5)
+    generator.export_to_jsonl(generator.generate_question_set(20, ["GPT-4o", "Llama 3"]),
+                              str(records))
+    output = tmp_path / "consensus.json"
+    assert main(["analyze", "consensus", str(records), "-o", str(output)]) == 0
+
+    summary = json.loads(output.read_text(encoding="utf-8"))
+    assert summary["responses"] == 20 * 2 * 4
+    assert set(summary["models"]) == {"GPT-4o", "Llama 3"}
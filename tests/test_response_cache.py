@@ -0,0 +1,81 @@
+from conftest import CountingBackend
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.rate_limit import ManualClock
+from sen_survey.response_cache import CachedBackend, ResponseCache, make_cache_key
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def _cache(tmp_path, clock, **options):
+    return ResponseCache(str(tmp_path / "cache.sqlite"), clock=clock.now, **options)
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    clock = ManualClock()
+    cache = _cache(tmp_path, clock, ttl_seconds=60)
+    cache.set("key", ["answer"])
+
+    clock.sleep(59)
+    assert cache.get("key") == ["answer"]
+    clock.sleep(2)
+    assert cache.get("key") is None
+    assert (len(cache), cache.evictions) == (0, 1)
+    cache.close()
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    clock = ManualClock()
+    cache = _cache(tmp_path, clock, max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, [key])
+        clock.sleep(1)
+    cache.get("a")
+    clock.sleep(1)
+    cache.set("c", ["c"])
+
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == ["a"] and cache.get("c") == ["c"]
+    cache.close()
+
+
+def test_stats_count_hits_and_misses(tmp_path):
+    cache = _cache(tmp_path, ManualClock())
+    cache.get("key")
+    cache.set("key", ["answer"])
+    cache.get("key")
+    cache.get("key")
+
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1, "evictions": 0,
+                             "hit_rate": 2 / 3}
+    cache.close()
+
+
+def test_batch_sends_only_the_misses_to_the_backend(tmp_path):
+    cache = _cache(tmp_path, ManualClock())
+    fake = CountingBackend()
+    backend = CachedBackend(fake, cache)
+    cache.set(make_cache_key("GPT-4o", "b", num_responses=2, **fake.cache_params()), ["cached"])
+
+    results = backend.generate_batch(["a", "b", "c"], "GPT-4o", num_responses=2)
+    assert fake.prompts == ["a", "c"]
+    assert results[1] == ["cached"] and results[2][0]["content"] == "(GPT-4o) 0: c"
+
+    assert backend.generate_batch(["a", "c"], "GPT-4o", num_responses=2) == [
+        results[0], results[2]]
+    assert fake.prompts == ["a", "c"]
+    cache.close()
+
+
+def test_warm_rerun_makes_no_backend_calls(tmp_path):
+    def run(backend):
+        generator = SENQuestionGenerator(seed=2, cache=cache, backend=backend)
+        return [record["all_model_responses"] for record in generator.generate_question_set(
+            5, MODELS)]
+
+    cache = _cache(tmp_path, ManualClock())
+    cold, warm = CountingBackend(), CountingBackend()
+    assert run(cold) == run(warm)
+    assert len(cold.prompts) == 5 * len(MODELS) and warm.prompts == []
+    cache.close()
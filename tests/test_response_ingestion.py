@@ -0,0 +1,62 @@
+import csv
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.response_ingestion import (RESPONSE_FIELDS, QuestionIndex, WinRateTally,
+                                           ingest_responses, iter_submissions)
+
+
+def _index():
+    generator = SENQuestionGenerator(seed=0)
+    questions = generator.generate_question_set(3, ["GPT-4o", "Llama 3"])
+    return QuestionIndex.from_forms(generator.iter_forms_data(questions))
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RESPONSE_FIELDS)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_rows_with_an_unreadable_rating_are_skipped_and_counted(tmp_path):
+    path = _write(tmp_path / "responses.csv", [
+        ["r1", "t1", "1", "Option 2", "", "4", "2026-01-01"],
+        ["r2", "t2", "2", "Option 1", "", "four", "2026-01-01"],
+        ["r3", "t3", "3", "Option 1", "", "", "2026-01-01"],
+    ])
+    skipped = []
+    submissions = list(iter_submissions(path, on_malformed=skipped.append))
+    assert [s["response_id"] for s in submissions] == ["r1", "r3"]
+    assert [s["rating_score"] for s in submissions] == [4.0, None]
+    assert [row["rating_score"] for row in skipped] == ["four"]
+
+    summary = ingest_responses(path, _index()).summary()
+    assert (summary["answered"], summary["malformed"]) == (2, 1)
+
+
+def test_duplicates_are_remembered_within_a_bounded_window():
+    tally = WinRateTally(_index(), max_seen=2)
+
+    def answer(response_id):
+        return {"response_id": response_id, "question_id": "1", "selected_option": "1",
+                "rating_score": None}
+
+    assert [tally.add(answer(r)) for r in ("a", "b", "a", "c")] == [True, True, False, True]
+    assert len(tally._seen) == 2
+    # "a" was seen more recently than "b", so "b" is the one that fell out of the window
+    assert [tally.add(answer(r)) for r in ("a", "b")] == [False, True]
+    assert tally.duplicates == 2
+
+
+def test_index_counts_each_question_once():
+    generator = SENQuestionGenerator(seed=0)
+    questions = generator.generate_question_set(3, ["GPT-4o", "Llama 3"])
+    index = QuestionIndex.from_forms(generator.iter_forms_data(questions))
+    assert len(index) == 3
+    assert all(question["id"] in index for question in questions)
+    assert all(number in index for number in (1, 2, 3))
+
+    # Re-registering a question replaces it rather than adding one
+    index.add(next(generator.iter_forms_data(questions)))
+    assert len(index) == 3
@@ -0,0 +1,20 @@
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.sharding import iter_sharded_question_set
+
+MODELS = ["GPT-4o", "Llama 3"]
+
+
+def _run(seed, workers):
+    return list(iter_sharded_question_set(SENQuestionGenerator, 30, MODELS, seed=seed,
+                                          workers=workers, shard_size=8,
+                                          created_date="2026-01-01T00:00:00"))
+
+
+def test_output_does_not_depend_on_the_worker_count():
+    assert _run(5, 1) == _run(5, 3)
+
+
+def test_unseeded_runs_get_a_fresh_seed():
+    first, second = _run(None, 2), _run(None, 1)
+    assert len({record["id"] for record in first}) == len(first) == 30
+    assert {record["id"] for record in first}.isdisjoint(record["id"] for record in second)
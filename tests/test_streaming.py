@@ -0,0 +1,41 @@
+from conftest import CountingBackend
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.query_ids import SequentialIdAllocator
+
+MODELS = ["GPT-4o", "Llama 3", "Mistral Large"]
+
+
+def _generator(backend=None):
+    generator = SENQuestionGenerator(seed=6, backend=backend,
+                                     id_allocator=SequentialIdAllocator("stream"))
+    generator.created_date = "2026-01-01T00:00:00"
+    return generator
+
+
+def test_streamed_files_equal_the_list_exports(tmp_path):
+    listed = _generator()
+    questions = listed.generate_question_set(20, MODELS)
+    listed.export_to_csv(questions, str(tmp_path / "list.csv"))
+    listed.export_to_jsonl(questions, str(tmp_path / "list.jsonl"))
+    listed.create_forms_import_file(listed.format_for_microsoft_forms(questions),
+                                    str(tmp_path / "list.txt"))
+
+    streamed = _generator()
+    count = streamed.stream_to_files(
+        streamed.iter_question_set(20, MODELS), csv_filename=str(tmp_path / "stream.csv"),
+        forms_filename=str(tmp_path / "stream.txt"), jsonl_filename=str(tmp_path / "stream.jsonl"))
+
+    assert count == 20
+    for extension in ("csv", "jsonl", "txt"):
+        assert (tmp_path / f"stream.{extension}").read_bytes() == (
+            tmp_path / f"list.{extension}").read_bytes(), extension
+
+
+def test_iter_question_set_answers_one_query_at_a_time():
+    backend = CountingBackend()
+    questions = _generator(backend).iter_question_set(1000, MODELS)
+    next(questions)
+    assert len(backend.requests) == len(MODELS)
+    next(questions)
+    assert len(backend.requests) == 2 * len(MODELS)
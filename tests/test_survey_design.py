@@ -0,0 +1,22 @@
+from collections import Counter, defaultdict
+
+import pytest
+
+from sen_survey.multi_model import SENQuestionGenerator
+from sen_survey.survey_design import SurveyDesign
+
+
+@pytest.mark.parametrize("total", [7, 100, 300, 1000, 4321])
+def test_quotas_stay_within_one_per_focus_point_and_dimension(total):
+    design = SurveyDesign(SENQuestionGenerator(seed=0))
+    per_focus = defaultdict(Counter)
+    for (sen_type, _, _, _, focus_point), quota in design.iter_quotas(total):
+        per_focus[sen_type][focus_point] += quota
+
+    assert sum(sum(counts.values()) for counts in per_focus.values()) == total
+    for sen_type, counts in per_focus.items():
+        assert max(counts.values()) - min(counts.values()) <= 1, sen_type
+
+    report = design.coverage(total)
+    for name in ("sen_category", "age_group", "subject", "template"):
+        assert report[f"{name}_spread"] <= 1, name